@@ -0,0 +1,56 @@
+import json
+import threading
+from collections import deque
+
+# ==========================================
+# IN-PROCESS ALERT PUB/SUB (SSE BACKEND)
+# ==========================================
+class AlertBus:
+    """Ordered log of alert deltas, one topic per teacher.
+
+    Every published event gets the next sequence number, which is also the
+    resume cursor handed to clients. Only the last `history` events are kept;
+    a client whose cursor fell out of that window (or comes from an older
+    server process) is sent a full snapshot instead of deltas.
+    """
+
+    def __init__(self, history=1024):
+        self.events = deque(maxlen=history)   # (seq, topic, kind, data)
+        self.seq = 0
+        self.cond = threading.Condition()
+
+    def publish(self, topic, kind, data):
+        with self.cond:
+            self.seq += 1
+            self.events.append((self.seq, topic, kind, data))
+            self.cond.notify_all()
+            return self.seq
+
+    def wait(self, cursor, timeout):
+        """Block until something newer than `cursor` is published (or timeout)."""
+        with self.cond:
+            self.cond.wait_for(lambda: self.seq > cursor, timeout)
+            return self.seq
+
+    def since(self, topic, cursor):
+        """(events for `topic` after `cursor`, new cursor); events is None if the cursor is unusable."""
+        with self.cond:
+            oldest = self.events[0][0] if self.events else self.seq + 1
+            if cursor is None or cursor > self.seq or cursor < oldest - 1: return None, self.seq
+            return [(seq, kind, data) for seq, t, kind, data in self.events if seq > cursor and t == topic], self.seq
+
+
+def parse_cursor(value):
+    try: return int(value)
+    except (TypeError, ValueError): return None
+
+def deltas(bus, topic, cursor, snapshot_fn):
+    """Events since `cursor`, or one 'snapshot' event (current alerts) when deltas can't be replayed."""
+    events, latest = bus.since(topic, cursor)
+    if events is None:
+        # Take the snapshot after the cursor: a later 'alert' for the same roll is idempotent on the client
+        return [(latest, 'snapshot', snapshot_fn())], latest
+    return events, latest
+
+def sse_format(seq, kind, data):
+    return f"id: {seq}\nevent: {kind}\ndata: {json.dumps(data)}\n\n"
@@ -0,0 +1,129 @@
+import threading
+from collections import OrderedDict
+from sqlalchemy import select, func, case
+from models import db, Student, Attendance, Bunking, StudentStats, SubjectStats, as_date
+from attendance_stats import data_version
+
+# ==========================================
+# COURSE / SUBJECT ANALYTICS
+# ==========================================
+# Everything is one GROUP BY in the database (no per-row ORM objects). Results
+# are cached per data version: StatsDelta.apply() bumps the version in the same
+# transaction as every attendance / bunk write, and registering or deleting a
+# student bumps it too (names and courses are joined in), so a cached report
+# is never stale.
+
+GROUPS = {'course': Attendance.course, 'subject': Attendance.subject, 'date': Attendance.date}
+DEFAULT_THRESHOLD = 75
+
+def counted(status):
+    return func.sum(case((Attendance.status == status, 1), else_=0))
+
+def rate(present, total):
+    return round(present / total * 100, 1) if total else 0
+
+def date_filters(column, date_from=None, date_to=None):
+    filters = []
+    if date_from: filters.append(column >= as_date(date_from))
+    if date_to: filters.append(column <= as_date(date_to))
+    return filters
+
+def hour_of(column):
+    # Time is stored as 'HH:MM:SS.ffffff' text on SQLite, a real TIME on PostgreSQL
+    if db.session.get_bind().dialect.name == 'sqlite': return func.cast(func.substr(column, 1, 2), db.Integer)
+    return func.cast(func.extract('hour', column), db.Integer)
+
+# --- ATTENDANCE RATE ---
+def attendance_rates(group_by=('course', 'subject'), course=None, subject=None, date_from=None, date_to=None):
+    """Present % per group; group_by is any of 'course', 'subject', 'date'."""
+    filters = date_filters(Attendance.date, date_from, date_to)
+    if course: filters.append(Attendance.course == course)
+    if subject: filters.append(Attendance.subject == subject)
+    # One row per lecture (course, subject, date) first, so 'lectures' counts lectures, not days
+    per_lecture = (select(*GROUPS.values(), func.count().label('total'), counted('Present').label('present'),
+                          counted('Absent').label('absent'), counted('Late').label('late'))
+                   .where(*filters).group_by(*GROUPS.values()).subquery())
+    keys = [per_lecture.c[g] for g in group_by]
+    summed = [func.coalesce(func.sum(per_lecture.c[c]), 0) for c in ('total', 'present', 'absent', 'late')]
+    stmt = select(*keys, func.count(), *summed).group_by(*keys).order_by(*keys)
+    out = []
+    for row in db.session.execute(stmt):
+        values = dict(zip(group_by, row[:len(keys)]))
+        if 'date' in values: values['date'] = values['date'].isoformat()
+        lectures, total, present, absent, late = row[len(keys):]
+        out.append({**values, 'lectures': lectures, 'total': total, 'present': present,
+                    'absent': absent, 'late': late, 'rate': rate(present, total)})
+    return out
+
+# --- STUDENTS BELOW THRESHOLD ---
+def below_threshold(threshold=DEFAULT_THRESHOLD, course=None, subject=None, date_from=None, date_to=None):
+    """Students whose present % is under `threshold`, lowest first."""
+    if date_from or date_to:
+        # Arbitrary range: aggregate the raw marks
+        filters = date_filters(Attendance.date, date_from, date_to)
+        if subject: filters.append(Attendance.subject == subject)
+        total, present = func.count(), counted('Present')
+        stmt = select(Attendance.roll_no, total, present).where(*filters).group_by(Attendance.roll_no)
+    else:
+        # All-time: the counter tables already hold the sums
+        stats = SubjectStats if subject else StudentStats
+        total, present = stats.total, stats.present
+        stmt = select(stats.roll_no, total, present).where(total > 0)
+        if subject: stmt = stmt.where(SubjectStats.subject == subject)
+    stmt = stmt.subquery()
+    total, present = stmt.c[1], stmt.c[2]
+    query = (select(Student.roll_no, Student.name, Student.course, total, present)
+             .join(stmt, stmt.c.roll_no == Student.roll_no)
+             .where(present * 100 < total * threshold)
+             .order_by(present * 1.0 / total, Student.roll_no))
+    if course: query = query.where(Student.course == course)
+    return [{'roll_no': roll, 'name': name, 'course': c, 'total': t, 'present': p, 'rate': rate(p, t)}
+            for roll, name, c, t, p in db.session.execute(query)]
+
+# --- BUNKS BY LOCATION / HOUR ---
+def bunk_counts(course=None, date_from=None, date_to=None):
+    hour = hour_of(Bunking.time).label('hour')
+    location = func.coalesce(Bunking.location, 'Unknown').label('location')
+    stmt = select(location, hour, func.count()).where(*date_filters(Bunking.date, date_from, date_to))
+    if course: stmt = stmt.join(Student, Student.roll_no == Bunking.roll_no).where(Student.course == course)
+    cells = db.session.execute(stmt.group_by(location, hour).order_by(location, hour)).all()
+
+    by_location, by_hour = {}, {}
+    for loc, h, n in cells:
+        by_location[loc] = by_location.get(loc, 0) + n
+        by_hour[h] = by_hour.get(h, 0) + n
+    return {'total': sum(by_location.values()),
+            'by_location': [{'location': k, 'count': v} for k, v in sorted(by_location.items(), key=lambda kv: -kv[1])],
+            'by_hour': [{'hour': k, 'count': v} for k, v in sorted(by_hour.items())],
+            'by_location_hour': [{'location': loc, 'hour': h, 'count': n} for loc, h, n in cells]}
+
+# ==========================================
+# VERSION-KEYED CACHE
+# ==========================================
+class AnalyticsCache:
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # (report, params) -> (version, result)
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, report, params, compute):
+        """(result, version); recomputes only when attendance changed since the cached copy."""
+        version = data_version()
+        key = (report, tuple(sorted(params.items())))
+        with self.lock:
+            cached = self.entries.get(key)
+            if cached and cached[0] == version:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return cached[1], version
+            self.misses += 1
+        result = compute(**params)
+        with self.lock:
+            self.entries[key] = (version, result)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries: self.entries.popitem(last=False)
+        return result, version
+
+    def stats(self):
+        with self.lock: return {'entries': len(self.entries), 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,181 @@
+import copy
+import numpy as np
+from gallery import GalleryMatcher, EMBEDDING_DIM, normalize_rows, _as_templates
+
+# Exact search is fast enough for one batch; switch to IVF for campus rosters
+ANN_MIN_IDENTITIES = 5000
+DEFAULT_NPROBE = 8
+
+# ==========================================
+# IVF-FLAT INDEX (PURE NUMPY)
+# ==========================================
+class IVFFlatIndex:
+    """Inverted-file index over face templates (cosine / inner product).
+
+    Templates are bucketed by a spherical k-means coarse quantizer. A query
+    only scans the `nprobe` closest buckets, so recall is traded against
+    latency through `nprobe` (nprobe == nlist gives exact results).
+    Same add/remove/search/identify API as GalleryMatcher. An index that
+    grows online (built empty, or small) is re-trained whenever its
+    templates outgrow the training set by `retrain_growth`, so the buckets
+    never stay fitted to the first few identities.
+    """
+
+    def __init__(self, dim=EMBEDDING_DIM, nlist=None, nprobe=DEFAULT_NPROBE, train_iters=10, seed=0, retrain_growth=2.0):
+        self.dim = dim
+        self.nlist_config = nlist    # None = 4 * sqrt(templates) at each training
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.retrain_growth = retrain_growth
+        self.trained_on = 0          # templates the centroids were fitted to
+        self.train_iters = train_iters
+        self.rng = np.random.default_rng(seed)
+        self.centroids = None
+        self.list_vecs = []
+        self.list_ids = []
+        self.rolls = []          # identity id -> roll_no (None once removed)
+        self.id_of = {}          # roll_no -> identity id
+        self.lists_of = {}       # identity id -> buckets holding its templates
+
+    @classmethod
+    def from_dict(cls, faces_db, dim=EMBEDDING_DIM, **kwargs):
+        index = cls(dim, **kwargs)
+        vecs, ids = [], []
+        for roll, saved_data in faces_db.items():
+            templates = _as_templates(saved_data, dim)
+            if len(templates) == 0: continue
+            ident = index._new_identity(roll)
+            vecs.append(templates)
+            ids.append(np.full(len(templates), ident, dtype=np.int64))
+        if vecs:
+            index.train(np.vstack(vecs))
+            index._insert(np.vstack(vecs), np.concatenate(ids))
+        return index
+
+    def copy(self):
+        """Copy for update-then-swap: updates replace bucket arrays, never write into them, so they are shared."""
+        index = copy.copy(self)
+        index.list_vecs, index.list_ids, index.rolls = list(self.list_vecs), list(self.list_ids), list(self.rolls)
+        index.id_of = dict(self.id_of)
+        index.lists_of = {ident: set(lists) for ident, lists in self.lists_of.items()}
+        return index
+
+    def __len__(self): return len(self.id_of)
+
+    def __contains__(self, roll): return roll in self.id_of
+
+    @property
+    def num_templates(self): return sum(len(ids) for ids in self.list_ids)
+
+    # --- TRAINING (Spherical K-Means) ---
+    def train(self, vectors, max_samples_per_list=256):
+        data = normalize_rows(vectors)
+        n = data.shape[0]
+        nlist = self.nlist_config or max(1, int(4 * np.sqrt(n)))
+        nlist = min(nlist, n)
+        if n > nlist * max_samples_per_list:
+            data = data[self.rng.choice(n, nlist * max_samples_per_list, replace=False)]
+        centroids = data[self.rng.choice(data.shape[0], nlist, replace=False)].copy()
+        for _ in range(self.train_iters):
+            assign = self._nearest(data, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, data)
+            counts = np.bincount(assign, minlength=nlist)
+            empty = counts == 0
+            if empty.any():
+                # Re-seed dead buckets with random points
+                sums[empty] = data[self.rng.choice(data.shape[0], int(empty.sum()))]
+            centroids = normalize_rows(sums)
+        self.nlist, self.trained_on = nlist, n
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.list_vecs = [np.empty((0, self.dim), dtype=np.float32) for _ in range(nlist)]
+        self.list_ids = [np.empty(0, dtype=np.int64) for _ in range(nlist)]
+        for ident in self.lists_of: self.lists_of[ident] = set()
+
+    def retrain(self):
+        """Re-fit the quantizer on the current templates and re-bucket them (new bucket arrays, copy-safe)."""
+        vecs = [v for v in self.list_vecs if len(v)]
+        if not vecs: return
+        ids = np.concatenate([i for i in self.list_ids if len(i)])
+        vecs = np.vstack(vecs)
+        self.train(vecs)
+        self._insert(vecs, ids)
+
+    @staticmethod
+    def _nearest(data, centroids, chunk=65536):
+        out = np.empty(data.shape[0], dtype=np.int64)
+        for s in range(0, data.shape[0], chunk):
+            out[s:s + chunk] = np.argmax(data[s:s + chunk] @ centroids.T, axis=1)
+        return out
+
+    # --- INCREMENTAL UPDATES (Registration / Deletion) ---
+    def _new_identity(self, roll):
+        ident = len(self.rolls)
+        self.rolls.append(roll)
+        self.id_of[roll] = ident
+        self.lists_of[ident] = set()
+        return ident
+
+    def _insert(self, vectors, ids):
+        assign = self._nearest(vectors, self.centroids)
+        for lst in np.unique(assign):
+            mask = assign == lst
+            self.list_vecs[lst] = np.vstack([self.list_vecs[lst], vectors[mask]])
+            self.list_ids[lst] = np.concatenate([self.list_ids[lst], ids[mask]])
+            for ident in np.unique(ids[mask]): self.lists_of[int(ident)].add(int(lst))
+
+    def add(self, roll, templates):
+        templates = _as_templates(templates, self.dim)
+        if roll in self.id_of: self.remove(roll)
+        if len(templates) == 0: return
+        if self.centroids is None: self.train(templates)
+        ident = self._new_identity(roll)
+        self._insert(templates, np.full(len(templates), ident, dtype=np.int64))
+        if self.retrain_growth and self.num_templates > self.retrain_growth * self.trained_on: self.retrain()
+
+    def remove(self, roll):
+        ident = self.id_of.pop(roll, None)
+        if ident is None: return False
+        for lst in self.lists_of.pop(ident):
+            keep = self.list_ids[lst] != ident
+            self.list_vecs[lst] = self.list_vecs[lst][keep]
+            self.list_ids[lst] = self.list_ids[lst][keep]
+        self.rolls[ident] = None
+        return True
+
+    # --- SEARCH ---
+    def search(self, embeddings, top_k=1, nprobe=None):
+        queries = normalize_rows(embeddings)
+        if self.centroids is None or len(self.id_of) == 0:
+            return [[] for _ in range(queries.shape[0])]
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        coarse = queries @ self.centroids.T
+        probes = np.argpartition(-coarse, nprobe - 1, axis=1)[:, :nprobe]
+        results = []
+        for q, probe in zip(queries, probes):
+            probe = [lst for lst in probe if len(self.list_ids[lst])]
+            if not probe:
+                results.append([])
+                continue
+            ids = np.concatenate([self.list_ids[lst] for lst in probe])
+            scores = np.concatenate([self.list_vecs[lst] @ q for lst in probe])
+            order = np.argsort(-scores, kind='stable')
+            # First hit of each identity in score order = its best template
+            _, first = np.unique(ids[order], return_index=True)
+            best = order[np.sort(first)[:top_k]]
+            results.append([(self.rolls[ids[i]], float(scores[i])) for i in best])
+        return results
+
+    def identify(self, embeddings, nprobe=None):
+        results = []
+        for hits in self.search(embeddings, top_k=1, nprobe=nprobe):
+            if hits and hits[0][1] > 0: results.append(hits[0])
+            else: results.append(("Unknown", 0.0))
+        return results
+
+
+def build_face_index(faces_db, ann_min_identities=ANN_MIN_IDENTITIES, **kwargs):
+    """Exact matcher for small galleries, IVF index once the roster is large."""
+    if ann_min_identities and len(faces_db) >= ann_min_identities:
+        return IVFFlatIndex.from_dict(faces_db, **kwargs)
+    return GalleryMatcher.from_dict(faces_db)
@@ -1,17 +1,33 @@
 import cv2
 import numpy as np
 import os
-import pickle
 import traceback
 import time
 import threading
 import warnings
-from datetime import datetime
-from threading import Thread
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
+from datetime import datetime, date
+from flask import Flask, Response, stream_with_context, render_template, request, jsonify, redirect, url_for, flash
 from flask_login import LoginManager, login_user, login_required, logout_user, current_user
-from insightface.app import FaceAnalysis
-from models import db, User, Student, Teacher, Attendance, Schedule, Bunking
+from models import db, User, Student, Teacher, Attendance, Schedule, Bunking, as_date, as_time
+from ann_index import ANN_MIN_IDENTITIES
+from embedding_store import EmbeddingStore, migrate_pickle
+from gallery_service import SharedGallery
+from sessions import SessionManager
+from camera_sources import CameraStream, make_source
+from batch_inference import BatchInferenceService
+from face_models import get_face_model
+from enrollment import check_pose, POSE_PLAN, discover, enroll_batch
+from jobs import JobQueue
+from face_templates import TemplateUpdater, UPDATE_CONFIG
+from evidence_writer import EvidenceWriter, KEPT_DIR
+from attendance_service import save_attendance, finalize_lecture, record_bunk
+from clash_detection import ClashDetector
+from attendance_stats import StatsDelta, student_summary, ensure_stats, bump_version
+from pagination import keyset_page
+from timetable_io import iter_rows, detect_format, import_timetable, export_query, export_timetable, schedule_version, bump_schedule_days
+from db_config import configure_database, WriteQueue
+from alert_bus import AlertBus, parse_cursor, deltas, sse_format
+from analytics import AnalyticsCache, attendance_rates, below_threshold, bunk_counts, GROUPS, DEFAULT_THRESHOLD
 
 # Suppress Warnings
 warnings.simplefilter(action='ignore', category=FutureWarning)
@@ -22,91 +38,68 @@ app = Flask(__name__)
 # 1. CONFIGURATION
 # ==========================================
 app.config['SECRET_KEY'] = 'secret-key-123'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///attendance.db'
+configure_database(app) # SQLite (WAL) by default, DATABASE_URL=postgresql://... for PostgreSQL
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 db.init_app(app)
+# Small writes (bunk records) are grouped into one transaction per ~20 ms by a single writer thread
+write_queue = WriteQueue(app, max_batch=100, max_wait_ms=20)
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 
+# Timetable admins (comma-separated teacher emails): import for other teachers, export everything
+ADMIN_EMAILS = {e.strip().lower() for e in os.environ.get('ADMIN_EMAILS', '').split(',') if e.strip()}
+
+def is_admin(user): return user.role == 'teacher' and user.email.lower() in ADMIN_EMAILS
+
+@app.template_filter('hhmm')
+def hhmm(value): return value.strftime('%H:%M') if value else ''
+
 @login_manager.user_loader
 def load_user(user_id): return User.query.get(int(user_id))
 
 if not os.path.exists('embeddings'): os.makedirs('embeddings')
 if not os.path.exists('static/bunk_proofs'): os.makedirs('static/bunk_proofs')
-PICKLE_DB_PATH = 'embeddings/insight_db.pkl'
+PICKLE_DB_PATH = 'embeddings/insight_db.pkl' # Legacy store, migrated by the startup hook (not on import)
+# Gallery size at which matching switches to the IVF index (0 = always exact)
+FACE_ANN_MIN_IDENTITIES = int(os.environ.get('FACE_ANN_MIN_IDENTITIES', ANN_MIN_IDENTITIES))
 
 # ==========================================
 # 2. AI SETUP (HIGH ACCURACY)
 # ==========================================
-app_face = None
-known_faces_db = {}
-
-try:
-    print("[INFO] Loading InsightFace (buffalo_l) - High Accuracy Mode...")
-    # Using Large Model for better detection
-    app_face = FaceAnalysis(name='buffalo_l', providers=['CPUExecutionProvider'])
-    app_face.prepare(ctx_id=0, det_size=(640, 640))
-    
-    if os.path.exists(PICKLE_DB_PATH):
-        with open(PICKLE_DB_PATH, 'rb') as f: known_faces_db = pickle.load(f)
-    print(f"[INFO] AI Ready. Loaded {len(known_faces_db)} users.")
-except Exception as e: print(f"AI Error: {e}")
+# Face models load lazily on first use (see face_models.MODEL_TIERS), so
+# importing app for scripts and web workers never pays the model load.
+
+# Face templates: memory-mapped store (the old pickle is imported once, see startup())
+face_store = EmbeddingStore('embeddings')
+# Shared gallery over the same memory map: writes from any process (other web
+# workers, delete_user.py, batch_enroll.py) show up within check_interval seconds
+GALLERY_CONFIG = {'check_interval': 1.0}
+face_gallery = SharedGallery('embeddings', ann_min_identities=FACE_ANN_MIN_IDENTITIES, **GALLERY_CONFIG)
+print(f"[INFO] Gallery Ready. Loaded {len(face_gallery)} users.")
 
 # ==========================================
-# 3. FAST CAMERA STREAM CLASS
+# 3. CAMERA STREAMS (see camera_sources.py)
 # ==========================================
-class WebcamStream:
-    def __init__(self, src=0):
-        self.stream = cv2.VideoCapture(src)
-        (self.grabbed, self.frame) = self.stream.read()
-        self.stopped = False
-
-    def start(self):
-        Thread(target=self.update, args=()).start()
-        return self
-
-    def update(self):
-        while True:
-            if self.stopped: return
-            (self.grabbed, self.frame) = self.stream.read()
-
-    def read(self): return self.frame
-    def stop(self): self.stopped = True; self.stream.release()
+# One grab thread per camera: at most target_fps frames are decoded (the
+# detection scheduler never asks for more), already scaled to the 1024px
+# detection width, and a dropped IP camera is reconnected with backoff.
+# CAMERA_BACKEND=opencv reads HTTP cameras through cv2.VideoCapture instead.
+CAMERA_CONFIG = {'target_fps': 15.0, 'ring_size': 8, 'backoff_s': 0.5, 'max_backoff_s': 30.0,
+                 # multires refines faces on the native frame, so it keeps the full resolution
+                 'decode_width': None if os.environ.get('DETECTION_MODE') == 'multires' else 1024}
+CAMERA_BACKEND = os.environ.get('CAMERA_BACKEND', 'auto')
+
+def open_camera(src):
+    return CameraStream(make_source(src, backend=CAMERA_BACKEND), **CAMERA_CONFIG)
 
 # ==========================================
 # 4. HELPER FUNCTIONS
 # ==========================================
-def load_pickle_db():
-    if os.path.exists(PICKLE_DB_PATH):
-        with open(PICKLE_DB_PATH, 'rb') as f: return pickle.load(f)
-    return {}
-
-def save_pickle_db(data):
-    with open(PICKLE_DB_PATH, 'wb') as f: pickle.dump(data, f)
-
-def check_pose(face, target_pose):
-    try:
-        kps = face.kps
-        nose_x = kps[2][0]
-        eye_center = (kps[0][0] + kps[1][0]) / 2
-        eye_dist = kps[1][0] - kps[0][0]
-        if eye_dist < 10: return False, 0.0
-        
-        ratio = (nose_x - eye_center) / eye_dist 
-        
-        is_valid = False
-        # Strict thresholds for High Accuracy Model
-        if target_pose == "CENTER" and abs(ratio) < 0.15: is_valid = True
-        elif target_pose == "LEFT" and ratio < -0.20: is_valid = True
-        elif target_pose == "RIGHT" and ratio > 0.20: is_valid = True
-        return is_valid, ratio
-    except: return False, 0.0
-
 # --- CAPTURE WINDOW (REGISTRATION) ---
-def start_capture_window(roll_no):
-    global app_face
+def start_capture_window(roll_no, progress=None):
+    app_face = get_face_model('enrollment')
     if app_face is None: 
         return False, "AI Model Not Loaded"
 
@@ -122,7 +115,7 @@ def start_capture_window(roll_no):
         return False, "Cannot Connect to Camera"
     
     samples = []
-    tasks = ["CENTER", "LEFT", "RIGHT", "CENTER", "CENTER"]
+    tasks = POSE_PLAN
     current_step = 0
     
     while current_step < len(tasks):
@@ -149,6 +142,7 @@ def start_capture_window(roll_no):
                 emb = face.embedding / np.linalg.norm(face.embedding)
                 samples.append(emb)
                 current_step += 1
+                if progress: progress(current_step / len(tasks), f"Captured {current_step}/{len(tasks)} ({target_pose})")
                 cv2.waitKey(300)
             else:
                 color = (0, 0, 255)
@@ -178,97 +172,117 @@ def start_capture_window(roll_no):
     
     if len(samples) >= 5:
         try:
-            faces_data = load_pickle_db()
-            faces_data[roll_no] = samples # Saving Multi-Template List
-            save_pickle_db(faces_data)
-            global known_faces_db
-            known_faces_db = faces_data
+            face_store.append(roll_no, samples) # Saving Multi-Template List (O(1) append)
+            face_gallery.sync() # Other processes pick it up on their next check
             return True, "Success"
         except Exception as e: 
             return False, f"Save Error: {str(e)}"
             
     return False, "Incomplete Capture"
 
-# --- SURVEILLANCE WORKER (HIGH ACCURACY + MONITOR) ---
-surveillance_active = False
-current_lecture_info = {}
-current_alerts = []
-alert_lock = threading.Lock()
-
-def surveillance_worker(camera_url):
-    global surveillance_active, current_alerts, known_faces_db
-    
+# --- SURVEILLANCE SESSIONS (MULTI-CAMERA, SHARED MODEL + GALLERY) ---
+# UPDATE IP HERE (or set CAMERA_URL); extra locations via CAMERA_<LOCATION>=url
+DEFAULT_CAMERA_URL = os.environ.get('CAMERA_URL', "http://192.168.1.102:8080/video")
+CAMERA_LOCATIONS = {'Canteen': DEFAULT_CAMERA_URL}
+CAMERA_LOCATIONS.update({k[len('CAMERA_'):].title(): v for k, v in os.environ.items() if k.startswith('CAMERA_') and k != 'CAMERA_URL'})
+
+# Frames from all cameras are batched for up to max_wait_ms before inference
+INFERENCE_CONFIG = {'max_batch': 8, 'max_wait_ms': 10}
+inference_service = BatchInferenceService(get_model=lambda: get_face_model('surveillance'), **INFERENCE_CONFIG)
+
+# Recognize each tracked face once, then every K frames (sooner while unconfirmed)
+TRACKER_CONFIG = {'iou_threshold': 0.3, 'max_missed': 10, 'recheck_every': 15, 'weak_recheck_every': 3,
+                  'min_confidence': 0.60, 'min_hits': 2}
+
+# Skip detection on static scenes; lower the detection rate when the detector lags
+MOTION_GATE_CONFIG = {'width': 160, 'pixel_threshold': 25, 'min_changed_ratio': 0.004, 'max_idle_s': 2.0}
+SCHEDULER_CONFIG = {'target_fps': 10.0, 'max_interval': 10}
+
+# 'single' = 1024x768 pass (default); 'multires' = low-res sweep + full-res ROI refinement
+DETECTION_CONFIG = {'mode': os.environ.get('DETECTION_MODE', 'single'),
+                    'low_width': 640, 'low_size': (320, 320), 'refine_size': (128, 128), 'margin': 0.5}
+# Normalized (x1, y1, x2, y2) rectangles per camera location, e.g. to skip the ceiling:
+# 'Canteen': {'include': [(0.0, 0.25, 1.0, 1.0)], 'exclude': [(0.8, 0.25, 1.0, 0.5)]}
+CAMERA_ZONES = {}
+
+# Bunk proofs: face crop + context thumbnail, one per student per cooldown, capped folder size
+EVIDENCE_CONFIG = {'workers': 2, 'jpeg_quality': 85, 'thumb_width': 320, 'cooldown_s': 60, 'quota_mb': 500}
+evidence_writer = EvidenceWriter('static/bunk_proofs', **EVIDENCE_CONFIG)
+
+# Live alert push: SSE clients resume from their last event id; stream is recycled every few minutes
+alert_bus = AlertBus(history=1024)
+ALERT_STREAM_CONFIG = {'heartbeat_s': 15, 'max_age_s': 300, 'retry_ms': 3000}
+
+# Online template refresh from confident surveillance matches (TEMPLATE_UPDATES=0 to disable)
+template_updater = TemplateUpdater(face_store, get_gallery=lambda: face_gallery, **UPDATE_CONFIG) \
+    if os.environ.get('TEMPLATE_UPDATES', '1') != '0' else None
+
+def finalize_session(session):
+    # Lecture over: everyone not caught bunking is marked Present
+    info = session.lecture_info
+    with app.app_context():
+        try: finalize_lecture(info.get('course'), info.get('subject'), info.get('date'))
+        except Exception as e: print(f"[ERROR] {e}")
+
+session_manager = SessionManager(get_model=lambda: get_face_model('surveillance'), get_gallery=lambda: face_gallery,
+                                 stream_factory=open_camera, inference=inference_service,
+                                 tracker_config=TRACKER_CONFIG, gate_config=MOTION_GATE_CONFIG,
+                                 scheduler_config=SCHEDULER_CONFIG, detection_config=DETECTION_CONFIG,
+                                 camera_zones=CAMERA_ZONES, evidence=evidence_writer, bus=alert_bus,
+                                 updater=template_updater, on_ended=finalize_session)
+
+# --- BACKGROUND JOBS (enrollment off the request thread) ---
+# Worker threads per job kind: one capture at a time (one camera, one window)
+JOB_CONFIG = {'capture': 1, 'enroll_batch': 1}
+ENROLL_WORKERS = int(os.environ.get('ENROLL_WORKERS', min(4, os.cpu_count() or 1))) # processes per batch job
+UPLOAD_DIR = 'uploads'
+job_queue = JobQueue(app, writer=write_queue, progress_interval=0.5)
+
+@job_queue.handler('capture', concurrency=JOB_CONFIG['capture'])
+def capture_job(ctx, roll_no):
+    ctx.progress(0, "Opening camera...", force=True)
+    success, msg = start_capture_window(roll_no, progress=ctx.progress)
+    if not success: raise RuntimeError(msg)
+    return {'roll_no': roll_no, 'msg': "Face Saved!"}
+
+@job_queue.handler('enroll_batch', concurrency=JOB_CONFIG['enroll_batch'])
+def enroll_batch_job(ctx, path, replace=False):
     try:
-        stream = WebcamStream(src=camera_url).start()
-    except:
-        stream = WebcamStream(src=0).start()
-
-    detection_counts = {}
-    
-    while surveillance_active:
-        frame = stream.read()
-        if frame is None: 
-            time.sleep(0.01)
-            continue
-            
-        # 1024px for better detection
-        frame_large = cv2.resize(frame, (1024, 768)) 
-        faces = app_face.get(frame_large)
-        
-        for face in faces:
-            emb = face.embedding
-            emb = emb / np.linalg.norm(emb)
-            max_score = 0
-            identity = "Unknown"
-            color = (0, 0, 255)
-            
-            for roll, saved_data in known_faces_db.items():
-                # Multi-Template Matching
-                if isinstance(saved_data, list):
-                    scores = [np.dot(emb, saved_emb) for saved_emb in saved_data]
-                    best_score = max(scores)
-                else:
-                    best_score = np.dot(emb, saved_data)
-                
-                if best_score > max_score:
-                    max_score = best_score
-                    identity = roll
-            
-            # Threshold 0.50 for Buffalo_L
-            if max_score > 0.50 and identity != "Unknown":
-                color = (0, 255, 0)
-                detection_counts[identity] = detection_counts.get(identity, 0) + 1
-                
-                if detection_counts[identity] >= 2: # 2 Consistent Frames
-                    detection_counts[identity] = 0
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    filename = f"{identity}_{timestamp}.jpg"
-                    filepath = os.path.join('static/bunk_proofs', filename)
-                    cv2.imwrite(filepath, frame)
-                    
-                    with alert_lock:
-                        if not any(a['roll'] == identity for a in current_alerts):
-                            current_alerts.append({
-                                'roll': identity, 'time': datetime.now().strftime("%H:%M"),
-                                'image': f"/static/bunk_proofs/{filename}", 'score': int(max_score*100)
-                            })
-
-            # Draw on Monitor
-            box = face.bbox.astype(int)
-            cv2.rectangle(frame_large, (box[0], box[1]), (box[2], box[3]), color, 2)
-            label = f"{identity} {int(max_score*100)}%"
-            cv2.putText(frame_large, label, (box[0], box[1] - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
-
-        # Display Window
-        disp_frame = cv2.resize(frame_large, (800, 600))
-        cv2.rectangle(disp_frame, (0, 0), (800, 30), (0,0,0), -1)
-        cv2.putText(disp_frame, "CANTEEN SURVEILLANCE (LIVE MONITOR)", (10, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
-        
-        cv2.imshow("Surveillance Monitor", disp_frame)
-        if cv2.waitKey(1) & 0xFF == ord('q'): break
+        jobs = discover(path)
+        ctx.progress(0, f"0/{len(jobs)} students processed", force=True)
+        report = enroll_batch(jobs, face_store, ENROLL_WORKERS, replace=replace,
+                              progress=lambda done, total, _: ctx.progress(done / max(total, 1), f"{done}/{total} students processed"))
+        face_gallery.sync()
+        return report
+    finally:
+        if os.path.exists(path): os.remove(path)
+
+def keep_recorded_proofs():
+    # Bunks recorded before proofs were moved on record still point into the evictable folder
+    prefix = evidence_writer.url_prefix + '/'
+    for bunk in Bunking.query.filter(Bunking.proof_image.like(prefix + '%'),
+                                     Bunking.proof_image.notlike(f"{prefix}{KEPT_DIR}/%")).all():
+        bunk.proof_image = evidence_writer.keep(bunk.proof_image)
+    db.session.commit()
 
-    stream.stop()
-    cv2.destroyAllWindows()
+# --- STARTUP (once per serving process, under `python app.py` and WSGI servers alike) ---
+# Runs before the first request rather than on import: scripts that import app
+# (delete_user.py, timetable_cli.py, ...) must not migrate the pickle or touch a live server's jobs.
+startup_lock = threading.Lock()
+startup_done = False
+
+@app.before_request
+def startup():
+    global startup_done
+    if startup_done: return
+    with startup_lock:
+        if startup_done: return
+        if migrate_pickle(face_store, PICKLE_DB_PATH): face_gallery.sync()
+        db.create_all()
+        ensure_stats()       # counters backfilled on the first start after an upgrade
+        job_queue.recover()  # only jobs whose process is gone (other live workers keep theirs)
+        keep_recorded_proofs()
+        startup_done = True
 
 # ==========================================
 # 5. ROUTES
@@ -300,8 +314,8 @@ def logout():
 @login_required
 def teacher_dashboard():
     if current_user.role != 'teacher': return redirect(url_for('login'))
-    today = datetime.now().strftime('%Y-%m-%d')
-    current_time = datetime.now().strftime('%H:%M')
+    today = date.today()
+    current_time = datetime.now().time()
     
     upcoming = Schedule.query.filter(Schedule.teacher_email == current_user.email, Schedule.date >= today).all()
     history = Schedule.query.filter(Schedule.teacher_email == current_user.email, Schedule.date < today).all()
@@ -311,7 +325,7 @@ def teacher_dashboard():
                            schedules=upcoming, 
                            history=history,
                            current_time=current_time,
-                           is_live=surveillance_active)
+                           is_live=bool(session_manager.for_teacher(current_user.email)))
 
 # --- STUDENT DASHBOARD ---
 @app.route("/student_dashboard")
@@ -322,37 +336,26 @@ def student_dashboard():
     student = Student.query.filter_by(email=current_user.email).first()
     if not student: return "Student record not found. Contact Admin."
 
-    # 1. Fetch All Attendance Records
-    attendance_records = Attendance.query.filter_by(roll_no=student.roll_no).order_by(Attendance.date.desc()).all()
-    
-    # 2. Fetch Bunking Records
-    bunks = Bunking.query.filter_by(roll_no=student.roll_no).order_by(Bunking.date.desc()).all()
-    
-    # 3. Calculate Stats
-    total_lectures = len(attendance_records)
-    present_count = sum(1 for r in attendance_records if r.status == 'Present')
+    # 1. Counters from the aggregate table (one row, not the whole history)
+    stats = student_summary(student.roll_no)
     
-    # Total Absent (Normal Absent + Bunks)
-    absent_count = sum(1 for r in attendance_records if r.status == 'Absent') 
-    
-    # Real Bunk Count (Only Surveillance Caught)
-    real_bunk_count = len(bunks)
-    
-    attendance_percentage = 0
-    if total_lectures > 0:
-        attendance_percentage = round((present_count / total_lectures) * 100, 1)
+    # 2. Only what the page shows: latest 5 lectures, latest 3 bunks
+    attendance_records = Attendance.query.filter_by(roll_no=student.roll_no).order_by(Attendance.date.desc(), Attendance.time.desc()).limit(5).all()
+    bunks = Bunking.query.filter_by(roll_no=student.roll_no).order_by(Bunking.date.desc(), Bunking.time.desc()).limit(3).all()
 
     return render_template("student_dashboard.html", 
                            user=current_user, 
                            student=student, 
                            attendance_records=attendance_records,
-                           total_lectures=total_lectures,
-                           present_count=present_count,
-                           absent_count=absent_count,    
-                           bunk_count=real_bunk_count,
-                           percentage=attendance_percentage,
+                           total_lectures=stats['total'],
+                           present_count=stats['present'],
+                           absent_count=stats['absent'],    
+                           bunk_count=stats['bunks'],
+                           percentage=stats['percentage'],
                            bunks=bunks)
 
+HISTORY_PAGE_SIZE = 50
+
 # --- NEW: STUDENT BUNK HISTORY PAGE ---
 @app.route("/student_bunk_history")
 @login_required
@@ -360,9 +363,11 @@ def student_bunk_history():
     if current_user.role != 'student': return redirect(url_for('login'))
     
     student = Student.query.filter_by(email=current_user.email).first()
-    bunks = Bunking.query.filter_by(roll_no=student.roll_no).order_by(Bunking.date.desc(), Bunking.time.desc()).all()
+    bunks, next_cursor = keyset_page(Bunking.query.filter_by(roll_no=student.roll_no),
+                                     [Bunking.date, Bunking.time, Bunking.id], request.args.get('before'), HISTORY_PAGE_SIZE)
     
-    return render_template("student_bunk_history.html", bunks=bunks, student=student)
+    return render_template("student_bunk_history.html", bunks=bunks, student=student, next_cursor=next_cursor,
+                           first_page=not request.args.get('before'))
 
 # --- NEW: STUDENT ATTENDANCE HISTORY PAGE ---
 @app.route("/student_attendance_history")
@@ -371,9 +376,11 @@ def student_attendance_history():
     if current_user.role != 'student': return redirect(url_for('login'))
     
     student = Student.query.filter_by(email=current_user.email).first()
-    records = Attendance.query.filter_by(roll_no=student.roll_no).order_by(Attendance.date.desc(), Attendance.time.desc()).all()
+    records, next_cursor = keyset_page(Attendance.query.filter_by(roll_no=student.roll_no),
+                                       [Attendance.date, Attendance.time, Attendance.id], request.args.get('before'), HISTORY_PAGE_SIZE)
     
-    return render_template("student_attendance_history.html", records=records, student=student)
+    return render_template("student_attendance_history.html", records=records, student=student, next_cursor=next_cursor,
+                           first_page=not request.args.get('before'))
 
 @app.route("/schedule_lecture")
 @login_required
@@ -382,6 +389,21 @@ def schedule_lecture():
     data = Schedule.query.get(edit_id) if edit_id else None
     return render_template("schedule_lecture.html", edit_data=data)
 
+# --- SCHEDULE CLASH INDEX (per-day interval lists, cached) ---
+def schedule_slot(sch):
+    return {'teacher_email': sch.teacher_email, 'course': sch.course, 'classroom': sch.classroom,
+            'date': sch.date, 'start_time': sch.start_time, 'end_time': sch.end_time}
+
+def load_schedule_day(day):
+    return [(sch.id, schedule_slot(sch)) for sch in Schedule.query.filter_by(date=day).all()]
+
+def clash_message(key, lecture):
+    if key == 'teacher_email': return "Clash! You are busy."
+    if key == 'course': return f"Clash! {lecture['course']} is busy."
+    return f"Clash! Room {lecture['classroom']} occupied."
+
+clash_detector = ClashDetector(load_schedule_day, schedule_version)
+
 @app.route('/save_schedule', methods=['POST'])
 @login_required
 def save_schedule():
@@ -390,52 +412,130 @@ def save_schedule():
         schedule_id = data.get('id')
         if 'id' in data: del data['id']
         
-        start = data.get('start_time')
-        end = data.get('end_time')
-        date = data.get('date')
+        data['date'] = day = as_date(data.get('date'))
+        data['start_time'] = start = as_time(data.get('start_time'))
+        data['end_time'] = end = as_time(data.get('end_time'))
         
         if start >= end: return jsonify({"status": "error", "msg": "Invalid Time Range!"})
 
-        clashes = Schedule.query.filter_by(date=date).all()
-        for lec in clashes:
-            if schedule_id and int(schedule_id) == lec.id: continue
-            if (start < lec.end_time) and (end > lec.start_time):
-                if lec.teacher_email == current_user.email: return jsonify({"status": "error", "msg": "Clash! You are busy."})
-                if lec.course == data.get('course'): return jsonify({"status": "error", "msg": f"Clash! {data.get('course')} is busy."})
-                if lec.classroom == data.get('classroom'): return jsonify({"status": "error", "msg": f"Clash! Room {data.get('classroom')} occupied."})
-
         if schedule_id:
             sch = Schedule.query.get(schedule_id)
+            old_day = sch.date
+            lecture = {**data, 'teacher_email': sch.teacher_email}
+        else:
+            lecture = {**data, 'teacher_email': current_user.email}
+        clash = clash_detector.check(lecture, exclude=int(schedule_id) if schedule_id else None)
+        if clash: return jsonify({"status": "error", "msg": clash_message(clash[0], lecture)})
+
+        if schedule_id:
             sch.course = data.get('course')
             sch.subject = data.get('subject')
             sch.classroom = data.get('classroom')
-            sch.date = data.get('date')
-            sch.start_time = data.get('start_time')
-            sch.end_time = data.get('end_time')
+            sch.date = day
+            sch.start_time = start
+            sch.end_time = end
             msg = "Schedule Updated!"
         else:
-            new = Schedule(teacher_email=current_user.email, teacher_name=current_user.name, **data)
-            db.session.add(new)
+            sch = Schedule(teacher_email=current_user.email, teacher_name=current_user.name, **data)
+            db.session.add(sch)
             msg = "Lecture Scheduled!"
 
+        versions = bump_schedule_days([day, old_day] if schedule_id else [day])
         db.session.commit()
+        if schedule_id: clash_detector.update(sch.id, old_day, schedule_slot(sch), versions)
+        else: clash_detector.add(sch.id, schedule_slot(sch), versions[day])
         return jsonify({"status": "success", "msg": msg})
     except Exception as e: return jsonify({"status": "error", "msg": str(e)})
 
+# --- BULK TIMETABLE (CSV / JSON / JSON lines) ---
+@app.route('/import_schedule', methods=['POST'])
+@login_required
+def import_schedule():
+    # Multipart upload ('file') or the raw body. Lectures are booked for the uploader; only admins
+    # may import rows for other teachers (rows without teacher_email still default to the uploader)
+    if current_user.role != 'teacher': return jsonify({"status": "error", "msg": "Teachers only"}), 403
+    me = {'teacher_email': current_user.email, 'teacher_name': current_user.name}
+    upload = request.files.get('file')
+    stream = upload.stream if upload else request.stream
+    fmt = request.args.get('format') or detect_format(upload.filename if upload else '', request.content_type)
+    try:
+        report = import_timetable(iter_rows(stream, fmt), clash_detector, defaults=me,
+                                  overrides=None if is_admin(current_user) else me,
+                                  dry_run=request.args.get('dry_run') == '1')
+    except ValueError as e: return jsonify({"status": "error", "msg": f"Could not parse {fmt.upper()}: {e}"})
+    msg = f"Imported {report['inserted']} of {report['total']} lectures ({len(report['errors'])} rejected)"
+    return jsonify({"status": "success" if not report['errors'] else "partial", "msg": msg, **report})
+
+@app.route('/export_schedule')
+@login_required
+def export_schedule():
+    # Own lectures by default, ?all=1 (admins only) for the whole timetable
+    if current_user.role != 'teacher': return jsonify({"status": "error", "msg": "Teachers only"}), 403
+    if request.args.get('all') == '1' and not is_admin(current_user): return jsonify({"status": "error", "msg": "Admins only"}), 403
+    fmt = request.args.get('format', 'csv')
+    teacher = None if request.args.get('all') == '1' else current_user.email
+    schedules = export_query(teacher, request.args.get('from'), request.args.get('to'))
+    mimetype = {'csv': 'text/csv', 'json': 'application/json', 'jsonl': 'application/x-ndjson'}.get(fmt, 'application/json')
+    return Response(stream_with_context(export_timetable(schedules, fmt)), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename=timetable.{fmt}'})
+
 @app.route('/delete_schedule/<int:id>', methods=['POST'])
 @login_required
 def delete_schedule(id):
-    Schedule.query.filter_by(id=id).delete()
-    db.session.commit()
+    sch = Schedule.query.get(id)
+    if sch:
+        db.session.delete(sch)
+        versions = bump_schedule_days([sch.date])
+        db.session.commit()
+        clash_detector.remove(id, sch.date, versions[sch.date])
     return jsonify({"status": "success"})
 
 @app.route('/trigger_capture', methods=['POST'])
 def trigger_capture():
-    try:
-        success, msg = start_capture_window(request.json.get('roll_no'))
-        if success: return jsonify({"status": "success", "msg": "Face Saved!"})
-        else: return jsonify({"status": "error", "msg": msg})
-    except Exception as e: return jsonify({"status": "error", "msg": str(e)})
+    # Returns at once; the page polls /jobs/<job_id> while the capture window runs
+    roll_no = (request.get_json(silent=True) or {}).get('roll_no')
+    if not roll_no: return jsonify({"status": "error", "msg": "Roll number required"})
+    job_id = job_queue.submit('capture', {'roll_no': roll_no})
+    return jsonify({"status": "queued", "job_id": job_id, "msg": "Capture queued"})
+
+@app.route('/enroll_upload', methods=['POST'])
+@login_required
+def enroll_upload():
+    # Zip of <roll_no>/ folders (photos / clips) -> one batch enrollment job
+    if current_user.role != 'teacher': return jsonify({"status": "error", "msg": "Teachers only"}), 403
+    upload = request.files.get('file')
+    if not upload or not upload.filename.lower().endswith('.zip'): return jsonify({"status": "error", "msg": "Upload a .zip file"})
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    path = os.path.join(UPLOAD_DIR, f"enroll_{int(time.time() * 1000)}.zip")
+    upload.save(path)
+    job_id = job_queue.submit('enroll_batch', {'path': path, 'replace': request.form.get('replace') == '1'},
+                              owner=current_user.email)
+    return jsonify({"status": "queued", "job_id": job_id, "msg": "Enrollment queued"})
+
+@app.route('/jobs')
+@login_required
+def list_jobs():
+    return jsonify(job_queue.recent(current_user.email))
+
+def visible_job(job_id):
+    # Anonymous jobs (registration capture) are reachable by id; owned jobs only by their owner
+    job = job_queue.get(job_id)
+    if job and job['owner'] and not (current_user.is_authenticated and current_user.email == job['owner']): return None
+    return job
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = visible_job(job_id)
+    if not job: return jsonify({"status": "error", "msg": "Unknown job"}), 404
+    return jsonify({"status": "success", "job": job})
+
+@app.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    job = visible_job(job_id)
+    if not job: return jsonify({"status": "error", "msg": "Unknown job"}), 404
+    if job['status'] == 'done': return jsonify({"status": "success", "result": job['result']})
+    if job['status'] == 'failed': return jsonify({"status": "error", "msg": job['error']})
+    return jsonify({"status": job['status'], "progress": job['progress'], "msg": job['message']})
 
 @app.route('/submit_student_details', methods=['POST'])
 def submit_student_details():
@@ -447,6 +547,7 @@ def submit_student_details():
         db.session.add(new_student)
         new_user = User(name=data['name'], email=data['email'], password=data['password'], role='student')
         db.session.add(new_user)
+        bump_version() # analytics join student names / courses
         db.session.commit()
         return jsonify({"status": "success"})
     except Exception as e: return jsonify({"status": "error", "msg": f"Server Error: {str(e)}"})
@@ -467,19 +568,19 @@ def submit_teacher_details():
 def take_attendance():
     course = request.args.get('course')
     students = Student.query.filter_by(course=course).all()
-    today_str = datetime.now().strftime('%Y-%m-%d')
-    existing_records = Attendance.query.filter_by(course=course, subject=request.args.get('subject'), date=today_str).all()
+    today = date.today()
+    existing_records = Attendance.query.filter_by(course=course, subject=request.args.get('subject'), date=today).all()
     attendance_map = {rec.roll_no: rec.status for rec in existing_records}
     
     # Fetch Bunkers to lock UI
-    bunks = Bunking.query.filter_by(date=today_str).all()
+    bunks = Bunking.query.filter_by(date=today).all()
     bunkers = [b.roll_no for b in bunks]
     
     return render_template("take_attendance.html", 
                            students=students, 
                            course=course, 
                            subject=request.args.get('subject'), 
-                           date=today_str, 
+                           date=today, 
                            attendance_map=attendance_map, 
                            bunkers=bunkers)
 
@@ -488,27 +589,8 @@ def take_attendance():
 def save_attendance_data():
     try:
         data = request.json
-        date = data.get('date')
-        bunks = Bunking.query.filter_by(date=date).all()
-        bunker_rolls = [b.roll_no for b in bunks]
-        
-        count_updated = 0
-        for record in data.get('attendance_data'):
-            final_status = record['status']
-            if record['roll_no'] in bunker_rolls:
-                final_status = 'Absent'
-            
-            existing = Attendance.query.filter_by(roll_no=record['roll_no'], subject=data.get('subject'), date=date).first()
-            if existing:
-                existing.status = final_status
-                count_updated += 1
-            else:
-                new_att = Attendance(
-                    roll_no=record['roll_no'], name=record['name'], subject=data.get('subject'), 
-                    course=data.get('course'), date=date, time=datetime.now().strftime('%H:%M'), status=final_status
-                )
-                db.session.add(new_att)
-        db.session.commit()
+        records = ((r['roll_no'], r['name'], r['status']) for r in data.get('attendance_data'))
+        _, count_updated = save_attendance(data.get('course'), data.get('subject'), data.get('date'), records)
         return jsonify({"status": "success", "msg": f"Saved! (Updated: {count_updated})"})
     except Exception as e: return jsonify({"status": "error", "msg": str(e)})
 
@@ -517,7 +599,12 @@ def save_attendance_data():
 def reset_attendance():
     try:
         data = request.json
-        Attendance.query.filter_by(course=data.get('course'), subject=data.get('subject'), date=data.get('date')).delete()
+        lecture = Attendance.query.filter_by(course=data.get('course'), subject=data.get('subject'), date=as_date(data.get('date')))
+        delta = StatsDelta()
+        for roll, subject, status in lecture.with_entities(Attendance.roll_no, Attendance.subject, Attendance.status):
+            delta.remove(roll, subject, status)
+        lecture.delete()
+        delta.apply()
         db.session.commit()
         return jsonify({"status": "success", "msg": "Reset Complete."})
     except Exception as e: return jsonify({"status": "error", "msg": str(e)})
@@ -525,61 +612,146 @@ def reset_attendance():
 @app.route('/start_lecture', methods=['POST'])
 @login_required
 def start_lecture():
-    global surveillance_active, current_lecture_info
-    if surveillance_active: return jsonify({"status": "error", "msg": "Running!"})
+    if current_user.role != 'teacher': return jsonify({"status": "error", "msg": "Teachers only"}), 403
     data = request.json
-    current_lecture_info = {"course": data.get('course'), "subject": data.get('subject'), "date": datetime.now().strftime('%Y-%m-%d'), "bunkers": []}
-    surveillance_active = True
-    cam_url = "http://192.168.1.102:8080/video" # Update IP
-    t = threading.Thread(target=surveillance_worker, args=(cam_url,))
-    t.daemon = True
-    t.start()
-    return jsonify({"status": "success"})
+    # Only configured cameras: the server never opens a URL / file named by the client
+    location = data.get('location') or 'Canteen'
+    if location not in CAMERA_LOCATIONS: return jsonify({"status": "error", "msg": f"Unknown camera location '{location}'"}), 400
+    cam_url = CAMERA_LOCATIONS[location]
+    # First lecture pays the (lazy) model load; fail fast if it cannot load
+    if get_face_model('surveillance') is None: return jsonify({"status": "error", "msg": "AI Model Not Loaded"})
+    lecture_info = {"course": data.get('course'), "subject": data.get('subject'), "date": date.today().isoformat(),
+                    "teacher_email": current_user.email}
+    if template_updater is not None: template_updater.start()
+    try:
+        session = session_manager.start(lecture_info, cam_url, location)
+    except RuntimeError as e: return jsonify({"status": "error", "msg": str(e)})
+    return jsonify({"status": "success", "session_id": session.id})
 
 @app.route('/stop_lecture', methods=['POST'])
 @login_required
 def stop_lecture():
-    global surveillance_active, current_lecture_info, current_alerts
-    surveillance_active = False
-    try:
-        course = current_lecture_info.get('course')
-        subject = current_lecture_info.get('subject')
-        date = current_lecture_info.get('date')
-        all_students = Student.query.filter_by(course=course).all()
-        bunker_rolls = [b.roll_no for b in Bunking.query.filter_by(date=date).all()]
-        for student in all_students:
-            if not Attendance.query.filter_by(roll_no=student.roll_no, subject=subject, date=date).first():
-                status = 'Absent' if student.roll_no in bunker_rolls else 'Present'
-                db.session.add(Attendance(roll_no=student.roll_no, name=student.name, course=course, subject=subject, date=date, time=datetime.now().strftime('%H:%M'), status=status))
-        db.session.commit()
-    except Exception as e: print(f"[ERROR] {e}")
-    with alert_lock: current_alerts = []
+    # One session if given, otherwise every lecture this teacher has running
+    session_id = (request.get_json(silent=True) or {}).get('session_id')
+    sessions = owned_sessions(session_id)
+    if sessions is None: return session_not_found()
+    for session in sessions:
+        if session_manager.stop(session.id) is not None: finalize_session(session)
     return jsonify({"status": "success"})
 
+def owned_sessions(session_id=None):
+    # Someone else's lecture looks exactly like a missing one (None -> 404)
+    if not session_id: return session_manager.for_teacher(current_user.email)
+    session = session_manager.get(session_id, current_user.email)
+    return [session] if session is not None else None
+
+def session_not_found(): return jsonify({"status": "error", "msg": "Session not found"}), 404
+
+def teacher_alerts(email):
+    return [a for s in session_manager.for_teacher(email) for a in s.get_alerts()]
+
 @app.route('/get_alerts')
 @login_required
-def get_alerts(): return jsonify(current_alerts)
+def get_alerts():
+    # Polling fallback. With ?cursor=N only the deltas since N are returned (same events as the SSE stream)
+    session_id = request.args.get('session_id')
+    if 'cursor' in request.args and not session_id:
+        email = current_user.email
+        events, latest = deltas(alert_bus, email, parse_cursor(request.args.get('cursor')), lambda: teacher_alerts(email))
+        return jsonify({"cursor": latest, "events": [{"id": seq, "type": kind, "data": data} for seq, kind, data in events]})
+    sessions = owned_sessions(session_id)
+    if sessions is None: return session_not_found()
+    return jsonify([a for s in sessions for a in s.get_alerts()])
+
+@app.route('/alerts/stream')
+@login_required
+def alert_stream():
+    # One login/DB lookup per connection instead of per poll
+    email = current_user.email
+    cursor = parse_cursor(request.headers.get('Last-Event-ID') or request.args.get('cursor'))
+    config = ALERT_STREAM_CONFIG
+
+    def generate(cursor):
+        yield f"retry: {config['retry_ms']}\n\n"
+        deadline = time.monotonic() + config['max_age_s']
+        while time.monotonic() < deadline:
+            events, cursor = deltas(alert_bus, email, cursor, lambda: teacher_alerts(email))
+            for seq, kind, data in events: yield sse_format(seq, kind, data)
+            if not events: yield ": ping\n\n"
+            alert_bus.wait(cursor, config['heartbeat_s'])
+
+    return Response(generate(cursor), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/surveillance_sessions')
+@login_required
+def surveillance_sessions():
+    return jsonify([s.info() for s in session_manager.for_teacher(current_user.email)])
+
+@app.route('/surveillance_stats')
+@login_required
+def surveillance_stats():
+    sessions = {s.id: {"info": s.info(), "stages": s.stats, "tracker": s.tracker.stats(),
+                     "scheduler": s.scheduler.stats(), "camera": s.stream.stats() if s.stream else None} for s in session_manager.for_teacher(current_user.email)}
+    return jsonify({"sessions": sessions, "inference": inference_service.stats(), "evidence": evidence_writer.stats(),
+                    "db_writer": write_queue.stats(), "jobs": job_queue.stats(),
+                    "templates": template_updater.stats() if template_updater else None,
+                    "gallery": face_gallery.stats()})
 
 @app.route('/action_bunking', methods=['POST'])
 @login_required
 def action_bunking():
-    global current_alerts
     data = request.json
     roll = data.get('roll_no')
-    with alert_lock:
-        if data.get('action') == 'mark':
-            alert = next((x for x in current_alerts if x['roll'] == roll), None)
-            if alert:
-                db.session.add(Bunking(roll_no=roll, name=roll, date=datetime.now().strftime('%Y-%m-%d'), time=alert['time'], proof_image=alert['image']))
-                db.session.commit()
-        current_alerts = [x for x in current_alerts if x['roll'] != roll]
+    sessions = owned_sessions(data.get('session_id'))
+    if sessions is None: return session_not_found()
+    session = session_manager.find_alert_session(roll, sessions)
+    if session and data.get('action') == 'mark' and any(a['roll'] == roll and a.get('proof') == 'saving' for a in session.get_alerts()):
+        return jsonify({"status": "error", "msg": "Proof photo is still being saved, try again in a moment."})
+    alert = session.pop_alert(roll) if session else None
+    if alert and data.get('action') == 'mark':
+        # The recorded proof leaves the quota-evicted folder; '' = the photo could not be saved
+        try: write_queue.submit(record_bunk, roll, roll, date.today(), as_time(alert['time']),
+                                alert.get('location', 'Canteen'), evidence_writer.keep(alert['image']) or '').result(timeout=10)
+        except Exception as e: return jsonify({"status": "error", "msg": str(e)})
     return jsonify({"status": "success"})
 
+# --- ANALYTICS (SQL aggregates, cached until attendance changes) ---
+analytics_cache = AnalyticsCache(max_entries=256)
+
+def analytics_response(report, compute, **params):
+    if current_user.role != 'teacher': return jsonify({"status": "error", "msg": "Teachers only"}), 403
+    try: result, version = analytics_cache.get(report, params, compute)
+    except ValueError as e: return jsonify({"status": "error", "msg": str(e)}), 400
+    return jsonify({"status": "success", "version": version, "data": result})
+
+def range_args():
+    return {'date_from': request.args.get('from'), 'date_to': request.args.get('to')}
+
+@app.route('/analytics/attendance')
+@login_required
+def analytics_attendance():
+    # ?group=course,subject (any of course / subject / date), ?course=, ?subject=, ?from=, ?to=
+    group_by = tuple(g for g in request.args.get('group', 'course,subject').split(',') if g in GROUPS) or ('course',)
+    return analytics_response('attendance', attendance_rates, group_by=group_by, course=request.args.get('course'),
+                              subject=request.args.get('subject'), **range_args())
+
+@app.route('/analytics/defaulters')
+@login_required
+def analytics_defaulters():
+    threshold = request.args.get('threshold', DEFAULT_THRESHOLD, type=float)
+    return analytics_response('defaulters', below_threshold, threshold=threshold, course=request.args.get('course'),
+                              subject=request.args.get('subject'), **range_args())
+
+@app.route('/analytics/bunks')
+@login_required
+def analytics_bunks():
+    return analytics_response('bunks', bunk_counts, course=request.args.get('course'), **range_args())
+
 @app.route("/student_register")
 def student_register(): return render_template("student_register.html")
 @app.route("/teacher_register")
 def teacher_register(): return render_template("teacher_register.html")
 
 if __name__ == "__main__":
-    with app.app_context(): db.create_all()
     app.run(debug=False, threaded=True)
\ No newline at end of file
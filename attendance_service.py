@@ -0,0 +1,93 @@
+from datetime import datetime
+from sqlalchemy import select, update
+from sqlalchemy.dialects import sqlite, postgresql
+from models import db, Student, Attendance, Bunking, as_date
+from attendance_stats import StatsDelta
+
+# ==========================================
+# BULK ATTENDANCE WRITES
+# ==========================================
+# One lecture = (course, subject, date). Every write here is a fixed number
+# of statements regardless of class size: read the lecture's rows once, diff
+# in memory, then one executemany INSERT and one executemany UPDATE (plus the
+# counter upserts in attendance_stats). The INSERT is ON CONFLICT DO NOTHING:
+# rows another writer added since the read (two teachers saving, or the
+# end-of-lecture finalize racing a manual save) are re-read and treated as
+# existing instead of failing the whole sheet on the unique constraint.
+
+def bunker_rolls(date):
+    return set(db.session.execute(select(Bunking.roll_no).where(Bunking.date == as_date(date)).distinct()).scalars())
+
+def existing_attendance(subject, date):
+    """roll_no -> [(id, status), ...] for one lecture, in one query."""
+    rows = db.session.execute(select(Attendance.id, Attendance.roll_no, Attendance.status)
+                              .where(Attendance.subject == subject, Attendance.date == as_date(date)))
+    existing = {}
+    for row_id, roll, status in rows: existing.setdefault(roll, []).append((row_id, status))
+    return existing
+
+def insert_new(rows):
+    """INSERT ... ON CONFLICT (lecture, roll) DO NOTHING; returns the rolls actually inserted."""
+    dialect = db.session.get_bind().dialect.name
+    stmt = (postgresql.insert if dialect == 'postgresql' else sqlite.insert)(Attendance)
+    stmt = stmt.on_conflict_do_nothing(index_elements=['subject', 'date', 'roll_no']).returning(Attendance.roll_no)
+    return set(db.session.execute(stmt, rows).scalars())
+
+def save_attendance(course, subject, date, records, overwrite=True):
+    """Upsert (roll_no, name, status) records for a lecture; bunkers are always Absent.
+
+    With overwrite=False students that already have a row are left alone
+    (auto-marking at the end of a lecture must not undo manual edits).
+    Returns (inserted, matched) where matched counts students that already had a row.
+    """
+    date = as_date(date)
+    bunkers = bunker_rolls(date)
+    existing = existing_attendance(subject, date)
+    now = datetime.now().time().replace(second=0, microsecond=0)
+
+    inserts, updates, matched, seen = {}, [], 0, set()
+    delta = StatsDelta()
+
+    def overwrite_rows(roll, rows, status):
+        for row_id, old in rows:
+            if old == status: continue
+            updates.append({'id': row_id, 'status': status})
+            delta.change(roll, subject, old, status)
+
+    for roll, name, status in records:
+        if roll in seen: continue
+        seen.add(roll)
+        status = 'Absent' if roll in bunkers else status
+        rows = existing.get(roll)
+        if rows is None:
+            inserts[roll] = {'roll_no': roll, 'name': name, 'course': course, 'subject': subject,
+                             'date': date, 'time': now, 'status': status}
+            continue
+        matched += 1
+        if overwrite: overwrite_rows(roll, rows, status)
+
+    inserted = insert_new(list(inserts.values())) if inserts else set()
+    for roll in inserted: delta.add(roll, subject, inserts[roll]['status'])
+    lost = [roll for roll in inserts if roll not in inserted] # marked by another writer since the read above
+    if lost:
+        existing = existing_attendance(subject, date)
+        for roll in lost:
+            matched += 1
+            if overwrite: overwrite_rows(roll, existing.get(roll, []), inserts[roll]['status'])
+
+    if updates: db.session.execute(update(Attendance), updates)
+    delta.apply() # aggregate counters, same transaction
+    db.session.commit()
+    return len(inserted), matched
+
+def finalize_lecture(course, subject, date):
+    """Mark everyone in the course without a row: Present, or Absent if caught bunking."""
+    students = db.session.execute(select(Student.roll_no, Student.name).where(Student.course == course))
+    return save_attendance(course, subject, date, ((roll, name, 'Present') for roll, name in students), overwrite=False)
+
+def record_bunk(roll, name, day, at, location, proof_image):
+    """One bunk record plus its counter (caller / write queue commits)."""
+    db.session.add(Bunking(roll_no=roll, name=name, date=as_date(day), time=at, location=location, proof_image=proof_image))
+    delta = StatsDelta()
+    delta.bunk(roll)
+    delta.apply()
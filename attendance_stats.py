@@ -0,0 +1,101 @@
+from collections import defaultdict
+from sqlalchemy import select, delete, func, case
+from sqlalchemy.dialects import sqlite, postgresql
+from models import db, Attendance, Bunking, StudentStats, SubjectStats, DataVersion
+
+# ==========================================
+# PER-STUDENT / PER-SUBJECT ATTENDANCE COUNTERS
+# ==========================================
+# Every write to Attendance / Bunking records a StatsDelta and applies it in
+# the same transaction, as counter += n upserts, so the dashboard reads one
+# row instead of counting the student's whole history. rebuild() recomputes
+# everything from scratch (backfill, or if the counters are ever in doubt).
+
+COUNTERS = ('total', 'present', 'absent', 'late')
+
+def status_counts(status, sign=1):
+    return {'total': sign, 'present': sign * (status == 'Present'),
+            'absent': sign * (status == 'Absent'), 'late': sign * (status == 'Late')}
+
+class StatsDelta:
+    def __init__(self):
+        self.subjects = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))  # (roll_no, subject) -> counters
+        self.bunks = defaultdict(int)                                      # roll_no -> bunks
+
+    def add(self, roll, subject, status, sign=1):
+        counts = self.subjects[(roll, subject)]
+        for k, v in status_counts(status, sign).items(): counts[k] += v
+
+    def remove(self, roll, subject, status): self.add(roll, subject, status, -1)
+
+    def change(self, roll, subject, old, new):
+        if old == new: return
+        self.remove(roll, subject, old)
+        self.add(roll, subject, new)
+
+    def bunk(self, roll, n=1): self.bunks[roll] += n
+
+    def apply(self):
+        """Upsert the deltas into the session (caller commits)."""
+        subject_rows = [{'roll_no': r, 'subject': s, **c} for (r, s), c in self.subjects.items() if any(c.values())]
+        students = defaultdict(lambda: dict.fromkeys(COUNTERS + ('bunks',), 0))
+        for row in subject_rows:
+            for k in COUNTERS: students[row['roll_no']][k] += row[k]
+        for roll, n in self.bunks.items(): students[roll]['bunks'] += n
+        student_rows = [{'roll_no': r, **c} for r, c in students.items() if any(c.values())]
+        if subject_rows: upsert_add(SubjectStats, ['roll_no', 'subject'], COUNTERS, subject_rows)
+        if student_rows: upsert_add(StudentStats, ['roll_no'], COUNTERS + ('bunks',), student_rows)
+        if student_rows: bump_version()
+
+def upsert_add(model, keys, counters, rows):
+    # INSERT ... ON CONFLICT (keys) DO UPDATE SET c = c + excluded.c  (SQLite and PostgreSQL)
+    dialect = db.session.get_bind().dialect.name
+    stmt = (postgresql.insert if dialect == 'postgresql' else sqlite.insert)(model)
+    stmt = stmt.on_conflict_do_update(index_elements=keys,
+                                      set_={c: getattr(model, c) + getattr(stmt.excluded, c) for c in counters})
+    db.session.execute(stmt, rows)
+
+def bump_version(name='attendance'):
+    upsert_add(DataVersion, ['name'], ('version',), [{'name': name, 'version': 1}])
+
+def data_version(name='attendance'):
+    row = db.session.get(DataVersion, name)
+    return row.version if row else 0
+
+# ==========================================
+# READS (O(1) rows per student)
+# ==========================================
+def student_summary(roll):
+    row = db.session.get(StudentStats, roll)
+    summary = {k: getattr(row, k) if row else 0 for k in COUNTERS + ('bunks',)}
+    summary['percentage'] = round(summary['present'] / summary['total'] * 100, 1) if summary['total'] else 0
+    return summary
+
+def subject_summary(roll):
+    return SubjectStats.query.filter_by(roll_no=roll).order_by(SubjectStats.subject).all()
+
+# ==========================================
+# FULL REBUILD / BACKFILL
+# ==========================================
+def rebuild():
+    counted = lambda status: func.sum(case((Attendance.status == status, 1), else_=0))
+    per_subject = (select(Attendance.roll_no, Attendance.subject, func.count(), counted('Present'), counted('Absent'), counted('Late'))
+                   .group_by(Attendance.roll_no, Attendance.subject))
+    per_student = (select(Attendance.roll_no, func.count(), counted('Present'), counted('Absent'), counted('Late'))
+                   .group_by(Attendance.roll_no))
+    db.session.execute(delete(SubjectStats))
+    db.session.execute(delete(StudentStats))
+    db.session.execute(SubjectStats.__table__.insert().from_select(['roll_no', 'subject', *COUNTERS], per_subject))
+    db.session.execute(StudentStats.__table__.insert().from_select(['roll_no', *COUNTERS], per_student))
+    delta = StatsDelta()
+    for roll, n in db.session.execute(select(Bunking.roll_no, func.count()).group_by(Bunking.roll_no)): delta.bunk(roll, n)
+    delta.apply()
+    bump_version()
+    db.session.commit()
+
+def ensure_stats():
+    """Backfill once: counters empty but attendance / bunks exist (e.g. first start after upgrade)."""
+    if db.session.query(StudentStats.roll_no).first() is None and (
+            db.session.query(Attendance.id).first() is not None or db.session.query(Bunking.id).first() is not None):
+        rebuild()
+        print("[INFO] Attendance counters rebuilt.")
@@ -0,0 +1,41 @@
+import os
+import sys
+import time
+import argparse
+from embedding_store import EmbeddingStore, STORE_DIR
+from enrollment import discover, enroll_batch
+
+# ==========================================
+# BATCH ENROLLMENT (COMMAND LINE)
+# ==========================================
+#   python batch_enroll.py intake_2025.zip --workers 4
+#   python batch_enroll.py photos/ --replace          (re-enroll rolls already in the store)
+#   python batch_enroll.py photos/ --dry-run          (pick samples, write nothing)
+# A running app.py picks the new templates up within a second (gallery_service.SharedGallery).
+
+def print_progress(done, total, result):
+    status = "[ OK ]" if result['ok'] else "[WARN]"
+    print(f"{status} {done}/{total} {result['roll']}: {result['msg']}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Enroll students from photo sets / video clips (folder or zip)")
+    parser.add_argument("source", help="folder or .zip with one sub-folder (or one clip) per roll number")
+    parser.add_argument("--store", default=STORE_DIR)
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1), help="processes (1 = in-process)")
+    parser.add_argument("--replace", action="store_true", help="re-enroll roll numbers that already have templates")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    jobs = discover(args.source)
+    if not jobs: sys.exit(f"[ERROR] No images or videos found in {args.source}")
+    print(f"[INFO] {len(jobs)} roll numbers in {args.source}, {args.workers} workers")
+    start = time.perf_counter()
+    report = enroll_batch(jobs, EmbeddingStore(args.store), args.workers, replace=args.replace,
+                          dry_run=args.dry_run, progress=print_progress)
+    elapsed = time.perf_counter() - start
+
+    for roll in report['skipped']: print(f"[INFO] {roll}: already enrolled (use --replace)")
+    action = "would be enrolled" if args.dry_run else "enrolled"
+    print(f"[INFO] {len(report['enrolled'])} {action}, {len(report['failed'])} failed, "
+          f"{len(report['skipped'])} skipped in {elapsed:.1f}s")
+    sys.exit(1 if report['failed'] else 0)
@@ -0,0 +1,140 @@
+import time
+import threading
+import numpy as np
+from collections import deque
+from concurrent.futures import Future
+
+# ==========================================
+# BATCHED FACE INFERENCE SERVICE
+# ==========================================
+# Sits in front of the shared FaceAnalysis model. Jobs submitted by every
+# camera session within `max_wait_ms` are collected into one batch:
+#   1. detection runs per frame (the SCRFD graphs shipped in the buffalo packs
+#      are exported with batch size 1),
+#   2. all faces to embed from all jobs are aligned and pushed through the
+#      recognition model in ONE stacked get_feat() call.
+# Job kinds: "infer" (detect + embed), "detect" (boxes only, for tracked
+# faces) and "embed" (embeddings for faces the caller already detected).
+# Only detection + recognition run here; the landmark / gender-age heads that
+# FaceAnalysis.get() also executes are not needed for surveillance.
+
+class BatchInferenceService:
+    def __init__(self, get_model, max_batch=8, max_wait_ms=10, max_faces=64):
+        self.get_model = get_model
+        self.max_batch = max_batch       # frames per batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_faces = max_faces       # crops per recognition call
+        self.pending = deque()
+        self.cond = threading.Condition()
+        self.running = False
+        self.thread = None
+        self.stats_lock = threading.Lock()
+        self.batches = self.frames = self.faces = 0
+        self.busy_s = 0.0
+
+    # --- LIFECYCLE ---
+    def start(self):
+        if self.running: return self
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, name="batch-inference", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=2.0):
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        if self.thread is not None: self.thread.join(timeout)
+        while self.pending:
+            fut = self.pending.popleft()[-1]
+            fut.set_exception(RuntimeError("Inference service stopped"))
+
+    # --- CLIENT API ---
+    def submit(self, frame, kind="infer", faces=None):
+        """Queue a BGR frame; the Future resolves to its list of Face objects."""
+        fut = Future()
+        with self.cond:
+            if not self.running: raise RuntimeError("Inference service not started")
+            self.pending.append((kind, frame, faces, fut))
+            self.cond.notify()
+        return fut
+
+    def infer(self, frame, timeout=None): return self.submit(frame).result(timeout)
+
+    def detect(self, frame, timeout=None): return self.submit(frame, "detect").result(timeout)
+
+    def embed(self, frame, faces, timeout=None):
+        if not faces: return faces
+        return self.submit(frame, "embed", faces).result(timeout)
+
+    def stats(self):
+        with self.stats_lock:
+            return {"batches": self.batches, "frames": self.frames,
+                    "avg_batch": round(self.frames / self.batches, 2) if self.batches else 0.0,
+                    "embedded_faces": self.faces,
+                    "busy_s": round(self.busy_s, 2)}
+
+    # --- WORKER ---
+    def _collect(self):
+        with self.cond:
+            while self.running and not self.pending: self.cond.wait(0.1)
+            if not self.running: return []
+            # First frame starts the window; wait for more until full or timed out
+            deadline = time.perf_counter() + self.max_wait
+            while len(self.pending) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0: break
+                self.cond.wait(remaining)
+            return [self.pending.popleft() for _ in range(min(self.max_batch, len(self.pending)))]
+
+    def _loop(self):
+        while self.running:
+            batch = self._collect()
+            if not batch: continue
+            start = time.perf_counter()
+            try:
+                model = self.get_model()
+                results, to_embed = [], []
+                for kind, frame, faces, _ in batch:
+                    if kind != "embed": faces = detect_faces(model, frame)
+                    if kind != "detect": to_embed.extend((frame, face) for face in faces)
+                    results.append(faces)
+                embed_faces(model, to_embed, self.max_faces)
+                for (_, _, _, fut), faces in zip(batch, results): fut.set_result(faces)
+            except Exception as e:
+                for job in batch:
+                    if not job[-1].done(): job[-1].set_exception(e)
+                continue
+            with self.stats_lock:
+                self.batches += 1
+                self.frames += len(batch)
+                self.faces += len(to_embed)
+                self.busy_s += time.perf_counter() - start
+
+
+# ==========================================
+# DETECT + BATCHED RECOGNITION
+# ==========================================
+def detect_faces(model, frame, max_num=0, input_size=None):
+    from insightface.app.common import Face
+    bboxes, kpss = model.det_model.detect(frame, input_size=input_size, max_num=max_num, metric='default')
+    faces = []
+    for i in range(bboxes.shape[0]):
+        faces.append(Face(bbox=bboxes[i, 0:4], kps=kpss[i] if kpss is not None else None, det_score=bboxes[i, 4]))
+    return faces
+
+def embed_faces(model, pairs, max_faces=64):
+    """Fill face.embedding for (frame, face) pairs with stacked recognition calls."""
+    from insightface.utils import face_align
+    rec = model.models['recognition']
+    pairs = [(frame, face) for frame, face in pairs if face.kps is not None]
+    for s in range(0, len(pairs), max_faces):
+        chunk = pairs[s:s + max_faces]
+        crops = [face_align.norm_crop(frame, landmark=face.kps, image_size=rec.input_size[0]) for frame, face in chunk]
+        feats = rec.get_feat(crops)
+        for (_, face), feat in zip(chunk, np.asarray(feats)): face.embedding = feat.flatten()
+
+def detect_and_embed(model, frames, max_faces=64):
+    per_frame = [detect_faces(model, frame) for frame in frames]
+    embed_faces(model, [(frame, face) for frame, faces in zip(frames, per_frame) for face in faces], max_faces)
+    return per_frame
@@ -0,0 +1,63 @@
+import argparse
+import time
+import numpy as np
+from gallery import GalleryMatcher, EMBEDDING_DIM
+from ann_index import IVFFlatIndex
+
+# ==========================================
+# ANN vs EXHAUSTIVE SEARCH BENCHMARK
+# ==========================================
+# Synthetic gallery: every identity gets a random unit "centre" and a few
+# templates jittered around it. Queries are fresh jittered samples, so the
+# exact matcher's top-1 is the ground truth the IVF index is scored against.
+
+def make_gallery(n_ids, templates, noise, rng):
+    centres = rng.standard_normal((n_ids, EMBEDDING_DIM)).astype(np.float32)
+    centres /= np.linalg.norm(centres, axis=1, keepdims=True)
+    faces_db = {}
+    for i in range(n_ids):
+        t = centres[i] + noise * rng.standard_normal((templates, EMBEDDING_DIM)).astype(np.float32)
+        faces_db[f"ID-{i:06d}"] = list(t / np.linalg.norm(t, axis=1, keepdims=True))
+    return faces_db, centres
+
+def time_per_query(fn, queries, batch):
+    start = time.perf_counter()
+    out = []
+    for s in range(0, len(queries), batch): out.extend(fn(queries[s:s + batch]))
+    return out, (time.perf_counter() - start) * 1000 / len(queries)
+
+def run(sizes, templates, n_queries, batch, nprobes, noise, seed):
+    rng = np.random.default_rng(seed)
+    print(f"{'Gallery':>8} {'Mode':<14} {'Build(s)':>9} {'ms/query':>9} {'Recall@1':>9}")
+    print("-" * 55)
+    for n_ids in sizes:
+        faces_db, centres = make_gallery(n_ids, templates, noise, rng)
+        picks = rng.integers(0, n_ids, n_queries)
+        queries = centres[picks] + noise * rng.standard_normal((n_queries, EMBEDDING_DIM)).astype(np.float32)
+
+        t0 = time.perf_counter()
+        exact = GalleryMatcher.from_dict(faces_db)
+        build_exact = time.perf_counter() - t0
+        truth, ms_exact = time_per_query(exact.identify, queries, batch)
+        print(f"{n_ids:>8} {'exact':<14} {build_exact:>9.2f} {ms_exact:>9.3f} {1.0:>9.3f}")
+
+        t0 = time.perf_counter()
+        index = IVFFlatIndex.from_dict(faces_db, seed=seed)
+        build_ivf = time.perf_counter() - t0
+        for nprobe in nprobes:
+            got, ms = time_per_query(lambda q: index.identify(q, nprobe=nprobe), queries, batch)
+            recall = np.mean([g[0] == t[0] for g, t in zip(got, truth)])
+            print(f"{n_ids:>8} {f'ivf nprobe={nprobe}':<14} {build_ivf:>9.2f} {ms:>9.3f} {recall:>9.3f}")
+        print("-" * 55)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall / latency of IVF-flat vs exact gallery search")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--templates", type=int, default=1, help="templates per identity (5 = app default, needs ~1GB RAM at 100k)")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--batch", type=int, default=8, help="faces per frame")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--noise", type=float, default=0.04)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    run(args.sizes, args.templates, args.queries, args.batch, args.nprobe, args.noise, args.seed)
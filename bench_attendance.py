@@ -0,0 +1,94 @@
+import os
+import time
+import argparse
+import tempfile
+from datetime import datetime, date, time as dtime
+from flask import Flask
+from sqlalchemy import event
+from models import db, Student, Attendance, Bunking
+from attendance_service import save_attendance, finalize_lecture
+
+# ==========================================
+# ATTENDANCE WRITE BENCHMARK (PER-ROW vs BULK)
+# ==========================================
+# Fresh SQLite file per run, one course of N students, a few bunkers.
+# Scenarios: first save of the sheet (all inserts), re-save with changed
+# statuses (all updates), and auto-marking at stop_lecture (half already marked).
+
+COURSE, SUBJECT, DATE = 'BENCH', 'Algorithms', date(2024, 1, 1)
+
+def make_app(path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+def seed(n, bunk_every):
+    db.drop_all(); db.create_all()
+    db.session.add_all(Student(name=f"S{i}", roll_no=f"R{i:05d}", email=f"s{i}@x", course=COURSE) for i in range(n))
+    db.session.add_all(Bunking(roll_no=f"R{i:05d}", name=f"S{i}", date=DATE, time=dtime(10, 0), proof_image='-')
+                       for i in range(0, n, bunk_every))
+    db.session.commit()
+
+def sheet(n, status):
+    return [{'roll_no': f"R{i:05d}", 'name': f"S{i}", 'status': status if i % 3 else 'Absent'} for i in range(n)]
+
+# --- Old route bodies, kept verbatim for comparison ---
+def legacy_save(records):
+    bunker_rolls = [b.roll_no for b in Bunking.query.filter_by(date=DATE).all()]
+    for record in records:
+        final_status = 'Absent' if record['roll_no'] in bunker_rolls else record['status']
+        existing = Attendance.query.filter_by(roll_no=record['roll_no'], subject=SUBJECT, date=DATE).first()
+        if existing: existing.status = final_status
+        else: db.session.add(Attendance(roll_no=record['roll_no'], name=record['name'], subject=SUBJECT, course=COURSE,
+                                        date=DATE, time=datetime.now().time(), status=final_status))
+    db.session.commit()
+
+def legacy_finalize():
+    bunker_rolls = [b.roll_no for b in Bunking.query.filter_by(date=DATE).all()]
+    for student in Student.query.filter_by(course=COURSE).all():
+        if not Attendance.query.filter_by(roll_no=student.roll_no, subject=SUBJECT, date=DATE).first():
+            status = 'Absent' if student.roll_no in bunker_rolls else 'Present'
+            db.session.add(Attendance(roll_no=student.roll_no, name=student.name, course=COURSE, subject=SUBJECT,
+                                      date=DATE, time=datetime.now().time(), status=status))
+    db.session.commit()
+
+def bulk_save(records):
+    save_attendance(COURSE, SUBJECT, DATE, ((r['roll_no'], r['name'], r['status']) for r in records))
+
+def bulk_finalize(): finalize_lecture(COURSE, SUBJECT, DATE)
+
+def timed(fn, *args):
+    statements = [0]
+    count = lambda *a: statements.__setitem__(0, statements[0] + 1)
+    event.listen(db.engine, 'before_cursor_execute', count)
+    start = time.perf_counter()
+    fn(*args)
+    elapsed = (time.perf_counter() - start) * 1000
+    event.remove(db.engine, 'before_cursor_execute', count)
+    return elapsed, statements[0]
+
+def run(sizes, bunk_every):
+    app = make_app(os.path.join(tempfile.mkdtemp(), 'bench.db'))
+    print(f"{'Students':>8} {'Scenario':<12} {'Path':<8} {'ms':>9} {'SQL stmts':>10}")
+    print("-" * 52)
+    with app.app_context():
+        for n in sizes:
+            for path, save, finalize in (('per-row', legacy_save, legacy_finalize), ('bulk', bulk_save, bulk_finalize)):
+                seed(n, bunk_every)
+                results = [('insert', timed(save, sheet(n, 'Present'))),
+                           ('update', timed(save, sheet(n, 'Absent')))]
+                Attendance.query.filter(Attendance.roll_no >= f"R{n // 2:05d}").delete()
+                db.session.commit()
+                results.append(('stop_lecture', timed(finalize)))
+                for scenario, (ms, stmts) in results:
+                    print(f"{n:>8} {scenario:<12} {path:<8} {ms:>9.1f} {stmts:>10}")
+            print()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-row vs bulk attendance writes")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[300, 1000, 3000])
+    parser.add_argument("--bunk-every", type=int, default=25, help="every k-th student is a bunker")
+    args = parser.parse_args()
+    run(args.sizes, args.bunk_every)
@@ -0,0 +1,66 @@
+import os
+import glob
+import time
+import argparse
+import threading
+import cv2
+from insightface.app import FaceAnalysis
+from batch_inference import BatchInferenceService, detect_and_embed
+
+# ==========================================
+# BATCHED vs PER-FRAME INFERENCE BENCHMARK
+# ==========================================
+# Replays real frames (static/bunk_proofs by default) as N simulated camera
+# streams and reports frames/second and frames/second per CPU core for:
+#   per-frame   : app_face.get() on every frame (the old surveillance path)
+#   det+rec     : detection + recognition only, one frame at a time
+#   batched     : BatchInferenceService shared by all streams
+
+def load_frames(pattern, limit):
+    frames = []
+    for path in sorted(glob.glob(pattern))[:limit]:
+        img = cv2.imread(path)
+        if img is not None: frames.append(cv2.resize(img, (1024, 768)))
+    if not frames: raise SystemExit(f"No frames found for {pattern}")
+    return frames
+
+def run_streams(n_streams, frames_per_stream, frames, fn):
+    def stream(offset):
+        for i in range(frames_per_stream): fn(frames[(offset + i) % len(frames)])
+    threads = [threading.Thread(target=stream, args=(s,)) for s in range(n_streams)]
+    start = time.perf_counter()
+    for t in threads: t.start()
+    for t in threads: t.join()
+    return n_streams * frames_per_stream / (time.perf_counter() - start)
+
+def report(name, fps, cores):
+    print(f"{name:<28} {fps:>8.2f} fps {fps / cores:>8.2f} fps/core")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Frames/sec of batched vs per-frame face inference")
+    parser.add_argument("--frames", default="static/bunk_proofs/*.jpg")
+    parser.add_argument("--limit", type=int, default=32)
+    parser.add_argument("--streams", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--per-stream", type=int, default=20)
+    parser.add_argument("--max-batch", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=float, default=10)
+    parser.add_argument("--model", default="buffalo_l")
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    frames = load_frames(args.frames, args.limit)
+    app_face = FaceAnalysis(name=args.model, providers=['CPUExecutionProvider'])
+    app_face.prepare(ctx_id=0, det_size=(640, 640))
+    app_face.get(frames[0]) # warm-up
+
+    print(f"{len(frames)} frames, {cores} cores, model={args.model}")
+    print("-" * 60)
+    for n in args.streams:
+        print(f"Streams: {n}")
+        report("  per-frame app_face.get", run_streams(n, args.per_stream, frames, app_face.get), cores)
+        report("  det+rec per frame", run_streams(n, args.per_stream, frames, lambda f: detect_and_embed(app_face, [f])), cores)
+        service = BatchInferenceService(lambda: app_face, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms).start()
+        report("  batched service", run_streams(n, args.per_stream, frames, service.infer), cores)
+        print(f"  batch stats: {service.stats()}")
+        service.stop()
+        print("-" * 60)
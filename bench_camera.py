@@ -0,0 +1,84 @@
+import os
+import time
+import argparse
+import tempfile
+import cv2
+import numpy as np
+from camera_sources import CameraStream, FileSource
+
+# ==========================================
+# CAMERA SOURCE / OFFLINE PIPELINE BENCHMARK
+# ==========================================
+# Replays a video file as fast as possible and reports, per (target fps,
+# decode width), how many frames were decoded vs dropped undecoded and the
+# CPU time the grab thread spent per second of footage. With --pipeline the
+# clip is also played in real time through a full SurveillanceSession (face
+# model from face_models, gallery from the embedding store) and the per-stage
+# pipeline stats are printed, which makes surveillance runs repeatable offline.
+#
+#   python bench_camera.py                          (synthetic 1080p clip)
+#   python bench_camera.py --clip canteen.mp4 --pipeline
+
+def synthetic_clip(path, seconds, fps=30, size=(1920, 1080)):
+    """Moving blobs over a textured background, MJPG like most IP cameras."""
+    rng = np.random.default_rng(0)
+    background = cv2.GaussianBlur(rng.integers(0, 255, (size[1], size[0], 3), dtype=np.uint8), (0, 0), 3)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), fps, size)
+    for i in range(int(seconds * fps)):
+        frame = background.copy()
+        for k in range(4):
+            x = int((i * (4 + k) + k * 400) % size[0])
+            cv2.circle(frame, (x, size[1] // 2 + (k - 2) * 150), 80, (40 * k, 200, 255 - 40 * k), -1)
+        writer.write(frame)
+    writer.release()
+    return path
+
+def replay(clip, target_fps, decode_width):
+    stream = CameraStream(FileSource(clip, realtime=False, loop=False), target_fps=target_fps, decode_width=decode_width)
+    cpu, wall = time.process_time(), time.perf_counter()
+    stream.start()
+    stream.thread.join()
+    cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+    return stream.stats(), cpu, wall, stream.source.position / stream.source.fps
+
+def run_pipeline(clip, args):
+    from face_models import get_face_model
+    from gallery_service import SharedGallery
+    from sessions import SessionManager
+    from evidence_writer import EvidenceWriter
+    out_dir = tempfile.mkdtemp(prefix='bench_camera_')
+    manager = SessionManager(get_model=lambda: get_face_model('surveillance'), get_gallery=lambda: gallery,
+                             stream_factory=lambda src: CameraStream(FileSource(src, loop=False), target_fps=args.pipeline_fps,
+                                                                     decode_width=args.pipeline_width),
+                             evidence=EvidenceWriter(out_dir), scheduler_config={'target_fps': args.pipeline_fps})
+    gallery = SharedGallery(args.store)
+    session = manager.start({'course': 'BENCH', 'subject': 'offline', 'teacher_email': None}, clip, show_window=False)
+    start = time.perf_counter()
+    while session.stream is None or session.stream.state not in ('ended', 'stopped'): time.sleep(0.2)
+    time.sleep(1.0) # let the last frames drain through the stages
+    manager.stop(session.id)
+    print(f"\nPipeline over {clip} ({time.perf_counter() - start:.1f}s, evidence in {out_dir})")
+    print(f"camera: {session.stream.stats()}")
+    for name, stage in session.stats.items(): print(f"{name:<8} {stage}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Decode cost of camera sources; offline surveillance pipeline runs")
+    parser.add_argument("--clip", help="video file (default: synthetic 1080p MJPG clip)")
+    parser.add_argument("--seconds", type=float, default=10, help="length of the synthetic clip")
+    parser.add_argument("--fps", type=float, nargs="+", default=[0, 15, 10, 5], help="target fps (0 = every frame)")
+    parser.add_argument("--widths", type=int, nargs="+", default=[0, 1024, 640], help="decode width (0 = native)")
+    parser.add_argument("--pipeline", action="store_true", help="also run a full SurveillanceSession over the clip")
+    parser.add_argument("--pipeline-fps", type=float, default=10)
+    parser.add_argument("--pipeline-width", type=int, default=1024)
+    parser.add_argument("--store", default="embeddings")
+    args = parser.parse_args()
+
+    clip = args.clip or synthetic_clip(os.path.join(tempfile.mkdtemp(prefix='bench_camera_'), 'clip.avi'), args.seconds)
+    header = f"{'Target fps':>10} {'Width':>6} {'Decoded':>8} {'Dropped':>8} {'Decode ms':>10} {'CPU ms / s':>11} {'x realtime':>11}"
+    print(f"Clip: {clip}\n{header}\n" + "-" * len(header))
+    for fps in args.fps:
+        for width in args.widths:
+            stats, cpu, wall, media_s = replay(clip, fps or None, width or None)
+            print(f"{fps or 'all':>10} {width or 'native':>6} {stats['decoded']:>8} {stats['dropped']:>8} "
+                  f"{stats['decode_ms']:>10.2f} {cpu * 1000 / media_s:>11.1f} {media_s / wall:>11.1f}")
+    if args.pipeline: run_pipeline(clip, args)
@@ -0,0 +1,43 @@
+import sys
+import time
+import argparse
+import subprocess
+import statistics
+
+# ==========================================
+# IMPORT-TIME & COLD-START BENCHMARK
+# ==========================================
+# Each measurement runs in a fresh interpreter so nothing is cached:
+#   import app            -> what check_db.py / delete_user.py / web workers pay
+#   cold start (<role>)   -> import + first get_face_model(role) + first inference
+
+IMPORT_SNIPPET = "import time; t=time.perf_counter(); import app; print(time.perf_counter()-t)"
+COLD_SNIPPET = """
+import time, numpy as np
+t = time.perf_counter()
+import app
+from face_models import get_face_model
+model = get_face_model({role!r})
+t_load = time.perf_counter()
+model.get(np.zeros((768, 1024, 3), dtype=np.uint8))
+print(t_load - t, time.perf_counter() - t)
+"""
+
+def run(snippet):
+    out = subprocess.run([sys.executable, "-c", snippet], capture_output=True, text=True, check=True).stdout
+    return [float(x) for x in out.strip().splitlines()[-1].split()]
+
+def summary(name, samples):
+    print(f"{name:<34} median {statistics.median(samples):>7.3f}s  min {min(samples):>7.3f}s  max {max(samples):>7.3f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import-time and cold-start timings for app.py")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--roles", nargs="*", default=["surveillance", "enrollment"])
+    args = parser.parse_args()
+
+    summary("import app", [run(IMPORT_SNIPPET)[0] for _ in range(args.repeat)])
+    for role in args.roles:
+        samples = [run(COLD_SNIPPET.format(role=role)) for _ in range(args.repeat)]
+        summary(f"cold start {role}: model ready", [s[0] for s in samples])
+        summary(f"cold start {role}: first frame", [s[1] for s in samples])
@@ -0,0 +1,130 @@
+import time
+import argparse
+import tempfile
+import numpy as np
+from gallery import GalleryMatcher, MATCH_THRESHOLD, EMBEDDING_DIM
+from embedding_store import EmbeddingStore
+from face_templates import consolidate, TemplateUpdater, UPDATE_CONFIG
+
+# ==========================================
+# TEMPLATE CONSOLIDATION / ONLINE UPDATE BENCHMARK
+# ==========================================
+# Synthetic identities shaped like real enrollments: a per-student centre,
+# shared LEFT / RIGHT pose directions, three near-duplicate CENTER frames and
+# now and then a bad (blurred) sample. Held-out queries are fresh samples at
+# surveillance noise, optionally with a per-student "drift" (new lighting /
+# haircut); impostors are identities that were never enrolled.
+# Reported per gallery variant: template rows, ms/query, rank-1 accuracy,
+# TAR (correct and above MATCH_THRESHOLD) and FAR (impostor above threshold).
+
+POSES = {'CENTER': 0.0, 'LEFT': -1.0, 'RIGHT': 1.0}
+
+def unit(x): return x / np.linalg.norm(x, axis=-1, keepdims=True)
+
+class Population:
+    """Faces live in a `latent`-dim subspace of the 512-d embedding space (real embeddings are far
+    from isotropic), which is what makes impostor scores spread out and identities confusable."""
+    def __init__(self, n_ids, rng, similarity=0.1, pose_amp=0.6, drift_amp=0.8, latent=96):
+        self.rng = rng
+        self.basis = np.linalg.qr(rng.standard_normal((EMBEDDING_DIM, latent)))[0].T  # latent x 512, orthonormal
+        # Faces share a common component: different identities have cosine ~ similarity
+        common = unit(rng.standard_normal(latent))
+        own = unit(rng.standard_normal((n_ids, latent)))
+        self.centres = unit(np.sqrt(similarity) * common + np.sqrt(1 - similarity) * own)
+        self.pose_dirs = unit(rng.standard_normal((n_ids, latent)) + 2 * unit(rng.standard_normal(latent)))
+        self.drifts = unit(rng.standard_normal((n_ids, latent)))
+        self.pose_amp, self.drift_amp, self.latent = pose_amp, drift_amp, latent
+
+    def sample(self, ids, pose, noise, drift=0.0):
+        ids = np.atleast_1d(ids)
+        x = self.centres[ids] + self.pose_amp * pose[:, None] * self.pose_dirs[ids] + drift * self.drift_amp * self.drifts[ids]
+        x = x + noise * self.rng.standard_normal((len(ids), self.latent)) / np.sqrt(self.latent)
+        return unit(unit(x) @ self.basis).astype(np.float32)
+
+    def enroll(self, i, noise, bad_rate):
+        rng = self.rng
+        center = self.sample(i, np.array([0.0]), noise)[0]
+        jitter = lambda: unit(center + 0.05 * (rng.standard_normal(self.latent) / np.sqrt(self.latent)) @ self.basis)
+        rows = [center, jitter(), jitter(),
+                self.sample(i, np.array([POSES['LEFT']]), noise)[0], self.sample(i, np.array([POSES['RIGHT']]), noise)[0]]
+        if rng.random() < bad_rate: rows[int(rng.integers(1, 5))] = self.sample(i, np.array([0.0]), noise * 4)[0]
+        # CENTER, LEFT, RIGHT, CENTER, CENTER like the capture window
+        return np.asarray([rows[0], rows[3], rows[4], rows[1], rows[2]], dtype=np.float32)
+
+def queries(pop, n_ids, n, noise, drift, rng):
+    # drift: 0 = as enrolled, 1 = fully drifted appearance
+    ids = rng.integers(0, n_ids, n)
+    pose = rng.uniform(-1.2, 1.2, n)  # anywhere between and a bit beyond the enrolled poses
+    return ids, pop.sample(ids, pose, noise, drift)
+
+def evaluate(matcher, rolls, ids, q, impostors):
+    start = time.perf_counter()
+    results = matcher.identify(q)
+    ms = (time.perf_counter() - start) * 1000 / len(q)
+    correct = np.array([r[0] == rolls[i] for r, i in zip(results, ids)])
+    scores = np.array([r[1] for r in results])
+    far = np.mean([s > MATCH_THRESHOLD for _, s in matcher.identify(impostors)])
+    return {'rows': matcher.num_templates, 'ms': ms, 'rank1': correct.mean(),
+            'tar': (correct & (scores > MATCH_THRESHOLD)).mean(), 'far': far}
+
+def row(name, m):
+    print(f"{name:<26} {m['rows']:>8} {m['ms']:>9.3f} {m['rank1']:>7.3f} {m['tar']:>7.3f} {m['far']:>7.3f}")
+
+def run(args):
+    rng = np.random.default_rng(args.seed)
+    pop = Population(args.ids + args.impostors, rng, args.similarity, drift_amp=args.drift, latent=args.latent)
+    rolls = [f"ID-{i:05d}" for i in range(args.ids)]
+    enrolled = {rolls[i]: pop.enroll(i, args.enroll_noise, args.bad_rate) for i in range(args.ids)}
+    imp_ids = np.arange(args.ids, args.ids + args.impostors)
+    impostors = pop.sample(rng.choice(imp_ids, args.queries), rng.uniform(-1.2, 1.2, args.queries), args.query_noise)
+    held_out = queries(pop, args.ids, args.queries, args.query_noise, 0.0, rng)
+    drifted = queries(pop, args.ids, args.queries, args.query_noise, 1.0, rng)
+
+    variants = {'raw (5 templates)': None,
+                'dedupe only': dict(use_mean=False, max_exemplars=5),
+                'mean only': dict(use_mean=True, max_exemplars=0),
+                'mean + 1 exemplar': dict(use_mean=True, max_exemplars=1),
+                'mean + 2 exemplars': dict(use_mean=True, max_exemplars=2),
+                'mean + 3 exemplars': dict(use_mean=True, max_exemplars=3)}
+    header = f"{'Gallery':<26} {'Rows':>8} {'ms/query':>9} {'Rank-1':>7} {'TAR':>7} {'FAR':>7}"
+    for title, (ids, q) in (("Held-out queries", held_out), ("Drifted queries (new lighting / look)", drifted)):
+        print(f"\n{title}  ({args.ids} identities, threshold {MATCH_THRESHOLD})\n{header}\n" + "-" * len(header))
+        for name, config in variants.items():
+            db = enrolled if config is None else {r: consolidate(t, **config) for r, t in enrolled.items()}
+            row(name, evaluate(GalleryMatcher.from_dict(db), rolls, ids, q, impostors))
+
+    # --- Online updates: appearance drifts gradually; each round's sightings feed TemplateUpdater ---
+    print(f"\nOnline template updates ({args.sightings} rounds of sightings, drifting 0 -> 1, min score {args.min_score}, "
+          f"novelty {args.novelty}, {args.cap} rows per identity)\n{header}\n" + "-" * len(header))
+    store = EmbeddingStore(tempfile.mkdtemp(prefix='bench_templates_'))
+    store.append_many({r: consolidate(t) for r, t in enrolled.items()})
+    matcher = GalleryMatcher.from_dict(store.as_dict())
+    updater = TemplateUpdater(store, lambda: matcher, cooldown_s=0, min_score=args.min_score, novelty=args.novelty,
+                              max_templates=args.cap)
+    before = (evaluate(matcher, rolls, *held_out, impostors), evaluate(matcher, rolls, *drifted, impostors))
+    for k in range(1, args.sightings + 1):
+        _, q = queries(pop, args.ids, args.ids * 2, args.query_noise, k / args.sightings, rng)
+        for (identity, score), e in zip(matcher.identify(q), q): updater.observe(identity, e, score)
+        updater.flush()
+    after = (evaluate(matcher, rolls, *held_out, impostors), evaluate(matcher, rolls, *drifted, impostors))
+    row("before: held-out", before[0]); row("before: drifted", before[1])
+    row("after: held-out", after[0]); row("after: drifted", after[1])
+    print(f"[INFO] updater: {updater.stats()}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Accuracy / cost of consolidated galleries and online template updates")
+    parser.add_argument("--ids", type=int, default=2000)
+    parser.add_argument("--impostors", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=4000)
+    parser.add_argument("--similarity", type=float, default=0.1, help="mean cosine between different identities")
+    parser.add_argument("--drift", type=float, default=0.8, help="size of the per-identity appearance drift")
+    parser.add_argument("--enroll-noise", type=float, default=0.6)
+    parser.add_argument("--query-noise", type=float, default=1.0)
+    parser.add_argument("--bad-rate", type=float, default=0.15, help="share of enrollments with one blurred sample")
+    parser.add_argument("--latent", type=int, default=96, help="effective dimension of the face space")
+    parser.add_argument("--sightings", type=int, default=4, help="rounds of surveillance sightings")
+    parser.add_argument("--min-score", type=float, default=UPDATE_CONFIG['min_score'])
+    parser.add_argument("--novelty", type=float, default=UPDATE_CONFIG['novelty'])
+    parser.add_argument("--cap", type=int, default=UPDATE_CONFIG['max_templates'], help="template rows per identity after an update")
+    parser.add_argument("--seed", type=int, default=0)
+    run(parser.parse_args())
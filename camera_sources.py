@@ -0,0 +1,344 @@
+import os
+import time
+import random
+import threading
+import urllib.request
+import cv2
+import numpy as np
+
+# ==========================================
+# CAMERA SOURCES (OPENCV / MJPEG / FILE PLAYBACK)
+# ==========================================
+# A source only knows how to open, grab (fetch the next frame without
+# decoding it) and retrieve (decode the grabbed frame). CameraStream runs the
+# grab loop on its own thread: frames arriving faster than target_fps are
+# grabbed and dropped without being retrieved, kept frames are written straight
+# into a preallocated ring buffer, and a dead source is released and reopened
+# with exponential backoff instead of returning grabbed=False forever.
+# (FFmpeg still decodes inside grab(), the codec needs every frame; a dropped
+# frame only skips the colour conversion / copy. The MJPEG parser skips the
+# JPEG decode completely.)
+#
+#   http(s)://...          -> MJPEGSource (IP Webcam style multipart JPEG; a
+#                             JPEG is only decoded if kept, at 1/2, 1/4 or 1/8
+#                             scale when decode_width allows it)
+#   rtsp://..., 0, 1 ...   -> OpenCVSource (FFmpeg / webcam via cv2.VideoCapture)
+#   clip.mp4 (a file)      -> FileSource (replays at the clip's own fps, or as
+#                             fast as possible for offline benchmarks)
+#
+# Ring frames are views into reused buffers: a frame stays valid until
+# ring_size - 1 newer frames have arrived. Anything that keeps a frame longer
+# (the surveillance pipeline, which can lag behind the camera) must copy it.
+
+CAMERA_CONFIG = {'target_fps': 15.0,      # None = decode every frame
+                 'decode_width': None,    # px; None = native resolution
+                 'ring_size': 8,
+                 'backoff_s': 0.5,        # first reconnect delay, doubled per failure
+                 'max_backoff_s': 30.0}
+
+REDUCED_FLAGS = {1: cv2.IMREAD_COLOR, 2: cv2.IMREAD_REDUCED_COLOR_2, 4: cv2.IMREAD_REDUCED_COLOR_4,
+                 8: cv2.IMREAD_REDUCED_COLOR_8}
+
+# --- SOURCES ---
+class OpenCVSource:
+    """Webcam index or any URL cv2.VideoCapture understands (RTSP, HTTP, ...)."""
+    live = True
+
+    def __init__(self, src, timeout_s=5.0):
+        self.src = int(src) if isinstance(src, str) and src.isdigit() else src
+        self.timeout_s = timeout_s
+        self.cap = None
+        self.timestamp = None
+
+    def open(self):
+        params = []
+        if not isinstance(self.src, int):
+            params = [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, int(self.timeout_s * 1000),
+                      cv2.CAP_PROP_READ_TIMEOUT_MSEC, int(self.timeout_s * 1000)]
+        self.cap = cv2.VideoCapture(self.src, cv2.CAP_ANY, params)
+        if not self.cap.isOpened(): raise ConnectionError(f"cannot open {self.src}")
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1) # Latest frame, not a backlog
+
+    def grab(self):
+        ok = self.cap.grab()
+        self.timestamp = time.monotonic()
+        return ok
+
+    def retrieve(self, out=None, reduce=1):
+        ok, frame = self.cap.retrieve(out) if out is not None else self.cap.retrieve()
+        return frame if ok else None
+
+    def release(self):
+        if self.cap is not None: self.cap.release()
+        self.cap = None
+
+    def __str__(self): return str(self.src)
+
+
+class MJPEGSource:
+    """multipart/x-mixed-replace JPEG stream over HTTP, parsed by hand so skipped frames cost no decode."""
+    live = True
+
+    def __init__(self, url, timeout_s=5.0, chunk_size=65536):
+        self.url = url
+        self.timeout_s = timeout_s
+        self.chunk_size = chunk_size
+        self.response = None
+        self.buffer = bytearray()
+        self.jpeg = None
+        self.timestamp = None
+
+    def open(self):
+        self.response = urllib.request.urlopen(self.url, timeout=self.timeout_s)
+        self.buffer = bytearray()
+
+    def grab(self):
+        # Next complete JPEG (SOI ... EOI); part headers in between are skipped
+        while True:
+            start = self.buffer.find(b'\xff\xd8')
+            end = self.buffer.find(b'\xff\xd9', start + 2) if start >= 0 else -1
+            if end >= 0:
+                self.jpeg = bytes(self.buffer[start:end + 2])
+                del self.buffer[:end + 2]
+                self.timestamp = time.monotonic()
+                return True
+            if start > 0: del self.buffer[:start]
+            elif start < 0: del self.buffer[:-1] # Keep a trailing 0xff, it may start the next SOI
+            chunk = self.response.read1(self.chunk_size)
+            if not chunk: return False
+            self.buffer += chunk
+
+    def retrieve(self, out=None, reduce=1):
+        if self.jpeg is None: return None
+        return cv2.imdecode(np.frombuffer(self.jpeg, np.uint8), REDUCED_FLAGS.get(reduce, cv2.IMREAD_COLOR))
+
+    def release(self):
+        if self.response is not None:
+            try: self.response.close()
+            except OSError: pass
+        self.response = None
+
+    def __str__(self): return self.url
+
+
+class FileSource:
+    """Video file playback: paced to the clip's fps (realtime) or as fast as possible, optionally looped."""
+    live = False
+
+    def __init__(self, path, realtime=True, loop=True):
+        self.path = path
+        self.realtime = realtime
+        self.loop = loop
+        self.cap = None
+        self.fps = 25.0
+        self.position = 0     # frames grabbed since open, across loops
+        self.ended = False
+        self.timestamp = None
+        self.started = None
+
+    def open(self):
+        if not os.path.exists(self.path): raise FileNotFoundError(self.path)
+        self.cap = cv2.VideoCapture(self.path)
+        if not self.cap.isOpened(): raise ConnectionError(f"cannot open {self.path}")
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 25.0
+        self.position, self.ended, self.started = 0, False, time.monotonic()
+
+    def grab(self):
+        ok = self.cap.grab()
+        if not ok and self.loop and self.position:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok = self.cap.grab()
+        if not ok:
+            self.ended = True
+            return False
+        # Media clock, so target_fps drops the same frames at any replay speed
+        self.timestamp = self.position / self.fps
+        self.position += 1
+        if self.realtime:
+            delay = self.started + self.timestamp - time.monotonic()
+            if delay > 0: time.sleep(delay)
+        return True
+
+    def retrieve(self, out=None, reduce=1):
+        ok, frame = self.cap.retrieve(out) if out is not None else self.cap.retrieve()
+        return frame if ok else None
+
+    def release(self):
+        if self.cap is not None: self.cap.release()
+        self.cap = None
+
+    def __str__(self): return self.path
+
+
+def make_source(src, timeout_s=5.0, realtime=True, loop=True, backend='auto'):
+    """Pick a source for a camera URL, webcam index or video file path ('opencv' forces cv2.VideoCapture)."""
+    if backend == 'opencv': return OpenCVSource(src, timeout_s)
+    if isinstance(src, str) and src.lower().startswith(('http://', 'https://')): return MJPEGSource(src, timeout_s)
+    if isinstance(src, str) and os.path.isfile(src): return FileSource(src, realtime, loop)
+    return OpenCVSource(src, timeout_s)
+
+# --- RING BUFFER ---
+class FrameRing:
+    """Preallocated slots for the last `size` frames; decode writes straight into the next slot."""
+
+    def __init__(self, size=8):
+        self.size = size
+        self.slots = None
+        self.ids = [-1] * size
+        self.next = 0
+        self.lock = threading.Lock()
+
+    def slot(self, shape):
+        if self.slots is None or self.slots.shape[1:] != shape:
+            # First frame, or the camera came back at another resolution
+            self.slots = np.empty((self.size,) + shape, dtype=np.uint8)
+            self.ids = [-1] * self.size
+        return self.slots[self.next]
+
+    def peek(self):
+        return self.slots[self.next] if self.slots is not None else None
+
+    def commit(self, frame_id):
+        with self.lock:
+            frame = self.slots[self.next]
+            self.ids[self.next] = frame_id
+            self.next = (self.next + 1) % self.size
+        return frame
+
+    def recent(self, n=None):
+        """Up to n newest frames, newest first, as (frame_id, view) pairs."""
+        with self.lock:
+            if self.slots is None: return []
+            order = [(self.next - 1 - k) % self.size for k in range(min(n or self.size, self.size))]
+            return [(self.ids[i], self.slots[i]) for i in order if self.ids[i] >= 0]
+
+# --- STREAM (GRAB THREAD + RECONNECT + HEALTH) ---
+class CameraStream:
+    """Same surface as the old WebcamStream: start(), read(), stop(), .frame / .frame_id / .grabbed."""
+
+    def __init__(self, source, target_fps=None, decode_width=None, ring_size=8, backoff_s=0.5, max_backoff_s=30.0):
+        self.source = source
+        self.target_fps = target_fps
+        self.decode_width = decode_width
+        self.ring = FrameRing(ring_size)
+        self.backoff_s = backoff_s
+        self.max_backoff_s = max_backoff_s
+        self.frame = None
+        self.frame_id = 0     # Bumped on every new frame so consumers can skip repeats
+        self.grabbed = False
+        self.state = 'idle'   # idle / connecting / live / reconnecting / ended / stopped
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.reduce = 1       # JPEG decode scale for MJPEG sources
+        self.native_width = None
+        self.last_kept = None
+        self.next_due = None
+        self.last_frame_at = None
+        self.fps = 0.0        # EWMA of decoded frames / s
+        self.decode_ms = 0.0
+        self.counts = {'grabbed': 0, 'decoded': 0, 'dropped': 0, 'reconnects': 0, 'errors': 0}
+        self.last_error = None
+
+    def start(self):
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, name=f"camera-{self.source}", daemon=True)
+        self.thread.start()
+        return self
+
+    def read(self): return self.frame
+
+    def stop(self, timeout=2.0):
+        self.stop_event.set()
+        if self.thread is not None and self.thread is not threading.current_thread(): self.thread.join(timeout)
+        if self.thread is not None and self.thread.is_alive():
+            print(f"[WARN] Camera {self.source}: grab thread still blocked after {timeout}s, it exits on its next frame")
+        self.state = 'stopped'
+
+    # --- GRAB LOOP ---
+    def run(self):
+        backoff = self.backoff_s
+        while not self.stop_event.is_set():
+            self.state = 'connecting' if self.counts['reconnects'] == 0 else 'reconnecting'
+            decoded = self.counts['decoded']
+            try:
+                self.source.open()
+                self.state = 'live'
+                self.read_loop()
+            except Exception as e:
+                self.counts['errors'] += 1
+                self.last_error = str(e)
+            finally:
+                self.source.release()
+                self.grabbed = False
+            if self.stop_event.is_set(): break
+            if getattr(self.source, 'ended', False) and not self.source.live:
+                self.state = 'ended'
+                return
+            if self.counts['decoded'] > decoded: backoff = self.backoff_s # Was healthy: start the schedule over
+            delay = backoff * random.uniform(0.8, 1.2)
+            print(f"[WARN] Camera {self.source}: {self.last_error or 'stream ended'}; reconnecting in {delay:.1f}s")
+            self.counts['reconnects'] += 1
+            self.stop_event.wait(delay)
+            backoff = min(backoff * 2, self.max_backoff_s)
+        self.state = 'stopped'
+
+    def read_loop(self):
+        interval = 1.0 / self.target_fps if self.target_fps else 0.0
+        while not self.stop_event.is_set():
+            if not self.source.grab():
+                self.last_error = "no frame from source"
+                return
+            self.counts['grabbed'] += 1
+            now = self.source.timestamp
+            if self.next_due is not None and 0 <= self.next_due - now < interval:
+                self.counts['dropped'] += 1 # Never decoded
+                continue
+            # Due times advance by exactly one interval, so 10 of a 30 fps camera is 10, not 7.5
+            self.next_due = self.next_due + interval if self.next_due is not None and now - self.next_due < interval \
+                else now + interval
+            start = time.perf_counter()
+            frame = self.decode()
+            if frame is None:
+                self.counts['errors'] += 1
+                continue
+            self.decode_ms = 0.9 * self.decode_ms + 0.1 * (time.perf_counter() - start) * 1000
+            if self.last_kept is not None and now > self.last_kept:
+                self.fps = 0.9 * self.fps + 0.1 / (now - self.last_kept) if self.fps else 1.0 / (now - self.last_kept)
+            self.last_kept = now
+            self.last_frame_at = time.monotonic()
+            self.counts['decoded'] += 1
+            self.frame = frame
+            self.grabbed = True
+            self.frame_id += 1
+
+    def decode(self):
+        """Decode the grabbed frame into the next ring slot, scaled down to decode_width when set."""
+        slot = None
+        if isinstance(self.source, MJPEGSource):
+            if self.decode_width and self.native_width:
+                # Largest JPEG scale-down that stays at or above the target width
+                self.reduce = max(r for r in REDUCED_FLAGS if r == 1 or self.native_width // r >= self.decode_width)
+            frame = self.source.retrieve(reduce=self.reduce)
+        else:
+            # Decoder writes straight into the ring when no resize follows
+            if not self.decode_width or (self.native_width or 0) <= self.decode_width: slot = self.ring.peek()
+            frame = self.source.retrieve(slot)
+        if frame is None: return None
+        self.native_width = frame.shape[1] * self.reduce
+        if self.decode_width and frame.shape[1] > self.decode_width:
+            size = (self.decode_width, int(round(frame.shape[0] * self.decode_width / frame.shape[1])))
+            cv2.resize(frame, size, dst=self.ring.slot((size[1], size[0]) + frame.shape[2:]), interpolation=cv2.INTER_LINEAR)
+        elif frame is not slot:
+            np.copyto(self.ring.slot(frame.shape), frame)
+        return self.ring.commit(self.frame_id + 1)
+
+    def recent(self, n=None): return self.ring.recent(n)
+
+    # --- HEALTH ---
+    def stats(self):
+        age = time.monotonic() - self.last_frame_at if self.last_frame_at is not None else None
+        shape = self.frame.shape if self.frame is not None else None
+        return {'source': str(self.source), 'state': self.state, 'fps': round(self.fps, 2),
+                'target_fps': self.target_fps, **self.counts, 'last_error': self.last_error,
+                'frame_age_s': round(age, 2) if age is not None else None, 'decode_ms': round(self.decode_ms, 2),
+                'resolution': f"{shape[1]}x{shape[0]}" if shape else None}
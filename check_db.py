@@ -1,6 +1,6 @@
 import os
-import pickle
 from app import app
+from embedding_store import EmbeddingStore
 # Note: Teacher bhi import kiya
 from models import db, Student, User, Teacher
 
@@ -20,12 +20,12 @@ def inspect_data():
     else:
         print("❌ Database file NOT found! (Run app.py first)")
 
-    # 2. Check Pickle File Path
-    pkl_path = os.path.join("embeddings", "insight_db.pkl")
-    if os.path.exists(pkl_path):
-        print(f"✅ Face Data Found at:   {os.path.abspath(pkl_path)}")
+    # 2. Check Embedding Store Path
+    idx_path = os.path.join("embeddings", "faces.idx")
+    if os.path.exists(idx_path):
+        print(f"✅ Face Data Found at:   {os.path.abspath(idx_path)}")
     else:
-        print("❌ Face Data Pickle file NOT found!")
+        print("❌ Face Data Store NOT found! (Start the web app; its first request migrates the pickle)")
 
     with app.app_context():
         
@@ -70,22 +70,22 @@ def inspect_data():
 
     # --- SECTION 4: FACE DATA ---
     print("\n" + "="*60)
-    print("👤 FACE BIOMETRICS DATA (Pickle File)")
+    print("👤 FACE BIOMETRICS DATA (Embedding Store)")
     print("="*60)
 
-    if os.path.exists(pkl_path):
+    if os.path.exists(idx_path):
         try:
-            with open(pkl_path, 'rb') as f:
-                data = pickle.load(f)
-            if not data:
-                print("❌ Pickle file is empty.")
+            store = EmbeddingStore("embeddings")
+            if len(store) == 0:
+                print("❌ Embedding store is empty.")
             else:
-                print(f"Total Registered Faces: {len(data)}")
+                print(f"Total Registered Faces: {len(store)}")
+                print(f"Generation: {store.generation} | Dead Rows: {store.dead_rows}")
                 print("-" * 30)
-                for roll, embedding in data.items():
+                for roll, embedding in store.items():
                     print(f"🆔 Roll No: {roll} -> ✅ Embedding Size: {len(embedding)}")
         except Exception as e:
-            print(f"Error reading pickle: {e}")
+            print(f"Error reading embedding store: {e}")
 
     print("\n" + "="*60)
 
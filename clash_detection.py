@@ -0,0 +1,184 @@
+import threading
+from bisect import bisect_left
+from collections import defaultdict, OrderedDict
+
+# ==========================================
+# SORTED INTERVAL LIST (ONE TEACHER / COURSE / ROOM)
+# ==========================================
+def seconds(t): return t.hour * 3600 + t.minute * 60 + t.second
+
+class IntervalList:
+    """Half-open [start, end) intervals sorted by start, with a running max of ends.
+
+    `max_end[i]` is the latest end among the first i+1 intervals, so "does
+    anything starting before `end` finish after `start`?" is one bisect plus
+    one lookup. Bookings of a single resource don't overlap, so finding
+    *which* one clashes stops at the first step back.
+    """
+
+    def __init__(self):
+        self.starts, self.ends, self.ids, self.max_end = [], [], [], []
+
+    def __len__(self): return len(self.ids)
+
+    def overlap(self, start, end, exclude=None):
+        i = bisect_left(self.starts, end)  # intervals [0, i) start before `end`
+        j = i - 1
+        while j >= 0 and self.max_end[j] > start:
+            if self.ends[j] > start and self.ids[j] != exclude: return self.ids[j]
+            j -= 1
+        return None
+
+    def add(self, start, end, item_id):
+        i = bisect_left(self.starts, start)
+        self.starts.insert(i, start); self.ends.insert(i, end); self.ids.insert(i, item_id)
+        self.max_end.insert(i, 0)
+        self._fix_max(i)
+
+    def remove(self, item_id):
+        if item_id not in self.ids: return False
+        i = self.ids.index(item_id)
+        del self.starts[i], self.ends[i], self.ids[i], self.max_end[i]
+        self._fix_max(i)
+        return True
+
+    def copy(self):
+        other = IntervalList()
+        other.starts, other.ends, other.ids, other.max_end = list(self.starts), list(self.ends), list(self.ids), list(self.max_end)
+        return other
+
+    def _fix_max(self, i):
+        running = self.max_end[i - 1] if i > 0 else 0
+        for k in range(i, len(self.ends)):
+            running = max(running, self.ends[k])
+            self.max_end[k] = running
+
+
+# ==========================================
+# ONE DAY OF THE TIMETABLE
+# ==========================================
+CLASH_KEYS = ('teacher_email', 'course', 'classroom')  # checked in this order
+
+class DaySchedule:
+    def __init__(self):
+        self.index = {key: defaultdict(IntervalList) for key in CLASH_KEYS}
+        self.slots = {}  # id -> lecture dict
+
+    def find_clash(self, lecture, exclude=None):
+        """(key, clashing id) for the first resource already busy, else None."""
+        start, end = seconds(lecture['start_time']), seconds(lecture['end_time'])
+        for key in CLASH_KEYS:
+            intervals = self.index[key].get(lecture[key])
+            other = intervals.overlap(start, end, exclude) if intervals else None
+            if other is not None: return key, other
+        return None
+
+    def add(self, item_id, lecture):
+        self.slots[item_id] = lecture
+        start, end = seconds(lecture['start_time']), seconds(lecture['end_time'])
+        for key in CLASH_KEYS: self.index[key][lecture[key]].add(start, end, item_id)
+
+    def remove(self, item_id):
+        lecture = self.slots.pop(item_id, None)
+        if lecture is None: return
+        for key in CLASH_KEYS: self.index[key][lecture[key]].remove(item_id)
+
+    def copy(self):
+        other = DaySchedule()
+        other.slots = dict(self.slots)
+        for key in CLASH_KEYS:
+            for value, intervals in self.index[key].items(): other.index[key][value] = intervals.copy()
+        return other
+
+
+# ==========================================
+# CLASH DETECTOR (PER-DAY CACHE)
+# ==========================================
+class ClashDetector:
+    """Per-day interval indexes over the schedule table, loaded on first use.
+
+    `load_day(day)` returns the stored lectures of a day as (id, lecture dict)
+    pairs; `fingerprint(day)` is the day's version, a counter bumped by every
+    write to that day from any process (e.g. the CLI importer), which drops
+    the day from the cache. In-process writes call add/update/remove with the
+    version their own write produced. Only the `max_days` most recently used
+    days are kept.
+    """
+
+    def __init__(self, load_day, fingerprint=None, max_days=64):
+        self.load_day = load_day
+        self.fingerprint = fingerprint
+        self.max_days = max_days
+        self.days = OrderedDict()  # date -> (fingerprint, DaySchedule), least recently used first
+        self.lock = threading.RLock()
+
+    def day(self, day):
+        with self.lock:
+            current = self.fingerprint(day) if self.fingerprint else None
+            cached = self.days.get(day)
+            if cached is None or cached[0] != current:
+                schedule = DaySchedule()
+                for item_id, lecture in self.load_day(day): schedule.add(item_id, lecture)
+                cached = self.days[day] = (current, schedule)
+                while len(self.days) > self.max_days: self.days.popitem(last=False)
+            self.days.move_to_end(day)
+            return cached[1]
+
+    def check(self, lecture, exclude=None):
+        with self.lock: return self.day(lecture['date']).find_clash(lecture, exclude)
+
+    def check_batch(self, lectures):
+        """Validate many lectures in one pass, against the table and each other.
+
+        Returns one entry per lecture: None if it fits, else (key, clashing id)
+        where the id is an int for stored lectures or ('row', n) for an earlier
+        lecture in the same batch. The cache itself is not modified.
+        """
+        with self.lock:
+            scratch, results = {}, []
+            for n, lecture in enumerate(lectures):
+                day = lecture['date']
+                if day not in scratch: scratch[day] = self.day(day).copy()
+                clash = scratch[day].find_clash(lecture)
+                if clash is None: scratch[day].add(('row', n), lecture)
+                results.append(clash)
+            return results
+
+    def add(self, item_id, lecture, version=None):
+        with self.lock:
+            day = lecture['date']
+            if day not in self.days or not self._advance(day, version): return  # loaded (with this row) on first use
+            self.days[day][1].add(item_id, lecture)
+
+    def remove(self, item_id, day, version=None):
+        with self.lock:
+            if day not in self.days or not self._advance(day, version): return
+            self.days[day][1].remove(item_id)
+
+    def update(self, item_id, old_day, lecture, versions=None):
+        versions = versions or {}
+        with self.lock:
+            day = lecture['date']
+            if day != old_day:
+                self.remove(item_id, old_day, versions.get(old_day))
+                self.add(item_id, lecture, versions.get(day))
+            elif day in self.days and self._advance(day, versions.get(day)):
+                self.days[day][1].remove(item_id)
+                self.days[day][1].add(item_id, lecture)
+
+    def invalidate(self, day=None):
+        with self.lock:
+            if day is None: self.days.clear()
+            else: self.days.pop(day, None)
+
+    def _advance(self, day, version):
+        # Our own write moved the day to `version`: patch the cached copy only if
+        # that is the very next version, else another process wrote in between
+        # and the day is reloaded on next use
+        if not self.fingerprint: return True
+        cached = self.days[day]
+        if version is not None and cached[0] is not None and version == cached[0] + 1:
+            self.days[day] = (version, cached[1])
+            return True
+        del self.days[day]
+        return False
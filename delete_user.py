@@ -1,38 +1,26 @@
-import pickle
-import os
 from app import app
 from models import db, Student, User
-
-# File Path for Face Data
-PICKLE_DB_PATH = 'embeddings/insight_db.pkl'
+from attendance_stats import bump_version
+from embedding_store import EmbeddingStore
 
 def delete_student_data(target_roll_no):
     print(f"\n🗑️  Attempting to delete: {target_roll_no}")
     print("="*50)
 
     # -------------------------------------------
-    # 1. DELETE FROM PICKLE FILE (Face Data)
+    # 1. DELETE FROM EMBEDDING STORE (Face Data)
     # -------------------------------------------
-    if os.path.exists(PICKLE_DB_PATH):
-        try:
-            # Load Data
-            with open(PICKLE_DB_PATH, 'rb') as f:
-                faces_data = pickle.load(f)
-            
-            # Check if exists and Delete
-            if target_roll_no in faces_data:
-                del faces_data[target_roll_no]
-                
-                # Save Back
-                with open(PICKLE_DB_PATH, 'wb') as f:
-                    pickle.dump(faces_data, f)
-                print(f"✅ Deleted Face Data from Pickle for: {target_roll_no}")
-            else:
-                print(f"⚠️  Roll No '{target_roll_no}' not found in Pickle file.")
-        except Exception as e:
-            print(f"❌ Error reading pickle file: {e}")
-    else:
-        print("❌ Pickle file not found.")
+    try:
+        store = EmbeddingStore('embeddings')
+        # Tombstone delete (no full rewrite), compact once half the rows are dead
+        if store.delete(target_roll_no):
+            print(f"✅ Deleted Face Data from Store for: {target_roll_no}")
+            if store.maybe_compact() is not None:
+                print("✅ Embedding store compacted.")
+        else:
+            print(f"⚠️  Roll No '{target_roll_no}' not found in Embedding store.")
+    except Exception as e:
+        print(f"❌ Error updating embedding store: {e}")
 
     # -------------------------------------------
     # 2. DELETE FROM DATABASE (Text Data)
@@ -51,6 +39,7 @@ def delete_student_data(target_roll_no):
 
                 # Delete Student Record
                 db.session.delete(student)
+                bump_version() # cached analytics drop the student
                 db.session.commit()
                 print(f"✅ Deleted Database Record for: {target_roll_no}")
             else:
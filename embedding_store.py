@@ -0,0 +1,262 @@
+import os
+import json
+import time
+import pickle
+import numpy as np
+from gallery import EMBEDDING_DIM, _as_templates
+
+STORE_DIR = 'embeddings'
+STORE_NAME = 'faces'
+FORMAT_TAG = 'smart-attend-embeddings'
+
+# ==========================================
+# MEMORY-MAPPED EMBEDDING STORE
+# ==========================================
+# Layout inside STORE_DIR:
+#   faces.idx        -> JSON-lines log. Line 1 is the header (dim, generation,
+#                       data file name); every other line is an "add" (roll,
+#                       start row, row count) or a "del" tombstone.
+#   faces.<gen>.f32  -> raw float32 rows, append-only, opened with np.memmap.
+#
+# Appends write the rows first and the index line last, so a crash in between
+# only leaves unreferenced rows behind. Compaction writes a new generation of
+# both files and commits with a single os.replace() of the index; the previous
+# data file is kept for late readers and deleted by the following compaction.
+
+class StoreLock:
+    """Cross-process lock (works on Windows too) using an O_EXCL lock file."""
+
+    def __init__(self, path, timeout=10.0, stale_after=60.0):
+        self.path = path
+        self.timeout = timeout
+        self.stale_after = stale_after
+
+    def __enter__(self):
+        deadline = time.time() + self.timeout
+        while True:
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(fd, str(os.getpid()).encode())
+                os.close(fd)
+                return self
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.path) > self.stale_after:
+                        os.remove(self.path) # Left behind by a crashed writer
+                        continue
+                except OSError: pass
+                if time.time() > deadline: raise TimeoutError(f"Embedding store locked: {self.path}")
+                time.sleep(0.05)
+
+    def __exit__(self, *exc):
+        try: os.remove(self.path)
+        except OSError: pass
+
+
+class EmbeddingStore:
+    def __init__(self, root=STORE_DIR, name=STORE_NAME, dim=EMBEDDING_DIM):
+        self.root = root
+        self.name = name
+        self.dim = dim
+        self.row_bytes = dim * np.dtype(np.float32).itemsize
+        self.index_path = os.path.join(root, f"{name}.idx")
+        self.lock_path = os.path.join(root, f"{name}.lock")
+        self.generation = None
+        self.data_file = None
+        self.blocks = {}      # roll_no -> (start_row, row_count), live entries only
+        self.dead_rows = 0
+        self.end_row = 0      # first row after every block of this generation
+        self.matrix = None
+        self._index_offset = 0
+        os.makedirs(root, exist_ok=True)
+        self.load()
+
+    # --- PATHS & HEADER ---
+    @property
+    def data_path(self): return os.path.join(self.root, self.data_file)
+
+    def exists(self): return os.path.exists(self.index_path)
+
+    def _header(self, generation, data_file):
+        return {"format": FORMAT_TAG, "dim": self.dim, "generation": generation, "data": data_file}
+
+    def _create(self):
+        # Workers starting together on a fresh deploy all get here: one creates, the rest find it
+        with StoreLock(self.lock_path):
+            if self.exists(): return
+            data_file = f"{self.name}.0.f32"
+            open(os.path.join(self.root, data_file), 'ab').close()
+            _atomic_write(self.index_path, json.dumps(self._header(0, data_file)) + "\n")
+
+    # --- LOADING (Zero-Copy) ---
+    def load(self):
+        """Full replay of the index and a fresh memory map of the data file."""
+        if not self.exists(): self._create()
+        self.blocks, self.dead_rows, self.end_row = {}, 0, 0
+        self._index_offset = 0
+        self.generation = None
+        return self.refresh()
+
+    def refresh(self):
+        """Replay only index lines written since the last call (cheap when unchanged)."""
+        with open(self.index_path, 'rb') as f:
+            header = json.loads(f.readline())
+            if header.get("dim") != self.dim: raise ValueError(f"Store dim {header.get('dim')} != {self.dim}")
+            if header["generation"] != self.generation:
+                # First load or compacted by someone else: start over
+                self.blocks, self.dead_rows, self.end_row = {}, 0, 0
+                self.generation, self.data_file = header["generation"], header["data"]
+                self._index_offset = f.tell()
+            f.seek(self._index_offset)
+            changed = False
+            for line in f:
+                if not line.endswith(b"\n"): break # Torn last line after a crash
+                self._apply(json.loads(line))
+                self._index_offset += len(line)
+                changed = True
+        if changed or self.matrix is None or self.matrix.shape[0] != self.end_row: self._map()
+        return changed
+
+    def _apply(self, rec):
+        roll = rec["roll"]
+        if rec["op"] == "add":
+            if roll in self.blocks: self.dead_rows += self.blocks[roll][1]
+            self.blocks[roll] = (rec["start"], rec["count"])
+            self.end_row = max(self.end_row, rec["start"] + rec["count"])
+        elif rec["op"] == "del" and roll in self.blocks:
+            self.dead_rows += self.blocks.pop(roll)[1]
+
+    def _map(self):
+        # Rows past end_row are debris from a crashed append and are never mapped
+        if self.end_row == 0:
+            self.matrix = np.empty((0, self.dim), dtype=np.float32)
+        else:
+            self.matrix = np.memmap(self.data_path, dtype=np.float32, mode='r', shape=(self.end_row, self.dim))
+
+    # --- READ API ---
+    def __len__(self): return len(self.blocks)
+
+    def __contains__(self, roll): return roll in self.blocks
+
+    def rolls(self): return list(self.blocks)
+
+    def get(self, roll):
+        start, count = self.blocks[roll]
+        return self.matrix[start:start + count]
+
+    def items(self):
+        for roll in self.blocks: yield roll, self.get(roll)
+
+    def as_dict(self):
+        """roll_no -> (templates x dim) views into the memory map (no copies)."""
+        return {roll: self.get(roll) for roll in self.blocks}
+
+    @property
+    def live_rows(self): return sum(count for _, count in self.blocks.values())
+
+    # --- WRITE API (O(1) Append / Tombstone Delete) ---
+    def append(self, roll, templates):
+        return self.append_many({roll: templates})
+
+    def append_many(self, faces_data):
+        """Append several identities with one data write and one index write."""
+        with StoreLock(self.lock_path): return self._append_many(faces_data)
+
+    def _append_many(self, faces_data):
+        # Caller holds the store lock
+        self.refresh()
+        start = self.end_row
+        rows, records = [], []
+        for roll, templates in faces_data.items():
+            templates = _as_templates(templates, self.dim)
+            records.append({"op": "add", "roll": roll, "start": start, "count": len(templates)})
+            rows.append(templates)
+            start += len(templates)
+        if not records: return 0
+        with open(self.data_path, 'r+b') as f:
+            f.seek(self.end_row * self.row_bytes)
+            f.write(np.ascontiguousarray(np.vstack(rows), dtype=np.float32).tobytes())
+            f.truncate()
+            f.flush(); os.fsync(f.fileno())
+        self._append_index(records)
+        self.refresh()
+        return len(records)
+
+    def delete(self, roll):
+        with StoreLock(self.lock_path):
+            self.refresh()
+            if roll not in self.blocks: return False
+            self._append_index([{"op": "del", "roll": roll}])
+            self.refresh()
+        return True
+
+    def _append_index(self, records):
+        with open(self.index_path, 'a', encoding='utf-8') as f:
+            for rec in records: f.write(json.dumps(rec) + "\n")
+            f.flush(); os.fsync(f.fileno())
+
+    # --- COMPACTION (Atomic Rename) ---
+    def compact(self):
+        """Rewrite only live rows into a new generation and swap it in atomically."""
+        with StoreLock(self.lock_path):
+            self.refresh()
+            generation = self.generation + 1
+            data_file = f"{self.name}.{generation}.f32"
+            new_data = os.path.join(self.root, data_file)
+            lines, start = [json.dumps(self._header(generation, data_file))], 0
+            with open(new_data, 'wb') as f:
+                for roll, templates in self.items():
+                    f.write(np.ascontiguousarray(templates, dtype=np.float32).tobytes())
+                    lines.append(json.dumps({"op": "add", "roll": roll, "start": start, "count": len(templates)}))
+                    start += len(templates)
+                f.flush(); os.fsync(f.fileno())
+            _atomic_write(self.index_path, "\n".join(lines) + "\n") # Commit point
+            self.matrix = None
+            self.load()
+            self._remove_old_generations(keep=generation - 1)
+        return start
+
+    def _remove_old_generations(self, keep):
+        # Readers in other processes may still be about to map the previous
+        # generation (they re-read the index within a check interval), so it
+        # survives until the next compaction; anything older goes now.
+        prefix, suffix = f"{self.name}.", ".f32"
+        for entry in os.listdir(self.root):
+            if not (entry.startswith(prefix) and entry.endswith(suffix)): continue
+            gen = entry[len(prefix):-len(suffix)]
+            if not gen.isdigit() or int(gen) >= keep: continue
+            try: os.remove(os.path.join(self.root, entry))
+            except OSError: pass # Still mapped by another process (Windows); next compaction retries
+
+    def maybe_compact(self, max_dead_ratio=0.5):
+        total = self.live_rows + self.dead_rows
+        if total and self.dead_rows / total > max_dead_ratio: return self.compact()
+        return None
+
+
+# ==========================================
+# HELPERS
+# ==========================================
+def _atomic_write(path, text):
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush(); os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def migrate_pickle(store, pickle_path):
+    """One-time import of the old {roll_no: [emb, ...]} pickle.
+
+    The pickle is renamed to *.migrated afterwards, so it is never imported twice.
+    Runs under the store lock: when several workers start together, one
+    migrates and the others find the pickle gone.
+    """
+    if not os.path.exists(pickle_path): return 0
+    with StoreLock(store.lock_path):
+        if not os.path.exists(pickle_path): return 0
+        with open(pickle_path, 'rb') as f: faces_data = pickle.load(f)
+        store.refresh()
+        count = store._append_many({roll: data for roll, data in faces_data.items() if roll not in store})
+        os.replace(pickle_path, pickle_path + ".migrated")
+    print(f"[INFO] Migrated {count} users from {pickle_path} to {store.index_path}")
+    return count
@@ -0,0 +1,195 @@
+import os
+import zipfile
+import multiprocessing
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import cv2
+import numpy as np
+from face_models import get_face_model
+
+# ==========================================
+# HEADLESS ENROLLMENT (IMAGES / VIDEO CLIPS)
+# ==========================================
+# Same result as the live capture window (5 templates: CENTER, LEFT, RIGHT,
+# CENTER, CENTER, accepted by check_pose), but picked offline from whatever
+# photos / clips a student handed in: every detected face is scored, and each
+# pose slot takes the best-quality frame that passes check_pose. Students are
+# processed in parallel worker processes (one model per worker); the parent
+# commits every new template set to the store with a single append_many().
+#
+# Input layout (directory or .zip, an optional single wrapper folder is ignored):
+#   intake/MCA-2025-011/front.jpg, left.jpg, clip.mp4 ...   -> roll MCA-2025-011
+#   intake/MCA-2025-012.mp4                                 -> roll MCA-2025-012
+
+POSE_PLAN = ["CENTER", "LEFT", "RIGHT", "CENTER", "CENTER"]
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+VIDEO_EXTS = ('.mp4', '.avi', '.mov', '.mkv', '.webm')
+ENROLL_CONFIG = {'video_stride': 5,      # every 5th frame of a clip
+                 'max_frames': 120,      # per student, images + sampled video frames
+                 'max_width': 1280,      # larger inputs are downscaled before detection
+                 'min_face': 80,         # px, shorter bbox side
+                 'min_det_score': 0.6,
+                 'sharp_ref': 100.0}     # Laplacian variance counted as fully sharp
+
+def check_pose(face, target_pose):
+    try:
+        kps = face.kps
+        nose_x = kps[2][0]
+        eye_center = (kps[0][0] + kps[1][0]) / 2
+        eye_dist = kps[1][0] - kps[0][0]
+        if eye_dist < 10: return False, 0.0
+
+        ratio = (nose_x - eye_center) / eye_dist
+
+        is_valid = False
+        # Strict thresholds for High Accuracy Model
+        if target_pose == "CENTER" and abs(ratio) < 0.15: is_valid = True
+        elif target_pose == "LEFT" and ratio < -0.20: is_valid = True
+        elif target_pose == "RIGHT" and ratio > 0.20: is_valid = True
+        return is_valid, ratio
+    except: return False, 0.0
+
+def face_quality(face, frame, config=ENROLL_CONFIG):
+    """Detector confidence x size x sharpness, each in [0, 1]; 0 for unusable faces."""
+    x1, y1, x2, y2 = [int(v) for v in face.bbox]
+    side = min(x2 - x1, y2 - y1)
+    if face.det_score < config['min_det_score'] or side < config['min_face']: return 0.0
+    crop = frame[max(0, y1):max(0, y2), max(0, x1):max(0, x2)]
+    if crop.size == 0: return 0.0
+    sharpness = cv2.Laplacian(cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY), cv2.CV_64F).var()
+    return float(face.det_score) * min(1.0, side / (2 * config['min_face'])) * min(1.0, sharpness / config['sharp_ref'])
+
+# --- SOURCES ---
+def is_media(name): return name.lower().endswith(IMAGE_EXTS + VIDEO_EXTS)
+
+def group_by_roll(paths):
+    """Relative media paths -> {roll: [paths]} (folder name, or file stem at the top level)."""
+    parts = [p.replace('\\', '/').split('/') for p in paths]
+    if len({p[0] for p in parts}) == 1 and all(len(p) > 1 for p in parts) and any(len(p) > 2 for p in parts):
+        parts = [p[1:] for p in parts]  # single wrapper folder, e.g. intake/<roll>/...
+    rolls = {}
+    for path, p in zip(paths, parts):
+        roll = os.path.splitext(p[0])[0] if len(p) == 1 else p[0]
+        rolls.setdefault(roll, []).append(path)
+    return {roll: sorted(files) for roll, files in sorted(rolls.items())}
+
+def discover(path):
+    """{roll: [(container, name)]}; container is the zip path, or None for plain files."""
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as zf:
+            names = [n for n in zf.namelist() if not n.endswith('/') and is_media(n) and '__MACOSX' not in n]
+        return {roll: [(path, n) for n in files] for roll, files in group_by_roll(names).items()}
+    names = [os.path.relpath(os.path.join(d, f), path) for d, _, files in os.walk(path) for f in files if is_media(f)]
+    return {roll: [(None, os.path.join(path, n)) for n in files] for roll, files in group_by_roll(names).items()}
+
+def read_frames(source, config=ENROLL_CONFIG):
+    container, name = source
+    if name.lower().endswith(IMAGE_EXTS):
+        if container:
+            with zipfile.ZipFile(container) as zf: data = np.frombuffer(zf.read(name), np.uint8)
+        else: data = np.fromfile(name, np.uint8)
+        frame = cv2.imdecode(data, cv2.IMREAD_COLOR)
+        if frame is not None: yield fit_width(frame, config['max_width'])
+        return
+    tmp = None
+    if container:
+        # VideoCapture needs a real file
+        with zipfile.ZipFile(container) as zf, tempfile.NamedTemporaryFile(suffix=os.path.splitext(name)[1], delete=False) as f:
+            f.write(zf.read(name))
+            tmp = name = f.name
+    cap = cv2.VideoCapture(name)
+    try:
+        n = 0
+        while True:
+            if not cap.grab(): break
+            if n % config['video_stride'] == 0:
+                ok, frame = cap.retrieve()
+                if ok: yield fit_width(frame, config['max_width'])
+            n += 1
+    finally:
+        cap.release()
+        if tmp: os.remove(tmp)
+
+def fit_width(frame, max_width):
+    h, w = frame.shape[:2]
+    if w <= max_width: return frame
+    return cv2.resize(frame, (max_width, int(h * max_width / w)), interpolation=cv2.INTER_AREA)
+
+# --- SAMPLE SELECTION ---
+def pick_samples(candidates):
+    """candidates: [(quality, frame_no, embedding, {pose: valid})] -> (templates, missing poses).
+    Each POSE_PLAN slot gets the best unused frame; repeat CENTER slots may stay empty
+    (a photo set often has one front shot), but every pose needs at least one."""
+    used, templates, filled = set(), [], set()
+    for pose in POSE_PLAN:
+        best = max((c for c in candidates if c[3][pose] and c[1] not in used), key=lambda c: c[0], default=None)
+        if best is None: continue
+        used.add(best[1])
+        filled.add(pose)
+        templates.append(best[2])
+    return templates, [pose for pose in dict.fromkeys(POSE_PLAN) if pose not in filled]
+
+def enroll_one(roll, sources, config=ENROLL_CONFIG, model=None):
+    if model is None: model = worker_model()
+    if model is None: return {'roll': roll, 'ok': False, 'msg': "AI Model Not Loaded", 'templates': None}
+    candidates, frames = [], 0
+    for source in sources:
+        for frame in read_frames(source, config):
+            if frames >= config['max_frames']: break
+            frames += 1
+            faces = model.get(frame)
+            if not faces: continue
+            face = max(faces, key=lambda x: (x.bbox[2]-x.bbox[0]) * (x.bbox[3]-x.bbox[1]))
+            quality = face_quality(face, frame, config)
+            if quality <= 0: continue
+            poses = {pose: check_pose(face, pose)[0] for pose in set(POSE_PLAN)}
+            if any(poses.values()):
+                candidates.append((quality, frames, face.embedding / np.linalg.norm(face.embedding), poses))
+    templates, missing = pick_samples(candidates)
+    if missing:
+        msg = f"no usable {', '.join(missing)} face in {frames} frames" if frames else "no readable images / video"
+        return {'roll': roll, 'ok': False, 'msg': msg, 'templates': None}
+    return {'roll': roll, 'ok': True, 'msg': f"{len(templates)} templates from {frames} frames",
+            'templates': np.asarray(templates, dtype=np.float32)}
+
+# --- PROCESS POOL ---
+_role = 'enrollment'
+
+def init_worker(role):
+    global _role
+    _role = role
+    cv2.setNumThreads(1)  # parallelism comes from the pool, not from OpenCV
+
+def worker_model(): return get_face_model(_role)
+
+def enroll_batch(jobs, store, workers=4, config=ENROLL_CONFIG, replace=False, dry_run=False, role='enrollment',
+                 progress=None):
+    """Enroll {roll: sources}; returns {'enrolled', 'failed', 'skipped'}. One store write for the whole batch."""
+    skipped = [] if replace else sorted(roll for roll in jobs if roll in store)
+    todo = {roll: sources for roll, sources in jobs.items() if replace or roll not in store}
+    results = []
+
+    def done(result):
+        results.append(result)
+        if progress: progress(len(results), len(todo), result)
+
+    def failed(roll, e): return {'roll': roll, 'ok': False, 'msg': f"error: {e}", 'templates': None}
+
+    if workers <= 1:
+        model = get_face_model(role)
+        for roll, sources in todo.items():
+            try: done(enroll_one(roll, sources, config, model))
+            except Exception as e: done(failed(roll, e))
+    else:
+        # spawn, not fork: the caller may be a threaded web server
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=init_worker, initargs=(role,)) as pool:
+            futures = {pool.submit(enroll_one, roll, sources, config): roll for roll, sources in todo.items()}
+            for future in as_completed(futures):
+                try: done(future.result())
+                except Exception as e: done(failed(futures[future], e))
+
+    new_templates = {r['roll']: r['templates'] for r in sorted(results, key=lambda r: r['roll']) if r['ok']}
+    if new_templates and not dry_run: store.append_many(new_templates)
+    return {'enrolled': sorted(new_templates), 'skipped': skipped,
+            'failed': sorted(({'roll': r['roll'], 'msg': r['msg']} for r in results if not r['ok']), key=lambda f: f['roll'])}
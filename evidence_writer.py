@@ -0,0 +1,159 @@
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import cv2
+
+# ==========================================
+# ASYNC BUNK-PROOF EVIDENCE WRITER
+# ==========================================
+KEPT_DIR = 'recorded'
+
+class EvidenceWriter:
+    """Saves bunk proofs on a background pool; submit() never touches the disk.
+
+    Per proof it writes the face crop (full resolution, `crop_margin` around
+    the box) and a `thumb_width` px context thumbnail of the whole frame.
+    An identity is saved at most once per `cooldown_s` per scope (camera
+    session), the backlog is capped at `max_pending` jobs (extra ones are
+    dropped, not queued) and the folder is kept under `quota_mb` by deleting
+    the oldest files first. Proofs of recorded bunks are moved by keep() into
+    the `recorded/` subfolder, which is outside the quota and never evicted.
+    """
+
+    def __init__(self, out_dir='static/bunk_proofs', url_prefix='/static/bunk_proofs', workers=2, max_pending=32,
+                 jpeg_quality=85, thumb_width=320, crop_margin=0.4, cooldown_s=60.0, quota_mb=500):
+        self.out_dir = out_dir
+        self.url_prefix = url_prefix
+        self.jpeg_quality = jpeg_quality
+        self.thumb_width = thumb_width
+        self.crop_margin = crop_margin
+        self.cooldown_s = cooldown_s
+        self.quota_bytes = int(quota_mb * 1024 * 1024)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="evidence")
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.lock = threading.Lock()
+        self.last_saved = {}     # (scope, roll_no) -> monotonic time of the last accepted proof
+        self.files = deque()     # (path, size), oldest first
+        self.used_bytes = 0
+        self.saved = self.failed = self.skipped_cooldown = self.dropped = self.evicted = 0
+        self.kept_dir = os.path.join(out_dir, KEPT_DIR)
+        if not os.path.exists(self.kept_dir): os.makedirs(self.kept_dir)
+        self._scan()
+
+    def _scan(self):
+        entries = []
+        for name in os.listdir(self.out_dir):
+            path = os.path.join(self.out_dir, name)
+            if os.path.isfile(path): entries.append((os.path.getmtime(path), path, os.path.getsize(path)))
+        for _, path, size in sorted(entries):
+            self.files.append((path, size))
+            self.used_bytes += size
+
+    # --- CLIENT API (non-blocking) ---
+    def submit(self, roll, frame, bbox, score, on_saved=None, scope=None):
+        """Queue a proof: 'queued', 'cooldown' (same scope + roll saved recently) or 'dropped' (backlog full).
+
+        on_saved(proof) is called from the writer thread once the write finished;
+        proof['image'] is None (and proof['error'] set) if it failed.
+        """
+        now, key = time.monotonic(), (scope, roll)
+        with self.lock:
+            if now - self.last_saved.get(key, -1e9) < self.cooldown_s:
+                self.skipped_cooldown += 1
+                return 'cooldown'
+            if not self.slots.acquire(blocking=False):
+                self.dropped += 1
+                return 'dropped'
+            self.last_saved[key] = now
+            if len(self.last_saved) > 4096: # Ended sessions leave keys behind
+                self.last_saved = {k: t for k, t in self.last_saved.items() if now - t < self.cooldown_s}
+        self.pool.submit(self._write, roll, frame, bbox, score, on_saved, scope)
+        return 'queued'
+
+    def stats(self):
+        with self.lock:
+            return {"saved": self.saved, "failed": self.failed, "skipped_cooldown": self.skipped_cooldown, "dropped": self.dropped,
+                    "evicted": self.evicted, "used_mb": round(self.used_bytes / 1024 / 1024, 2),
+                    "quota_mb": round(self.quota_bytes / 1024 / 1024, 2)}
+
+    def keep(self, image_url):
+        """Move a proof (face crop + context) out of the evictable folder; returns its new URL.
+
+        Called when a bunk is recorded with it. Idempotent: a proof kept earlier
+        (the same photo reused by a later alert) just gets its kept URL back;
+        one that no longer exists keeps its URL.
+        """
+        prefix = self.url_prefix + '/'
+        if not image_url or not image_url.startswith(prefix) or '/' in image_url[len(prefix):]: return image_url
+        name = image_url[len(prefix):]
+        stem, ext = os.path.splitext(name)
+        for part in (name, f"{stem}_ctx{ext}"):
+            src, dst = os.path.join(self.out_dir, part), os.path.join(self.kept_dir, part)
+            try: os.replace(src, dst)
+            except OSError: continue # Kept already (or never written / evicted)
+            with self.lock:
+                for entry in self.files:
+                    if entry[0] == src:
+                        self.files.remove(entry)
+                        self.used_bytes -= entry[1]
+                        break
+        return f"{prefix}{KEPT_DIR}/{name}" if os.path.exists(os.path.join(self.kept_dir, name)) else image_url
+
+    def shutdown(self): self.pool.shutdown(wait=True)
+
+    # --- WORKER ---
+    def _write(self, roll, frame, bbox, score, on_saved, scope=None):
+        try:
+            # Two cameras may save the same student in the same second
+            stem = f"{roll}_{datetime.now().strftime('%Y%m%d_%H%M%S')}" + (f"_{scope}" if scope else "")
+            face_name = f"{stem}.jpg"
+            context_name = f"{stem}_ctx.jpg"
+            h, w = frame.shape[:2]
+            thumb = cv2.resize(frame, (self.thumb_width, max(1, int(h * self.thumb_width / w))), interpolation=cv2.INTER_AREA)
+            self._save(face_name, self._crop(frame, bbox))
+            self._save(context_name, thumb)
+            with self.lock: self.saved += 1
+            proof = {'roll': roll, 'score': score,
+                     'image': f"{self.url_prefix}/{face_name}", 'context': f"{self.url_prefix}/{context_name}"}
+        except Exception as e:
+            print(f"[ERROR] Evidence write failed for {roll}: {e}")
+            with self.lock:
+                self.failed += 1
+                self.last_saved.pop((scope, roll), None) # Nothing saved: the next sighting may try again
+            proof = {'roll': roll, 'score': score, 'image': None, 'context': None, 'error': str(e)}
+        finally:
+            self.slots.release()
+        if on_saved is not None: on_saved(proof)
+
+    def _crop(self, frame, bbox):
+        h, w = frame.shape[:2]
+        x1, y1, x2, y2 = bbox[:4]
+        mx, my = (x2 - x1) * self.crop_margin, (y2 - y1) * self.crop_margin
+        x1, y1 = int(max(0, x1 - mx)), int(max(0, y1 - my))
+        x2, y2 = int(min(w, x2 + mx)), int(min(h, y2 + my))
+        if x2 <= x1 or y2 <= y1: return frame
+        return frame[y1:y2, x1:x2]
+
+    def _save(self, name, img):
+        ok, buf = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if not ok: raise IOError(f"JPEG encode failed: {name}")
+        path = os.path.join(self.out_dir, name)
+        tmp = path + ".tmp"
+        with open(tmp, 'wb') as f: f.write(buf.tobytes())
+        os.replace(tmp, path)
+        with self.lock:
+            self.files.append((path, len(buf)))
+            self.used_bytes += len(buf)
+            self._evict()
+
+    def _evict(self):
+        # Oldest-first until back under quota (never the file just written)
+        while self.used_bytes > self.quota_bytes and len(self.files) > 1:
+            path, size = self.files.popleft()
+            try: os.remove(path)
+            except OSError: pass
+            self.used_bytes -= size
+            self.evicted += 1
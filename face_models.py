@@ -0,0 +1,86 @@
+import os
+import time
+import threading
+
+# ==========================================
+# MODEL TIERS (PER ROLE)
+# ==========================================
+# Every role names an InsightFace pack and only the submodules it needs, so
+# landmark / gender-age heads are never loaded. Roles with identical settings
+# share one loaded instance.
+#
+# NOTE: surveillance embeddings are matched against templates captured at
+# enrollment, so both roles must use the same recognition network
+# (buffalo_l = w600k_r50; buffalo_s / buffalo_sc = w600k_mbf). Switching the
+# surveillance tier to a small pack means re-enrolling with the same pack.
+MODEL_TIERS = {
+    'surveillance': {
+        'name': os.environ.get('SURVEILLANCE_MODEL', 'buffalo_l'),
+        'allowed_modules': ['detection', 'recognition'],
+        'det_size': (640, 640),
+    },
+    'enrollment': {
+        'name': os.environ.get('ENROLLMENT_MODEL', 'buffalo_l'),
+        'allowed_modules': ['detection', 'recognition'],
+        'det_size': (640, 640),
+    },
+}
+PROVIDERS = ['CPUExecutionProvider']
+# A failed load (missing pack, broken install) is retried after a backoff that
+# doubles up to the max, instead of on every frame / request
+RETRY_BACKOFF_S = (5.0, 300.0)
+
+_models = {}
+_failures = {}  # tier key -> (retry at, current backoff)
+_lock = threading.Lock()
+
+# ==========================================
+# LAZY SHARED SINGLETONS
+# ==========================================
+def _tier_key(tier):
+    return (tier['name'], tuple(tier['allowed_modules']), tuple(tier['det_size']))
+
+def get_face_model(role='surveillance'):
+    """Loaded FaceAnalysis for `role`, created on first use; None if loading fails (retried with backoff)."""
+    key = _tier_key(MODEL_TIERS[role])
+    model = _models.get(key)
+    if model is not None: return model
+    failed = _failures.get(key)
+    if failed and time.monotonic() < failed[0]: return None
+    with _lock:
+        model = _models.get(key)
+        if model is not None: return model
+        failed = _failures.get(key)
+        if failed and time.monotonic() < failed[0]: return None
+        model = _load(role, MODEL_TIERS[role], quiet=failed is not None)
+        if model is None:
+            delay = min(failed[1] * 2, RETRY_BACKOFF_S[1]) if failed else RETRY_BACKOFF_S[0]
+            _failures[key] = (time.monotonic() + delay, delay)
+            return None
+        _failures.pop(key, None)
+        _models[key] = model
+        _check_recognition_match()
+    return model
+
+def _load(role, tier, quiet=False):
+    # quiet: a retry after a failure that was already reported
+    try:
+        from insightface.app import FaceAnalysis
+        if not quiet: print(f"[INFO] Loading InsightFace ({tier['name']}) for {role}: {', '.join(tier['allowed_modules'])}...")
+        model = FaceAnalysis(name=tier['name'], allowed_modules=tier['allowed_modules'], providers=PROVIDERS)
+        model.prepare(ctx_id=0, det_size=tier['det_size'])
+        print(f"[INFO] AI Ready ({role}).")
+        return model
+    except Exception as e:
+        if not quiet: print(f"AI Error: {e} (retried with backoff, silently, up to every {RETRY_BACKOFF_S[1]:.0f}s)")
+        return None
+
+def _check_recognition_match():
+    files = {os.path.basename(m.models['recognition'].model_file)
+             for m in _models.values() if 'recognition' in m.models}
+    if len(files) > 1:
+        print(f"[WARN] Roles use different recognition models {sorted(files)}; embeddings will not match!")
+
+def is_loaded(role='surveillance'): return _tier_key(MODEL_TIERS[role]) in _models
+
+def loaded_models(): return {f"{k[0]}:{'+'.join(k[1])}": v for k, v in _models.items()}
@@ -0,0 +1,176 @@
+import time
+import argparse
+import threading
+import numpy as np
+from gallery import normalize_rows, _as_templates, EMBEDDING_DIM
+
+# ==========================================
+# TEMPLATE CONSOLIDATION (PER IDENTITY)
+# ==========================================
+# Enrollment stores 5 raw templates per student, three of them CENTER frames
+# taken a moment apart (near-duplicates). consolidate() keeps:
+#   row 0   -> quality-weighted mean of all templates (the identity's consensus)
+#   row 1.. -> up to max_exemplars diverse templates (farthest-point picks),
+#              after merging near-duplicates (cosine >= dedupe_threshold).
+# There is no stored per-template quality, so weights default to each
+# template's agreement with the others: a blurred / mislabeled sample that
+# disagrees with the rest barely moves the mean.
+
+CONSOLIDATE_CONFIG = {'dedupe_threshold': 0.95, 'max_exemplars': 3, 'use_mean': True, 'outlier_ratio': 0.5}
+
+def consensus_weights(templates):
+    if len(templates) < 3: return np.ones(len(templates), dtype=np.float32)
+    sims = templates @ templates.T
+    np.fill_diagonal(sims, 0)
+    return np.clip(sims.sum(axis=1) / (len(templates) - 1), 0.05, 1.0)
+
+def dedupe(templates, weights, threshold):
+    """Greedy, best weight first: a template within `threshold` of a kept one is merged into it.
+    Returns the kept rows best-first, with their merged weights."""
+    keep, rows, kept_weights = [], [], []
+    for i in np.argsort(-weights, kind='stable'):
+        if keep:
+            sims = templates[keep] @ templates[i]
+            j = int(np.argmax(sims))
+            if sims[j] >= threshold:
+                rows[j] = rows[j] + weights[i] * templates[i]
+                kept_weights[j] += weights[i]
+                continue
+        keep.append(i)
+        rows.append(weights[i] * templates[i])
+        kept_weights.append(float(weights[i]))
+    return normalize_rows(np.vstack(rows)), np.asarray(kept_weights, dtype=np.float32)
+
+def farthest_points(templates, k):
+    """Row 0 plus the rows that spread out the most (each pick least similar to those already chosen)."""
+    if len(templates) <= k: return templates
+    chosen, closest = [0], templates @ templates[0]
+    while len(chosen) < k:
+        masked = closest.copy()
+        masked[chosen] = np.inf
+        i = int(np.argmin(masked))
+        chosen.append(i)
+        closest = np.maximum(closest, templates @ templates[i])
+    return templates[sorted(chosen)]
+
+def consolidate(templates, weights=None, dedupe_threshold=0.95, max_exemplars=3, use_mean=True, outlier_ratio=0.5):
+    templates = normalize_rows(_as_templates(templates, EMBEDDING_DIM))
+    if len(templates) == 0: return templates
+    weights = consensus_weights(templates) if weights is None else np.asarray(weights, dtype=np.float32)
+    rows = []
+    if use_mean: rows.append(normalize_rows((weights[:, None] * templates).sum(axis=0)))
+    if max_exemplars:
+        # Outliers (weight far below the median) still count in the mean but are never exemplars
+        inliers = weights >= outlier_ratio * np.median(weights)
+        exemplars, _ = dedupe(templates[inliers], weights[inliers], dedupe_threshold)
+        rows.append(farthest_points(exemplars, max_exemplars))
+    return np.ascontiguousarray(np.vstack(rows), dtype=np.float32)
+
+def compact_gallery(store, config=CONSOLIDATE_CONFIG):
+    """Consolidate every identity in the store (one append_many, then a store compaction)."""
+    rows_before = store.live_rows
+    updates = {roll: consolidate(np.array(t), **config) for roll, t in store.items()}
+    if updates:
+        store.append_many(updates)
+        store.compact()
+    return {'identities': len(updates), 'rows_before': rows_before, 'rows_after': store.live_rows}
+
+# ==========================================
+# ONLINE TEMPLATE UPDATES (FROM SURVEILLANCE)
+# ==========================================
+# Confirmed tracks that match with a high score feed observe(). A sample is
+# only worth keeping if it is confidently the student yet unlike every stored
+# template (new lighting / angle / haircut). A sample's best similarity to the
+# stored templates is its match score, so `novelty` is on the score scale:
+# same-person scores sit around 0.5-0.8 and a sample at or above it is
+# redundant. Pending samples are committed every flush_s seconds with one
+# store write, and every updated identity is re-consolidated to
+# max_templates rows (the mean row keeps the enrollment consensus). The gallery
+# therefore stays the size it had after enrollment instead of growing by one
+# noisy row per sighting, which costs match time and raises FAR.
+# min_score / novelty / max_templates are tuned with bench_templates.py.
+
+UPDATE_CONFIG = {'min_score': 0.70, 'novelty': 0.75, 'max_templates': 4, 'cooldown_s': 600, 'flush_s': 30}
+
+class TemplateUpdater:
+    def __init__(self, store, get_gallery, on_update=None, min_score=0.70, novelty=0.75, max_templates=4,
+                 cooldown_s=600, flush_s=30, consolidate_config=CONSOLIDATE_CONFIG):
+        self.store = store
+        self.get_gallery = get_gallery
+        self.on_update = on_update            # fn(roll, templates), e.g. invalidate a cache
+        self.min_score = min_score
+        self.novelty = novelty
+        self.max_templates = max_templates
+        self.cooldown_s = cooldown_s
+        self.flush_s = flush_s
+        self.consolidate_config = consolidate_config
+        self.pending = {}                     # roll -> (score, embedding), best sample since last flush
+        self.last_update = {}                 # roll -> monotonic time of last committed update
+        self.counts = {'observed': 0, 'redundant': 0, 'added': 0}
+        self.lock = threading.Lock()
+        self.thread = None
+        self.stop_event = threading.Event()
+
+    def observe(self, roll, embedding, score):
+        """Cheap; called from the match stage for confirmed, high-score tracks."""
+        if score < self.min_score or embedding is None or roll == "Unknown": return
+        if time.monotonic() - self.last_update.get(roll, -np.inf) < self.cooldown_s: return
+        with self.lock:
+            self.counts['observed'] += 1
+            if score > self.pending.get(roll, (-1.0, None))[0]: self.pending[roll] = (score, np.array(embedding, dtype=np.float32))
+
+    def flush(self):
+        with self.lock: pending, self.pending = self.pending, {}
+        updates = {}
+        for roll, (_, embedding) in pending.items():
+            if roll not in self.store: continue
+            current = np.array(self.store.get(roll))
+            sample = normalize_rows(embedding)
+            if len(current) and float(np.max(current @ sample[0])) >= self.novelty:
+                self.counts['redundant'] += 1
+                continue
+            config = {**self.consolidate_config, 'max_exemplars': self.max_templates - 1}
+            updates[roll] = consolidate(np.vstack([current, sample]), **config)
+        if not updates: return 0
+        self.store.append_many(updates)
+        gallery = self.get_gallery()
+        now = time.monotonic()
+        for roll, templates in updates.items():
+            gallery.add(roll, templates)
+            if self.on_update: self.on_update(roll, self.store.get(roll))
+            self.last_update[roll] = now
+        self.counts['added'] += len(updates)
+        return len(updates)
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self.run, name='template-updater', daemon=True)
+            self.thread.start()
+        return self
+
+    def run(self):
+        while not self.stop_event.wait(self.flush_s):
+            try: self.flush()
+            except Exception as e: print(f"[ERROR] Template update failed: {e}")
+
+    def stop(self):
+        self.stop_event.set()
+        try: self.flush()
+        except Exception as e: print(f"[ERROR] Template update failed: {e}")
+
+    def stats(self):
+        with self.lock: return {**self.counts, 'pending': len(self.pending)}
+
+if __name__ == "__main__":
+    from embedding_store import EmbeddingStore, STORE_DIR
+    parser = argparse.ArgumentParser(description="Consolidate every identity's templates (mean + diverse exemplars)")
+    parser.add_argument("--store", default=STORE_DIR)
+    parser.add_argument("--max-exemplars", type=int, default=CONSOLIDATE_CONFIG['max_exemplars'])
+    parser.add_argument("--dedupe-threshold", type=float, default=CONSOLIDATE_CONFIG['dedupe_threshold'])
+    parser.add_argument("--no-mean", action="store_true", help="keep exemplars only")
+    args = parser.parse_args()
+    config = {**CONSOLIDATE_CONFIG, 'max_exemplars': args.max_exemplars, 'dedupe_threshold': args.dedupe_threshold,
+              'use_mean': not args.no_mean}
+    report = compact_gallery(EmbeddingStore(args.store), config)
+    print(f"[INFO] {report['identities']} identities: {report['rows_before']} -> {report['rows_after']} template rows.")
@@ -0,0 +1,138 @@
+import numpy as np
+
+# Threshold 0.50 for Buffalo_L (same rule the surveillance loop always used)
+MATCH_THRESHOLD = 0.50
+EMBEDDING_DIM = 512
+
+# ==========================================
+# GALLERY MATCHER (VECTORIZED MULTI-TEMPLATE)
+# ==========================================
+class GalleryMatcher:
+    """All templates packed into one float32 matrix, scored with one matmul.
+
+    Templates of a roll number are stored as one contiguous block of rows, so
+    the per-identity "max over templates" becomes a single np.maximum.reduceat.
+    """
+
+    def __init__(self, dim=EMBEDDING_DIM):
+        self.dim = dim
+        self.matrix = np.empty((0, dim), dtype=np.float32)
+        self.starts = np.empty(0, dtype=np.int64)   # first row of every block
+        self.rolls = []                             # roll_no of every block
+        self.block_of = {}                          # roll_no -> block index
+
+    @classmethod
+    def from_dict(cls, faces_db, dim=EMBEDDING_DIM):
+        matcher = cls(dim)
+        rows, starts, rolls = [], [], []
+        offset = 0
+        for roll, saved_data in faces_db.items():
+            templates = _as_templates(saved_data, dim)
+            if len(templates) == 0: continue
+            starts.append(offset)
+            rolls.append(roll)
+            rows.append(templates)
+            offset += len(templates)
+        if rows:
+            matcher.matrix = np.ascontiguousarray(np.vstack(rows), dtype=np.float32)
+        matcher.starts = np.asarray(starts, dtype=np.int64)
+        matcher.rolls = rolls
+        matcher.block_of = {roll: i for i, roll in enumerate(rolls)}
+        return matcher
+
+    def __len__(self): return len(self.rolls)
+
+    def __contains__(self, roll): return roll in self.block_of
+
+    @property
+    def num_templates(self): return self.matrix.shape[0]
+
+    # --- INCREMENTAL UPDATES (Registration / Deletion) ---
+    def add(self, roll, templates):
+        templates = _as_templates(templates, self.dim)
+        if roll in self.block_of: self.remove(roll)
+        if len(templates) == 0: return
+        self.starts = np.append(self.starts, self.matrix.shape[0])
+        self.matrix = np.ascontiguousarray(np.vstack([self.matrix, templates]), dtype=np.float32)
+        self.block_of[roll] = len(self.rolls)
+        self.rolls.append(roll)
+
+    def remove(self, roll):
+        idx = self.block_of.pop(roll, None)
+        if idx is None: return False
+        start = self.starts[idx]
+        end = self.starts[idx + 1] if idx + 1 < len(self.starts) else self.matrix.shape[0]
+        size = end - start
+        self.matrix = np.ascontiguousarray(np.delete(self.matrix, np.s_[start:end], axis=0))
+        self.starts = np.delete(self.starts, idx)
+        self.starts[idx:] -= size
+        del self.rolls[idx]
+        self.block_of = {r: i for i, r in enumerate(self.rolls)}
+        return True
+
+    # --- SCORING ---
+    def identity_scores(self, embeddings):
+        """(faces x identities) matrix of best-template cosine scores."""
+        queries = normalize_rows(embeddings)
+        if len(self.rolls) == 0:
+            return np.empty((queries.shape[0], 0), dtype=np.float32)
+        scores = queries @ self.matrix.T
+        return np.maximum.reduceat(scores, self.starts, axis=1)
+
+    def search(self, embeddings, top_k=1):
+        """Top-k (roll_no, score) per face, best first."""
+        per_identity = self.identity_scores(embeddings)
+        return top_k_from_scores(per_identity, self.rolls, top_k)
+
+    def identify(self, embeddings):
+        """Best (identity, score) per face, same rule as the old loop.
+
+        Identity stays "Unknown" with score 0 unless some roll scores above 0;
+        ties go to the roll enrolled first. Callers apply MATCH_THRESHOLD.
+        """
+        per_identity = self.identity_scores(embeddings)
+        return identify_from_scores(per_identity, self.rolls)
+
+
+# ==========================================
+# HELPERS
+# ==========================================
+def normalize_rows(embeddings):
+    queries = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+    norms = np.linalg.norm(queries, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return queries / norms
+
+def _as_templates(saved_data, dim):
+    # Old DB entries can be a single vector, new ones a Multi-Template List
+    if isinstance(saved_data, (list, tuple)):
+        if len(saved_data) == 0: return np.empty((0, dim), dtype=np.float32)
+        return np.vstack([np.asarray(t, dtype=np.float32).reshape(1, dim) for t in saved_data])
+    return np.asarray(saved_data, dtype=np.float32).reshape(-1, dim)
+
+def identify_from_scores(per_identity, rolls):
+    results = []
+    if per_identity.shape[1] == 0:
+        return [("Unknown", 0.0) for _ in range(per_identity.shape[0])]
+    best = np.argmax(per_identity, axis=1)
+    for i, j in enumerate(best):
+        score = float(per_identity[i, j])
+        if score > 0: results.append((rolls[j], score))
+        else: results.append(("Unknown", 0.0))
+    return results
+
+def top_k_from_scores(per_identity, rolls, top_k):
+    n_faces, n_ids = per_identity.shape
+    k = min(top_k, n_ids)
+    if k == 0: return [[] for _ in range(n_faces)]
+    if k < n_ids:
+        part = np.argpartition(-per_identity, k - 1, axis=1)[:, :k]
+    else:
+        part = np.tile(np.arange(n_ids), (n_faces, 1))
+    results = []
+    for i in range(n_faces):
+        cand = part[i]
+        # stable sort keeps enrollment order on ties
+        order = cand[np.argsort(-per_identity[i, cand], kind='stable')]
+        results.append([(rolls[j], float(per_identity[i, j])) for j in order])
+    return results
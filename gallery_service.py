@@ -0,0 +1,159 @@
+import os
+import time
+import threading
+import numpy as np
+from gallery import GalleryMatcher, normalize_rows
+from ann_index import IVFFlatIndex, ANN_MIN_IDENTITIES
+from embedding_store import EmbeddingStore, STORE_DIR, STORE_NAME
+
+# ==========================================
+# SHARED, HOT-RELOADING GALLERY SERVICE
+# ==========================================
+# The embedding store's data file is the one shared copy: every web worker
+# process and camera thread maps it with np.memmap, so the OS page cache holds
+# the templates once no matter how many processes match against them. The
+# index log is the version counter: enrollments, template updates and
+# deletions (delete_user.py, another worker, batch_enroll.py) append a line to
+# it, and each SharedGallery notices the new size on a stat() at most every
+# check_interval seconds, replays only the new lines (store.refresh()) and
+# patches its matcher. Nothing is reloaded in full and nobody restarts.
+#
+# Small galleries are scored straight off the memory map (MappedGalleryMatcher,
+# no private copy). At ann_min_identities and above the IVF index is used; it
+# keeps its own bucketed copy per process, patched with only the added /
+# removed roll numbers. Matchers handed out by current() are never modified:
+# changes go into a new (or copied) matcher that replaces the reference.
+
+class MappedGalleryMatcher(GalleryMatcher):
+    """GalleryMatcher over an EmbeddingStore's memory map (rows are never copied).
+
+    Blocks sit in store order with tombstoned rows between them; those rows are
+    scored too but masked to -inf before the per-identity reduceat. Read-only:
+    write to the store and let SharedGallery pick the change up.
+    """
+
+    @classmethod
+    def from_store(cls, store):
+        matcher = cls(store.dim)
+        blocks = sorted((start, count, roll) for roll, (start, count) in store.blocks.items() if count)
+        matcher.matrix = store.matrix
+        matcher.starts = np.asarray([start for start, _, _ in blocks], dtype=np.int64)
+        matcher.rolls = [roll for _, _, roll in blocks]
+        matcher.block_of = {roll: i for i, roll in enumerate(matcher.rolls)}
+        dead = np.ones(matcher.matrix.shape[0], dtype=bool)
+        for start, count, _ in blocks: dead[start:start + count] = False
+        matcher.dead = np.flatnonzero(dead) if dead.any() else None
+        return matcher
+
+    @property
+    def num_templates(self): return self.matrix.shape[0] - (0 if self.dead is None else len(self.dead))
+
+    def add(self, roll, templates): raise TypeError("store-backed gallery: write to the EmbeddingStore instead")
+
+    def remove(self, roll): raise TypeError("store-backed gallery: delete from the EmbeddingStore instead")
+
+    def identity_scores(self, embeddings):
+        queries = normalize_rows(embeddings)
+        if len(self.rolls) == 0:
+            return np.empty((queries.shape[0], 0), dtype=np.float32)
+        scores = queries @ self.matrix.T
+        if self.dead is not None: scores[:, self.dead] = -np.inf
+        return np.maximum.reduceat(scores, self.starts, axis=1)
+
+
+class SharedGallery:
+    """Drop-in for the old face_gallery global: identify() / search() always see the current store."""
+
+    def __init__(self, root=STORE_DIR, name=STORE_NAME, ann_min_identities=ANN_MIN_IDENTITIES, check_interval=1.0,
+                 **ann_kwargs):
+        # Own reader instance: refresh() is not thread-safe, and writers keep using theirs
+        self.store = EmbeddingStore(root, name)
+        self.ann_min_identities = ann_min_identities
+        self.check_interval = check_interval
+        self.ann_kwargs = ann_kwargs
+        self.lock = threading.Lock()
+        self.matcher = None
+        self.blocks = {}           # roll -> (start, count) the matcher was built from
+        self.generation = None
+        self.signature = None      # (inode, size, mtime) of the index when last synced
+        self.last_check = 0.0
+        self.changes = 0           # local version: +1 per change picked up
+        self.counts = {'checks': 0, 'syncs': 0, 'rebuilds': 0, 'added': 0, 'removed': 0}
+        self.sync(force=True)
+
+    # --- VERSION ---
+    @property
+    def version(self):
+        """(generation, index bytes applied): grows with every store write, same value in every process."""
+        return (self.store.generation, self.store._index_offset)
+
+    def _signature(self):
+        st = os.stat(self.store.index_path)
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    # --- SYNC ---
+    def current(self):
+        """Matcher for the latest store state; costs one stat() per check_interval."""
+        if time.monotonic() - self.last_check >= self.check_interval: self.sync()
+        return self.matcher
+
+    def sync(self, force=False):
+        """Pick up store writes from any process. Returns True if the gallery changed."""
+        with self.lock:
+            self.last_check = time.monotonic()
+            self.counts['checks'] += 1
+            signature = self._signature()
+            if not force and signature == self.signature: return False
+            self.signature = signature
+            self.store.refresh()
+            blocks = dict(self.store.blocks)
+            if not force and blocks == self.blocks and self.store.generation == self.generation: return False
+            use_ann = bool(self.ann_min_identities) and len(blocks) >= self.ann_min_identities
+            if use_ann and isinstance(self.matcher, IVFFlatIndex) and self.store.generation == self.generation:
+                self._patch(blocks)
+            else:
+                self._rebuild(use_ann)
+            self.blocks, self.generation = blocks, self.store.generation
+            self.changes += 1
+            self.counts['syncs'] += 1
+            return True
+
+    def _rebuild(self, use_ann):
+        # Mapped matcher: metadata only, the rows stay in the page cache
+        if use_ann: self.matcher = IVFFlatIndex.from_dict(self.store.as_dict(), self.store.dim, **self.ann_kwargs)
+        else: self.matcher = MappedGalleryMatcher.from_store(self.store)
+        self.counts['rebuilds'] += 1
+
+    def _patch(self, blocks):
+        # Camera threads may be searching self.matcher right now: patch a copy, then swap
+        matcher = self.matcher.copy()
+        removed = [roll for roll in self.blocks if roll not in blocks]
+        added = [roll for roll, block in blocks.items() if self.blocks.get(roll) != block]
+        for roll in removed: matcher.remove(roll)
+        for roll in added: matcher.add(roll, np.array(self.store.get(roll)))
+        self.matcher = matcher
+        self.counts['removed'] += len(removed)
+        self.counts['added'] += len(added)
+
+    # --- MATCHER API (GalleryMatcher / IVFFlatIndex compatible) ---
+    def __len__(self): return len(self.current())
+
+    def __contains__(self, roll): return roll in self.current()
+
+    @property
+    def num_templates(self): return self.current().num_templates
+
+    def identify(self, embeddings): return self.current().identify(embeddings)
+
+    def search(self, embeddings, top_k=1): return self.current().search(embeddings, top_k=top_k)
+
+    def add(self, roll, templates=None):
+        """The store is the source of truth: callers write there first, this just syncs now."""
+        self.sync()
+
+    def remove(self, roll): self.sync()
+
+    def stats(self):
+        matcher = self.current()
+        return {**self.counts, 'version': list(self.version), 'changes': self.changes, 'identities': len(matcher),
+                'templates': matcher.num_templates, 'kind': type(matcher).__name__}
@@ -0,0 +1,170 @@
+import os
+import json
+import time
+import socket
+import uuid
+import queue
+import threading
+import traceback
+from datetime import datetime
+from sqlalchemy import select, update
+from models import db, Job
+
+# ==========================================
+# BACKGROUND JOB QUEUE (SQLITE-BACKED)
+# ==========================================
+# submit() stores a Job row and returns its id at once; worker threads run the
+# registered handler and record progress / result / error on the row, so any
+# request (or a later process) can poll it. Every kind has its own queue and
+# its own number of worker threads: 'capture' = 1 means two registrations never
+# fight over the camera, while other kinds run side by side.
+#
+# Handlers are fn(ctx, **params) -> JSON-able result; raise to fail the job.
+# ctx.progress(fraction, message) may be called as often as convenient: updates
+# are written at most every progress_interval seconds.
+#
+# Jobs live in the memory of the process that accepted them. Each row is
+# stamped with that process ('host:pid'), and recover() only fails jobs whose
+# process is gone, so a worker starting next to live ones (multi-process WSGI
+# server, recycled worker) leaves their jobs alone.
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+def process_alive(pid):
+    if os.name == 'nt':
+        # os.kill(pid, 0) would terminate the process on Windows
+        import ctypes
+        kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+        handle = kernel32.OpenProcess(0x1000, False, pid) # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle: return ctypes.get_last_error() == 5 # access denied: exists
+        code = ctypes.c_ulong()
+        kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+        kernel32.CloseHandle(handle)
+        return code.value == 259 # STILL_ACTIVE
+    try: os.kill(pid, 0)
+    except ProcessLookupError: return False
+    except PermissionError: return True
+    return True
+
+class JobContext:
+    def __init__(self, jobs, job_id, params):
+        self.jobs, self.id, self.params = jobs, job_id, params
+        self.last_write = 0.0
+
+    def progress(self, fraction, message=None, force=False):
+        now = time.monotonic()
+        if not force and now - self.last_write < self.jobs.progress_interval: return
+        self.last_write = now
+        fields = {'progress': max(0.0, min(1.0, float(fraction)))}
+        if message is not None: fields['message'] = str(message)[:200]
+        self.jobs.write(self.id, wait=False, **fields)
+
+class JobQueue:
+    def __init__(self, app, writer=None, progress_interval=0.5):
+        self.app = app
+        self.writer = writer  # db_config.WriteQueue; None = commit on the job thread
+        self.progress_interval = progress_interval
+        self.handlers = {}    # kind -> (fn, concurrency)
+        self.queues = {}
+        self.threads = {}
+        self.lock = threading.Lock()
+
+    def register(self, kind, fn, concurrency=1):
+        self.handlers[kind] = (fn, concurrency)
+        self.queues.setdefault(kind, queue.Queue())
+
+    def handler(self, kind, concurrency=1):
+        def wrap(fn):
+            self.register(kind, fn, concurrency)
+            return fn
+        return wrap
+
+    # --- SUBMIT / READ ---
+    def submit(self, kind, params=None, owner=None):
+        if kind not in self.handlers: raise ValueError(f"unknown job kind {kind!r}")
+        job = Job(id=uuid.uuid4().hex, kind=kind, owner=owner, worker=WORKER_ID, params=json.dumps(params or {}),
+                  status='queued', message='Queued', created_at=datetime.now())
+        db.session.add(job)
+        db.session.commit()
+        self.start(kind)
+        self.queues[kind].put(job.id)
+        return job.id
+
+    def get(self, job_id):
+        job = db.session.get(Job, job_id)
+        return job_dict(job) if job else None
+
+    def recent(self, owner, limit=20):
+        jobs = Job.query.filter_by(owner=owner).order_by(Job.created_at.desc()).limit(limit).all()
+        return [job_dict(j) for j in jobs]
+
+    def stats(self):
+        return {kind: {'queued': self.queues[kind].qsize(), 'workers': concurrency}
+                for kind, (_, concurrency) in self.handlers.items()}
+
+    def recover(self):
+        """Fail queued / running jobs whose process is gone (their threads can't resume).
+
+        Jobs of live processes on this host are left alone, and so are jobs of
+        other hosts (their processes can't be checked from here). Rows from
+        before jobs were stamped have no worker and are failed.
+        """
+        host = socket.gethostname()
+        orphans = []
+        for job_id, worker in db.session.execute(select(Job.id, Job.worker).where(Job.status.in_(['queued', 'running']))):
+            worker_host, _, pid = (worker or '').rpartition(':')
+            if not worker or (worker_host == host and not process_alive(int(pid))): orphans.append(job_id)
+        if orphans:
+            db.session.execute(update(Job).where(Job.id.in_(orphans)).values(
+                status='failed', error='Interrupted by a server restart', finished_at=datetime.now()))
+        db.session.commit()
+        if orphans: print(f"[WARN] {len(orphans)} unfinished jobs marked failed after restart.")
+
+    # --- WORKERS ---
+    def start(self, kind):
+        with self.lock:
+            threads = [t for t in self.threads.get(kind, []) if t.is_alive()]
+            for n in range(len(threads), self.handlers[kind][1]):
+                t = threading.Thread(target=self.run, args=(kind,), name=f"job-{kind}-{n}", daemon=True)
+                t.start()
+                threads.append(t)
+            self.threads[kind] = threads
+
+    def run(self, kind):
+        fn = self.handlers[kind][0]
+        with self.app.app_context():
+            while True:
+                job_id = self.queues[kind].get()
+                job = db.session.get(Job, job_id)
+                params = json.loads(job.params or '{}') if job else {}
+                db.session.remove()
+                if job is None: continue
+                self.write(job_id, status='running', started_at=datetime.now(), message='Running')
+                ctx = JobContext(self, job_id, params)
+                try:
+                    result = fn(ctx, **params)
+                    self.write(job_id, status='done', progress=1.0, result=json.dumps(result),
+                               message='Done', finished_at=datetime.now())
+                except Exception as e:
+                    print(f"[ERROR] Job {kind} {job_id}: {e}")
+                    traceback.print_exc()
+                    self.write(job_id, status='failed', error=str(e), message='Failed', finished_at=datetime.now())
+                finally:
+                    db.session.remove()
+
+    def write(self, job_id, wait=True, **fields):
+        stmt = update(Job).where(Job.id == job_id).values(**fields)
+        if self.writer is not None:
+            future = self.writer.submit(db.session.execute, stmt)
+            if wait: future.result()
+            return
+        db.session.execute(stmt)
+        db.session.commit()
+
+def job_dict(job):
+    return {'id': job.id, 'kind': job.kind, 'owner': job.owner, 'status': job.status, 'progress': round(job.progress, 3),
+            'message': job.message, 'error': job.error,
+            'result': json.loads(job.result) if job.result else None,
+            'created_at': job.created_at.isoformat(timespec='seconds'),
+            'started_at': job.started_at.isoformat(timespec='seconds') if job.started_at else None,
+            'finished_at': job.finished_at.isoformat(timespec='seconds') if job.finished_at else None}
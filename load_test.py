@@ -0,0 +1,234 @@
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import tempfile
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from http.cookiejar import CookieJar
+from datetime import date, time as dtime, timedelta
+import numpy as np
+
+# ==========================================
+# WEB-TIER LOAD TEST (LATENCY / THROUGHPUT)
+# ==========================================
+# Seeds a throwaway SQLite database (setup_full.py's accounts + N synthetic
+# students, teachers and lectures with attendance history), serves app.py
+# from a threaded werkzeug server on localhost and drives it with concurrent
+# HTTP clients. Face models are stubbed, so nothing here needs InsightFace
+# or a camera. Per-route p50/p95/p99 latency and requests/second are printed.
+#
+#   python load_test.py --students 2000 --clients 32 --requests 300
+
+COURSES = ['MCA', 'BCA', 'MBA', 'BSC']
+SUBJECTS = ['Data Structures', 'Networks', 'DBMS', 'Operating Systems']
+SLOTS_PER_DAY = 10  # 1-hour lectures from 08:00, one per course in parallel
+
+# Share of requests per route (the teacher routes run on the teacher session)
+MIX = {'login': 5, 'student_dashboard': 30, 'take_attendance': 20, 'save_attendance_data': 10,
+       'save_schedule': 10, 'get_alerts': 25}
+
+# --- ISOLATED APP (temp DB, temp working dir, stubbed face model) ---
+class StubFaceModel:
+    def get(self, img): return []
+
+def load_app(workdir):
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'load_test.db')}"
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    os.chdir(workdir)  # embeddings/ and static/bunk_proofs/ are created here, not in the repo
+    import app as web
+    web.get_face_model = lambda role='surveillance': StubFaceModel()
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    return web
+
+# --- SYNTHETIC DATA ---
+def seed(web, students, teachers, lectures, rng):
+    from sqlalchemy import insert
+    from setup_full import setup_system
+    from models import db, User, Student, Teacher, Schedule, Attendance, Bunking
+    from attendance_stats import rebuild
+
+    setup_system()  # base accounts: teacher@college.edu / admin, sahilgaikawad03@gmail.com / 123
+    with web.app.app_context():
+        roster = [{'name': f"Student {i}", 'roll_no': f"LT-{i:05d}", 'email': f"student{i}@load.test",
+                   'course': COURSES[i % len(COURSES)]} for i in range(students)]
+        staff = [{'name': f"Teacher {j}", 'email': f"teacher{j}@load.test"} for j in range(teachers)]
+        db.session.execute(insert(Student), roster)
+        db.session.execute(insert(Teacher), staff)
+        db.session.execute(insert(User), [{'name': s['name'], 'email': s['email'], 'password': '123', 'role': 'student'} for s in roster] +
+                                         [{'name': t['name'], 'email': t['email'], 'password': 'admin', 'role': 'teacher'} for t in staff])
+
+        # Half the lectures in the past (with attendance), half upcoming; never clashing
+        today, per_day = date.today(), SLOTS_PER_DAY * len(COURSES)
+        first_day = today - timedelta(days=lectures // 2 // per_day + 1)
+        schedule, marks, bunks, marked = [], [], [], set()
+        by_course = {c: [s for s in roster if s['course'] == c] for c in COURSES}
+        for k in range(lectures):
+            day = first_day + timedelta(days=k // per_day)
+            slot, p = divmod(k % per_day, len(COURSES))
+            teacher = staff[(slot * len(COURSES) + p) % teachers]
+            lecture = {'teacher_email': teacher['email'], 'teacher_name': teacher['name'], 'course': COURSES[p],
+                       'subject': SUBJECTS[k % len(SUBJECTS)], 'classroom': f"Room-{p + 1}", 'date': day,
+                       'start_time': dtime(8 + slot), 'end_time': dtime(9 + slot)}
+            schedule.append(lecture)
+            # One attendance sheet per (course, subject, day), as save_attendance enforces
+            if day >= today or (COURSES[p], lecture['subject'], day) in marked: continue
+            marked.add((COURSES[p], lecture['subject'], day))
+            for s in by_course[lecture['course']]:
+                status = 'Present' if rng.random() < 0.8 else 'Absent'
+                marks.append({'roll_no': s['roll_no'], 'name': s['name'], 'course': lecture['course'],
+                              'subject': lecture['subject'], 'date': day, 'time': lecture['start_time'], 'status': status})
+                if rng.random() < 0.02:
+                    bunks.append({'roll_no': s['roll_no'], 'name': s['name'], 'date': day,
+                                  'time': dtime(8 + slot, 30), 'location': 'Canteen', 'proof_image': '-'})
+        db.session.execute(insert(Schedule), schedule)
+        if marks: db.session.execute(insert(Attendance), marks)
+        if bunks: db.session.execute(insert(Bunking), bunks)
+        db.session.commit()
+        rebuild()
+    print(f"[INFO] Seeded {students} students, {teachers} teachers, {lectures} lectures, "
+          f"{len(marks)} attendance rows, {len(bunks)} bunks.")
+    return roster, staff
+
+# --- HTTP CLIENT (one cookie jar per logged-in user, redirects not followed) ---
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs): return None
+
+class Client:
+    def __init__(self, base):
+        self.base = base
+        self.opener = self.new_opener()
+
+    def new_opener(self):
+        return urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()), NoRedirect())
+
+    def request(self, path, form=None, body=None, opener=None):
+        data, headers = None, {}
+        if form is not None: data = urllib.parse.urlencode(form).encode()
+        if body is not None: data, headers = json.dumps(body).encode(), {'Content-Type': 'application/json'}
+        req = urllib.request.Request(self.base + path, data=data, headers=headers)
+        try:
+            with (opener or self.opener).open(req, timeout=30) as resp: return resp.status, resp.read()
+        except urllib.error.HTTPError as e: return e.code, e.read()
+
+    def login(self, email, password, role):
+        # Fresh cookie jar: /login short-circuits for a session that is already logged in
+        opener = self.new_opener()
+        status, _ = self.request('/login', form={'email': email, 'password': password, 'role': role}, opener=opener)
+        self.opener = opener
+        return status
+
+def app_error(status, body):
+    # HTTP >= 400, or a JSON {'status': 'error'} reply (save_schedule clashes land here by design)
+    if status >= 400: return True
+    if status == 302 or not body.startswith(b'{'): return False
+    try: return json.loads(body).get('status') == 'error'
+    except (ValueError, AttributeError): return False
+
+# --- WORKLOAD ---
+class VirtualUser:
+    """One student session + one teacher session, picking routes from MIX."""
+    def __init__(self, base, student, teacher, roster_by_course, rng):
+        self.student, self.teacher = student, teacher
+        self.as_student, self.as_teacher = Client(base), Client(base)
+        self.roster_by_course, self.rng = roster_by_course, rng
+        self.as_student.login(student['email'], '123', 'student')
+        self.as_teacher.login(teacher['email'], 'admin', 'teacher')
+
+    def call(self, route):
+        rng = self.rng
+        if route == 'login':
+            if rng.random() < 0.5: status = self.as_student.login(self.student['email'], '123', 'student')
+            else: status = self.as_teacher.login(self.teacher['email'], 'admin', 'teacher')
+            return status, b''
+        if route == 'student_dashboard': return self.as_student.request('/student_dashboard')
+        course, subject = rng.choice(COURSES), rng.choice(SUBJECTS)
+        if route == 'take_attendance':
+            return self.as_teacher.request('/take_attendance?' + urllib.parse.urlencode({'course': course, 'subject': subject}))
+        if route == 'save_attendance_data':
+            sheet = [{'roll_no': s['roll_no'], 'name': s['name'], 'status': 'Present' if rng.random() < 0.85 else 'Absent'}
+                     for s in self.roster_by_course[course]]
+            return self.as_teacher.request('/save_attendance_data', body={'course': course, 'subject': subject,
+                                           'date': date.today().isoformat(), 'attendance_data': sheet})
+        if route == 'save_schedule':
+            day, hour = date.today() + timedelta(days=rng.randint(1, 60)), rng.randint(8, 17)
+            return self.as_teacher.request('/save_schedule', body={'course': course, 'subject': subject,
+                                           'classroom': f"Room-{rng.randint(1, 20)}", 'date': day.isoformat(),
+                                           'start_time': f"{hour:02d}:00", 'end_time': f"{hour + 1:02d}:00"})
+        return self.as_teacher.request('/get_alerts?cursor=0')
+
+def run_client(user, routes, results, lock):
+    local = {route: ([], [0]) for route in MIX}
+    for route in routes:
+        start = time.perf_counter()
+        status, body = user.call(route)
+        local[route][0].append((time.perf_counter() - start) * 1000)
+        local[route][1][0] += app_error(status, body)
+    with lock:
+        for route, (samples, errors) in local.items():
+            results[route][0].extend(samples)
+            results[route][1] += errors[0]
+
+def report(results, wall):
+    print(f"\n{'Route':<22} {'Reqs':>6} {'Errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'req/s':>8}")
+    print("-" * 82)
+    total = 0
+    for route, (samples, errors) in results.items():
+        if not samples: continue
+        total += len(samples)
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+        print(f"{route:<22} {len(samples):>6} {errors:>7} {p50:>8.1f} {p95:>8.1f} {p99:>8.1f} {max(samples):>8.1f} {len(samples) / wall:>8.1f}")
+    every = [s for samples, _ in results.values() for s in samples]
+    p50, p95, p99 = np.percentile(every, [50, 95, 99])
+    print("-" * 82)
+    print(f"{'ALL':<22} {total:>6} {sum(e for _, e in results.values()):>7} {p50:>8.1f} {p95:>8.1f} {p99:>8.1f} "
+          f"{max(every):>8.1f} {total / wall:>8.1f}")
+
+def run(args):
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp(prefix='load_test_')
+    web = load_app(workdir)
+    roster, staff = seed(web, args.students, args.teachers, args.lectures, rng)
+    roster_by_course = {c: [s for s in roster if s['course'] == c] for c in COURSES}
+
+    from werkzeug.serving import make_server
+    server = make_server('127.0.0.1', 0, web.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    print(f"[INFO] Serving {base} (db: {workdir}); {args.clients} clients x {args.requests} requests")
+
+    users = [VirtualUser(base, roster[i % len(roster)], staff[i % len(staff)], roster_by_course, random.Random(args.seed + i))
+             for i in range(args.clients)]
+    names, weights = list(MIX), list(MIX.values())
+    for user in users:  # warm-up: templates compiled, caches and connection pool filled
+        for route in names: user.call(route)
+    plans = [random.Random(args.seed * 1000 + i).choices(names, weights, k=args.requests) for i in range(args.clients)]
+
+    results, lock = {route: [[], 0] for route in MIX}, threading.Lock()
+    threads = [threading.Thread(target=run_client, args=(user, plan, results, lock)) for user, plan in zip(users, plans)]
+    start = time.perf_counter()
+    for t in threads: t.start()
+    for t in threads: t.join()
+    wall = time.perf_counter() - start
+    server.shutdown()
+    web.write_queue.shutdown()
+
+    report(results, wall)
+    print(f"\n[INFO] {sum(len(s) for s, _ in results.values())} requests in {wall:.2f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent load test of the Flask routes (SQLite, stubbed face model)")
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--teachers", type=int, default=10)
+    parser.add_argument("--lectures", type=int, default=400)
+    parser.add_argument("--clients", type=int, default=16, help="concurrent virtual users")
+    parser.add_argument("--requests", type=int, default=200, help="requests per client")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    if args.teachers < len(COURSES): parser.error(f"--teachers must be at least {len(COURSES)} (one per parallel lecture)")
+    run(args)
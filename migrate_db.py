@@ -0,0 +1,124 @@
+import os
+import shutil
+import sqlite3
+import argparse
+from datetime import datetime
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.schema import CreateTable, CreateIndex
+from models import db, Attendance, Schedule, Bunking
+
+# ==========================================
+# SQLITE MIGRATION: TYPED DATE/TIME + INDEXES
+# ==========================================
+# Old databases store dates/times as free-form VARCHAR(20) and have no
+# indexes. SQLite cannot ALTER a column type, so each table is rebuilt:
+#   rename -> create from models.py (with indexes) -> copy converted rows -> drop old
+# all in one transaction, after a backup copy of the file. Re-running is safe:
+# already-typed tables are skipped and missing indexes are created.
+
+DB_PATH = os.path.join('instance', 'attendance.db')
+TYPED_COLUMNS = {
+    Attendance: {'date': 'date', 'time': 'time'},
+    Schedule: {'date': 'date', 'start_time': 'time', 'end_time': 'time'},
+    Bunking: {'date': 'date', 'time': 'time'},
+}
+DATE_FORMATS = ('%Y-%m-%d', '%d-%m-%Y', '%d/%m/%Y', '%Y/%m/%d')
+TIME_FORMATS = ('%H:%M', '%H:%M:%S', '%H:%M:%S.%f', '%I:%M %p')
+DIALECT = sqlite.dialect()
+
+def parse(value, kind):
+    value = str(value).strip()
+    for fmt in DATE_FORMATS if kind == 'date' else TIME_FORMATS:
+        try:
+            parsed = datetime.strptime(value, fmt)
+            return parsed.date() if kind == 'date' else parsed.time()
+        except ValueError: continue
+    raise ValueError(f"unparseable {kind} {value!r}")
+
+def column_types(conn, table):
+    return {row[1]: row[2].upper() for row in conn.execute(f"PRAGMA table_info({table})")}
+
+def convert_rows(conn, model, skip_invalid):
+    table = model.__table__
+    typed = TYPED_COLUMNS[model]
+    # Same on-disk format SQLAlchemy writes for Date / Time columns
+    processors = {col: table.c[col].type.dialect_impl(DIALECT).bind_processor(DIALECT) for col in typed}
+    cursor = conn.execute(f"SELECT * FROM {table.name}")
+    names = [d[0] for d in cursor.description]
+    rows, bad = [], []
+    for values in cursor:
+        row = dict(zip(names, values))
+        try:
+            for col, kind in typed.items(): row[col] = processors[col](parse(row[col], kind))
+            rows.append(row)
+        except ValueError as e: bad.append((row.get('id'), str(e)))
+    if bad:
+        for row_id, err in bad: print(f"[WARN] {table.name} id={row_id}: {err}")
+        if not skip_invalid: raise RuntimeError(f"{len(bad)} bad rows in {table.name} (use --skip-invalid to drop them)")
+    return rows
+
+def dedupe_attendance(rows):
+    # One mark per (subject, date, roll_no); the latest row wins, like the old filter_by().first() + update
+    latest = {}
+    for row in sorted(rows, key=lambda r: r['id']): latest[(row['subject'], row['date'], row['roll_no'])] = row
+    if len(latest) < len(rows): print(f"[INFO] attendance: dropped {len(rows) - len(latest)} duplicate marks")
+    return sorted(latest.values(), key=lambda r: r['id'])
+
+def rebuild(conn, model, skip_invalid):
+    table = model.__table__
+    rows = convert_rows(conn, model, skip_invalid)
+    if model is Attendance: rows = dedupe_attendance(rows)
+    columns = [c.name for c in table.columns]
+    conn.execute(f"ALTER TABLE {table.name} RENAME TO {table.name}_old")
+    conn.execute(str(CreateTable(table).compile(dialect=DIALECT)))
+    for index in table.indexes: conn.execute(str(CreateIndex(index).compile(dialect=DIALECT)))
+    conn.executemany(f"INSERT INTO {table.name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                     [tuple(row.get(c) for c in columns) for row in rows])
+    conn.execute(f"DROP TABLE {table.name}_old")
+    print(f"[INFO] {table.name}: {len(rows)} rows migrated to typed columns")
+
+def migrate(path, skip_invalid=False, backup=True):
+    if not os.path.exists(path): raise FileNotFoundError(path)
+    if backup:
+        backup_path = f"{path}.bak-{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        shutil.copy2(path, backup_path)
+        print(f"[INFO] Backup: {backup_path}")
+
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        conn.execute("BEGIN")
+        for model in TYPED_COLUMNS:
+            types = column_types(conn, model.__tablename__)
+            if not types: continue # table never created, create_all() will make it
+            if types.get('date') == 'DATE': print(f"[INFO] {model.__tablename__}: already typed")
+            else: rebuild(conn, model, skip_invalid)
+        # Tables added since (e.g. attendance counters; app start backfills them),
+        # then indexes for every table (incl. ones not rebuilt, e.g. student.course)
+        existing_tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                conn.execute(str(CreateTable(table).compile(dialect=DIALECT)))
+                print(f"[INFO] {table.name}: created")
+            else:
+                # Nullable columns added since (e.g. job.worker)
+                present = column_types(conn, table.name)
+                for column in table.columns:
+                    if column.name in present or not column.nullable: continue
+                    conn.execute(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=DIALECT)}")
+                    print(f"[INFO] {table.name}.{column.name}: added")
+            for index in table.indexes:
+                conn.execute(str(CreateIndex(index, if_not_exists=True).compile(dialect=DIALECT)))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    conn.close()
+    print("[INFO] Migration complete.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate attendance.db to typed Date/Time columns and add indexes")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--skip-invalid", action="store_true", help="drop rows whose date/time cannot be parsed")
+    parser.add_argument("--no-backup", action="store_true")
+    args = parser.parse_args()
+    migrate(args.db, args.skip_invalid, backup=not args.no_backup)
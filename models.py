@@ -1,9 +1,18 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
-from datetime import datetime
+from datetime import datetime, date, time
 
 db = SQLAlchemy()
 
+# Request/JSON values arrive as 'YYYY-MM-DD' / 'HH:MM' strings; columns are native Date/Time
+def as_date(value):
+    if value is None or isinstance(value, date): return value
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+def as_time(value):
+    if value is None or isinstance(value, time): return value
+    return datetime.strptime(value, '%H:%M:%S' if value.count(':') == 2 else '%H:%M').time()
+
 # 1. USER TABLE
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -18,7 +27,7 @@ class Student(db.Model):
     name = db.Column(db.String(100), nullable=False)
     roll_no = db.Column(db.String(50), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
-    course = db.Column(db.String(50), nullable=False)
+    course = db.Column(db.String(50), nullable=False, index=True)
     phone = db.Column(db.String(20), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -37,10 +46,16 @@ class Attendance(db.Model):
     name = db.Column(db.String(100), nullable=False)
     course = db.Column(db.String(50), nullable=False)
     subject = db.Column(db.String(100), nullable=False)
-    date = db.Column(db.String(20), nullable=False)
-    time = db.Column(db.String(20), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    time = db.Column(db.Time, nullable=False)
     status = db.Column(db.String(20), default='Present')
 
+    __table_args__ = (
+        db.UniqueConstraint('subject', 'date', 'roll_no', name='uq_attendance_subject_date_roll'), # one mark per lecture
+        db.Index('ix_attendance_roll_date_time', 'roll_no', 'date', 'time'),  # student history, newest first
+        db.Index('ix_attendance_course_subject_date', 'course', 'subject', 'date'), # take / reset attendance
+    )
+
 # 5. SCHEDULE TABLE
 class Schedule(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -49,16 +64,68 @@ class Schedule(db.Model):
     subject = db.Column(db.String(100), nullable=False)
     course = db.Column(db.String(50), nullable=False)
     classroom = db.Column(db.String(50), nullable=False)
-    date = db.Column(db.String(20), nullable=False)
-    start_time = db.Column(db.String(20), nullable=False)
-    end_time = db.Column(db.String(20), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    start_time = db.Column(db.Time, nullable=False)
+    end_time = db.Column(db.Time, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_schedule_date', 'date'),                                 # clash checks
+        db.Index('ix_schedule_teacher_date', 'teacher_email', 'date'),        # teacher dashboard
+    )
 
 # 6. BUNKING RECORD TABLE (New)
 class Bunking(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     roll_no = db.Column(db.String(50), nullable=False)
     name = db.Column(db.String(100), nullable=False)
-    date = db.Column(db.String(20), nullable=False)
-    time = db.Column(db.String(20), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    time = db.Column(db.Time, nullable=False)
     location = db.Column(db.String(50), default="Canteen")
-    proof_image = db.Column(db.String(200), nullable=False) # Path to image
\ No newline at end of file
+    proof_image = db.Column(db.String(200), nullable=False) # Path to image
+
+    __table_args__ = (
+        db.Index('ix_bunking_roll_date_time', 'roll_no', 'date', 'time'),    # student bunk history, newest first
+        db.Index('ix_bunking_date_roll', 'date', 'roll_no'),                  # bunkers of the day (covering)
+    )
+# 7. ATTENDANCE AGGREGATES (maintained incrementally by attendance_stats.py)
+class StudentStats(db.Model):
+    roll_no = db.Column(db.String(50), primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    present = db.Column(db.Integer, nullable=False, default=0)
+    absent = db.Column(db.Integer, nullable=False, default=0)
+    late = db.Column(db.Integer, nullable=False, default=0)
+    bunks = db.Column(db.Integer, nullable=False, default=0)
+
+class SubjectStats(db.Model):
+    roll_no = db.Column(db.String(50), primary_key=True)
+    subject = db.Column(db.String(100), primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    present = db.Column(db.Integer, nullable=False, default=0)
+    absent = db.Column(db.Integer, nullable=False, default=0)
+    late = db.Column(db.Integer, nullable=False, default=0)
+
+# 8. DATA VERSION (bumped in the same transaction as attendance / bunk writes; keys report caches)
+class DataVersion(db.Model):
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+# 9. BACKGROUND JOBS (enrollment and other long tasks, run by jobs.JobQueue)
+class Job(db.Model):
+    id = db.Column(db.String(32), primary_key=True) # uuid4 hex
+    kind = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued') # queued / running / done / failed
+    owner = db.Column(db.String(150))
+    worker = db.Column(db.String(150)) # 'host:pid' of the process whose threads run it
+    params = db.Column(db.Text) # JSON
+    progress = db.Column(db.Float, nullable=False, default=0.0) # 0..1
+    message = db.Column(db.String(200))
+    result = db.Column(db.Text) # JSON
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_job_owner_created', 'owner', 'created_at'),  # "my recent jobs"
+        db.Index('ix_job_status', 'status'),                      # restart recovery
+    )
@@ -0,0 +1,102 @@
+import time
+import threading
+import cv2
+import numpy as np
+
+# ==========================================
+# MOTION / SCENE-CHANGE GATE
+# ==========================================
+class MotionGate:
+    """Skips full detection when the scene has not changed.
+
+    The frame is shrunk to `width` px grayscale and compared with the last
+    frame that was actually sent to detection, so slow movement still adds
+    up. A detection is forced every `max_idle_s` so people standing still
+    keep being re-checked.
+    """
+
+    def __init__(self, width=160, pixel_threshold=25, min_changed_ratio=0.004, max_idle_s=2.0):
+        self.width = width
+        self.pixel_threshold = pixel_threshold      # per-pixel gray difference that counts as change
+        self.min_changed_ratio = min_changed_ratio  # fraction of changed pixels to trigger detection
+        self.max_idle_s = max_idle_s
+        self.reference = None
+        self.last_pass = 0.0
+        self.last_ratio = 0.0
+
+    def small_gray(self, frame):
+        h, w = frame.shape[:2]
+        small = cv2.resize(frame, (self.width, max(1, int(h * self.width / w))), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def check(self, frame, now=None):
+        now = time.monotonic() if now is None else now
+        gray = self.small_gray(frame)
+        if self.reference is None or self.reference.shape != gray.shape or now - self.last_pass >= self.max_idle_s:
+            changed = True
+        else:
+            diff = cv2.absdiff(gray, self.reference)
+            self.last_ratio = float(np.count_nonzero(diff > self.pixel_threshold)) / diff.size
+            changed = self.last_ratio >= self.min_changed_ratio
+        if changed:
+            self.reference = gray
+            self.last_pass = now
+        return changed
+
+
+# ==========================================
+# ADAPTIVE DETECTION SCHEDULER
+# ==========================================
+class AdaptiveScheduler:
+    """Process every `interval`-th new frame; the interval adapts to load.
+
+    Additive increase when the detector falls behind (its latency is over the
+    frame budget or its queue is dropping frames), step back down when there
+    is headroom.
+    """
+
+    def __init__(self, target_fps=10.0, max_interval=10, headroom=0.6):
+        self.budget_ms = 1000.0 / target_fps
+        self.max_interval = max_interval
+        self.headroom = headroom
+        self.interval = 1
+        self.counter = 0
+        self.last_drops = 0
+        self.lock = threading.Lock()
+        # Counters for processed-FPS / skip ratio
+        self.seen = 0
+        self.processed = 0
+        self.skipped_schedule = 0
+        self.skipped_motion = 0
+        self.started = time.monotonic()
+
+    def due(self):
+        with self.lock:
+            self.seen += 1
+            self.counter += 1
+            if self.counter < self.interval:
+                self.skipped_schedule += 1
+                return False
+            self.counter = 0
+            return True
+
+    def mark(self, processed):
+        with self.lock:
+            if processed: self.processed += 1
+            else: self.skipped_motion += 1
+
+    def update(self, detect_ms, dropped):
+        with self.lock:
+            falling_behind = detect_ms > self.budget_ms or dropped > self.last_drops
+            self.last_drops = dropped
+            if falling_behind: self.interval = min(self.max_interval, self.interval + 1)
+            elif detect_ms < self.headroom * self.budget_ms and self.interval > 1: self.interval -= 1
+
+    def stats(self):
+        with self.lock:
+            elapsed = max(time.monotonic() - self.started, 1e-6)
+            return {"interval": self.interval, "seen": self.seen, "processed": self.processed,
+                    "processed_fps": round(self.processed / elapsed, 2),
+                    "skip_ratio": round(1 - self.processed / self.seen, 3) if self.seen else 0.0,
+                    "skipped_schedule": self.skipped_schedule, "skipped_motion": self.skipped_motion}
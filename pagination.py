@@ -0,0 +1,31 @@
+from datetime import date, time
+from sqlalchemy import tuple_
+
+# ==========================================
+# KEYSET (SEEK) PAGINATION
+# ==========================================
+# Newest-first pages over an index: "rows where (c1, c2, ...) < last row seen",
+# so page N costs the same as page 1 (no OFFSET scan). The cursor is the last
+# row's key values joined with '|', e.g. "2025-11-24|23:09:00|15".
+
+def encode_cursor(row, columns):
+    return '|'.join(str(getattr(row, c.key)) for c in columns)
+
+def decode_cursor(cursor, columns):
+    parts = cursor.split('|')
+    if len(parts) != len(columns): raise ValueError("bad cursor")
+    values = []
+    for part, column in zip(parts, columns):
+        kind = column.type.python_type
+        values.append(kind.fromisoformat(part) if kind in (date, time) else kind(part))
+    return values
+
+def keyset_page(query, columns, cursor=None, limit=50):
+    """(rows, next_cursor) for one page; next_cursor is None on the last page."""
+    if cursor:
+        try: query = query.filter(tuple_(*columns) < tuple_(*decode_cursor(cursor, columns)))
+        except ValueError: pass # stale / hand-edited cursor: start from the top
+    rows = query.order_by(*[c.desc() for c in columns]).limit(limit + 1).all()
+    if len(rows) <= limit: return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1], columns)
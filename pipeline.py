@@ -0,0 +1,158 @@
+import time
+import threading
+from collections import deque
+
+# ==========================================
+# BOUNDED QUEUE (DROP-OLDEST BACKPRESSURE)
+# ==========================================
+class DropOldestQueue:
+    """When full, put() throws away the oldest item instead of blocking.
+
+    A slow consumer therefore always works on the freshest frame and the
+    producer (camera / detector) never stalls behind it.
+    """
+
+    def __init__(self, maxsize=1):
+        self.maxsize = maxsize
+        self.items = deque()
+        self.cond = threading.Condition()
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, item):
+        with self.cond:
+            if len(self.items) >= self.maxsize:
+                self.items.popleft()
+                self.dropped += 1
+            self.items.append(item)
+            self.cond.notify()
+
+    def get(self, timeout=0.1):
+        with self.cond:
+            if not self.items and not self.closed: self.cond.wait(timeout)
+            if not self.items: return None
+            return self.items.popleft()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def __len__(self): return len(self.items)
+
+
+# ==========================================
+# STAGE STATS
+# ==========================================
+class StageStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.processed = 0
+        self.errors = 0
+        self.avg_ms = 0.0   # exponential moving average
+        self.last_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, ms, alpha=0.1):
+        with self.lock:
+            self.processed += 1
+            self.last_ms = ms
+            self.max_ms = max(self.max_ms, ms)
+            self.avg_ms = ms if self.processed == 1 else (1 - alpha) * self.avg_ms + alpha * ms
+
+
+# ==========================================
+# STAGE
+# ==========================================
+class Stage:
+    """`fn(item)` runs on `workers` threads; a non-None result goes to the next stage."""
+
+    def __init__(self, name, fn, workers=1, queue_size=1):
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.queue = DropOldestQueue(queue_size)
+        self.stats = StageStats()
+        self.next = None
+        self.threads = []
+
+    def run(self, pipeline):
+        while pipeline.running:
+            item = self.queue.get()
+            if item is None: continue
+            start = time.perf_counter()
+            try:
+                out = self.fn(item)
+            except Exception as e:
+                self.stats.errors += 1
+                print(f"[ERROR] Stage '{self.name}': {e}")
+                continue
+            self.stats.record((time.perf_counter() - start) * 1000)
+            if out is not None and self.next is not None: self.next.queue.put(out)
+
+    def snapshot(self):
+        return {
+            "workers": self.workers, "queue_depth": len(self.queue), "queue_size": self.queue.maxsize,
+            "dropped": self.queue.dropped, "processed": self.stats.processed, "errors": self.stats.errors,
+            "avg_ms": round(self.stats.avg_ms, 2), "last_ms": round(self.stats.last_ms, 2), "max_ms": round(self.stats.max_ms, 2),
+        }
+
+
+class SourceStage(Stage):
+    """Head of the pipeline: polls `read_fn()` (e.g. the camera) instead of a queue.
+
+    `read_fn` returns None when there is nothing new; the stage then idles briefly.
+    """
+
+    def __init__(self, name, read_fn, idle_sleep=0.005):
+        super().__init__(name, read_fn, workers=1, queue_size=1)
+        self.idle_sleep = idle_sleep
+
+    def run(self, pipeline):
+        while pipeline.running:
+            start = time.perf_counter()
+            try:
+                item = self.fn()
+            except Exception as e:
+                self.stats.errors += 1
+                print(f"[ERROR] Stage '{self.name}': {e}")
+                item = None
+            if item is None:
+                time.sleep(self.idle_sleep)
+                continue
+            self.stats.record((time.perf_counter() - start) * 1000)
+            if self.next is not None: self.next.queue.put(item)
+
+
+# ==========================================
+# PIPELINE
+# ==========================================
+class Pipeline:
+    """`chain` stages feed each other in order; `side` stages are fed with put()."""
+
+    def __init__(self, chain, side=()):
+        self.stages = {}
+        self.running = False
+        for prev, stage in zip(chain, chain[1:]): prev.next = stage
+        for stage in list(chain) + list(side): self.stages[stage.name] = stage
+
+    def put(self, stage_name, item): self.stages[stage_name].queue.put(item)
+
+    def start(self):
+        self.running = True
+        for stage in self.stages.values():
+            for i in range(stage.workers):
+                t = threading.Thread(target=stage.run, args=(self,), name=f"{stage.name}-{i}", daemon=True)
+                t.start()
+                stage.threads.append(t)
+        return self
+
+    def stop(self, timeout=2.0):
+        self.running = False
+        for stage in self.stages.values(): stage.queue.close()
+        for stage in self.stages.values():
+            for t in stage.threads:
+                if t is not threading.current_thread(): t.join(timeout)
+            stage.threads = []
+
+    def stats(self): return {name: stage.snapshot() for name, stage in self.stages.items()}
@@ -0,0 +1,60 @@
+import os
+import sqlite3
+import argparse
+from sqlalchemy import select, delete, tuple_
+from sqlalchemy.dialects import sqlite
+from models import Student, Attendance, Schedule, Bunking, StudentStats
+
+# ==========================================
+# QUERY-PLAN REPORT (HOT QUERIES IN app.py)
+# ==========================================
+# EXPLAIN QUERY PLAN for the statements the routes actually run. A line with
+# "SCAN <table>" (no index) or "USE TEMP B-TREE" (sort in memory) means the
+# query reads the whole table; after migrate_db.py every one should SEARCH an index.
+
+DB_PATH = os.path.join('instance', 'attendance.db')
+HOT_QUERIES = {
+    'student_dashboard: counters': select(StudentStats).where(StudentStats.roll_no == ''),
+    'student_dashboard: recent lectures': select(Attendance).where(Attendance.roll_no == '')
+        .order_by(Attendance.date.desc(), Attendance.time.desc()).limit(5),
+    'student_attendance_history: keyset page': select(Attendance)
+        .where(Attendance.roll_no == '', tuple_(Attendance.date, Attendance.time, Attendance.id) < tuple_('', '', 0))
+        .order_by(Attendance.date.desc(), Attendance.time.desc(), Attendance.id.desc()).limit(51),
+    'student_bunk_history: keyset page': select(Bunking)
+        .where(Bunking.roll_no == '', tuple_(Bunking.date, Bunking.time, Bunking.id) < tuple_('', '', 0))
+        .order_by(Bunking.date.desc(), Bunking.time.desc(), Bunking.id.desc()).limit(51),
+    'teacher_dashboard: upcoming lectures': select(Schedule).where(Schedule.teacher_email == '', Schedule.date >= ''),
+    'save_schedule: clash check': select(Schedule).where(Schedule.date == ''),
+    'take_attendance: course students': select(Student).where(Student.course == ''),
+    'take_attendance: existing marks': select(Attendance)
+        .where(Attendance.course == '', Attendance.subject == '', Attendance.date == ''),
+    'take_attendance / bulk save: bunkers of the day': select(Bunking.roll_no).where(Bunking.date == '').distinct(),
+    'bulk save: lecture rows': select(Attendance.id, Attendance.roll_no, Attendance.status)
+        .where(Attendance.subject == '', Attendance.date == ''),
+    'reset_attendance': delete(Attendance)
+        .where(Attendance.course == '', Attendance.subject == '', Attendance.date == ''),
+}
+
+def explain(conn, stmt):
+    sql = str(stmt.compile(dialect=sqlite.dialect()))
+    # Bound values don't change the plan; any placeholder will do
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, ('',) * sql.count('?'))]
+
+def report(path):
+    conn = sqlite3.connect(path)
+    full_scans = 0
+    for name, stmt in HOT_QUERIES.items():
+        plan = explain(conn, stmt)
+        scan = any(step.startswith('SCAN') or 'TEMP B-TREE' in step for step in plan)
+        full_scans += scan
+        print(f"{'[WARN]' if scan else '[ OK ]'} {name}")
+        for step in plan: print(f"         {step}")
+    conn.close()
+    print(f"\n{len(HOT_QUERIES) - full_scans}/{len(HOT_QUERIES)} hot queries use an index.")
+    return full_scans
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EXPLAIN QUERY PLAN report for the app's hot queries")
+    parser.add_argument("--db", default=DB_PATH)
+    args = parser.parse_args()
+    report(args.db)
@@ -0,0 +1,107 @@
+import cv2
+import numpy as np
+from batch_inference import detect_faces
+
+# ==========================================
+# ZONES OF INTEREST (PER CAMERA)
+# ==========================================
+class ZoneMask:
+    """Rectangles in normalized (x1, y1, x2, y2) frame coordinates.
+
+    Only the bounding box of the `include` zones is handed to the detector
+    (ceilings, walls etc. are never processed); faces centred inside an
+    `exclude` zone are dropped.
+    """
+
+    def __init__(self, include=None, exclude=None):
+        self.include = [tuple(z) for z in (include or [])]
+        self.exclude = [tuple(z) for z in (exclude or [])]
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config.get('include'), config.get('exclude')) if config else cls()
+
+    def crop_box(self, shape):
+        h, w = shape[:2]
+        if not self.include: return 0, 0, w, h
+        x1 = min(z[0] for z in self.include); y1 = min(z[1] for z in self.include)
+        x2 = max(z[2] for z in self.include); y2 = max(z[3] for z in self.include)
+        return int(x1 * w), int(y1 * h), int(np.ceil(x2 * w)), int(np.ceil(y2 * h))
+
+    def keep(self, face, shape):
+        h, w = shape[:2]
+        cx = (face.bbox[0] + face.bbox[2]) / 2 / w
+        cy = (face.bbox[1] + face.bbox[3]) / 2 / h
+        inside = lambda z: z[0] <= cx <= z[2] and z[1] <= cy <= z[3]
+        if self.include and not any(inside(z) for z in self.include): return False
+        return not any(inside(z) for z in self.exclude)
+
+
+def offset_face(face, dx, dy, scale=1.0):
+    face.bbox = face.bbox * scale + np.array([dx, dy, dx, dy], dtype=np.float32)
+    if face.kps is not None: face.kps = face.kps * scale + np.array([dx, dy], dtype=np.float32)
+    return face
+
+def detect_in_zones(detect_fn, frame, zones):
+    """Run `detect_fn` on the zone crop only and map faces back to frame coordinates."""
+    if zones is None: return detect_fn(frame)
+    x1, y1, x2, y2 = zones.crop_box(frame.shape)
+    faces = detect_fn(frame[y1:y2, x1:x2])
+    faces = [offset_face(f, x1, y1) for f in faces]
+    return [f for f in faces if zones.keep(f, frame.shape)]
+
+
+# ==========================================
+# TWO-PASS (LOW-RES + ROI REFINEMENT) DETECTOR
+# ==========================================
+class MultiResDetector:
+    """Cheap whole-frame pass at low resolution, then full-resolution refinement.
+
+    Pass 1 runs the detector on a `low_width` px copy at `low_size` input.
+    Pass 2 re-detects inside a full-resolution crop around each candidate
+    (expanded by `margin`) at `refine_size` input, which gives precise boxes
+    and landmarks for alignment. Embeddings are then taken from the original
+    frame, so small far-away faces keep their pixels.
+    """
+
+    def __init__(self, get_model, low_width=640, low_size=(320, 320), refine_size=(128, 128), margin=0.5, zones=None):
+        self.get_model = get_model
+        self.low_width = low_width
+        self.low_size = low_size
+        self.refine_size = refine_size
+        self.margin = margin
+        self.zones = zones
+
+    def detect(self, frame):
+        return detect_in_zones(self._detect, frame, self.zones)
+
+    def _detect(self, frame):
+        model = self.get_model()
+        h, w = frame.shape[:2]
+        scale = min(1.0, self.low_width / w)
+        small = cv2.resize(frame, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA) if scale < 1.0 else frame
+        candidates = [offset_face(f, 0, 0, 1.0 / scale) for f in self._run(model, small, self.low_size)]
+
+        faces = []
+        for cand in candidates:
+            x1, y1, x2, y2 = self._roi(cand.bbox, w, h)
+            refined = self._run(model, frame[y1:y2, x1:x2], self.refine_size)
+            if refined:
+                # Keep the refined face closest to the candidate centre
+                cx, cy = (cand.bbox[0] + cand.bbox[2]) / 2 - x1, (cand.bbox[1] + cand.bbox[3]) / 2 - y1
+                best = min(refined, key=lambda f: ((f.bbox[0] + f.bbox[2]) / 2 - cx) ** 2 + ((f.bbox[1] + f.bbox[3]) / 2 - cy) ** 2)
+                faces.append(offset_face(best, x1, y1))
+            else:
+                faces.append(cand) # Low-res landmarks, scaled up
+        return faces
+
+    def _roi(self, bbox, w, h):
+        bw, bh = bbox[2] - bbox[0], bbox[3] - bbox[1]
+        side = max(bw, bh) * (1 + 2 * self.margin)
+        cx, cy = (bbox[0] + bbox[2]) / 2, (bbox[1] + bbox[3]) / 2
+        x1, y1 = int(max(0, cx - side / 2)), int(max(0, cy - side / 2))
+        x2, y2 = int(min(w, cx + side / 2)), int(min(h, cy + side / 2))
+        return x1, y1, max(x2, x1 + 1), max(y2, y1 + 1)
+
+    @staticmethod
+    def _run(model, img, input_size): return detect_faces(model, img, input_size=input_size)
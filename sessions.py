@@ -0,0 +1,311 @@
+import cv2
+import time
+import uuid
+import threading
+from datetime import datetime
+from gallery import MATCH_THRESHOLD
+from pipeline import Pipeline, Stage, SourceStage
+from tracker import FaceTracker
+from motion_gate import MotionGate, AdaptiveScheduler
+from roi_detection import ZoneMask, MultiResDetector, detect_in_zones
+from evidence_writer import EvidenceWriter
+from batch_inference import detect_faces, embed_faces
+
+# Per-stage worker count and queue size (queues drop the oldest item when full)
+PIPELINE_CONFIG = {
+    'detect':   {'workers': 1, 'queue_size': 1},  # always the freshest frame
+    'match':    {'workers': 1, 'queue_size': 2},  # owns the tracker, keep at 1 worker
+    'render':   {'workers': 1, 'queue_size': 1},  # cv2 window, keep at 1 worker
+}
+
+# ==========================================
+# ONE CAMERA WORKER (LECTURE / LOCATION)
+# ==========================================
+class SurveillanceSession:
+    def __init__(self, manager, lecture_info, camera_url, location, show_window=True):
+        self.id = uuid.uuid4().hex[:8]
+        self.manager = manager
+        self.lecture_info = lecture_info
+        self.camera_url = camera_url
+        self.location = location
+        self.show_window = show_window
+        self.started_at = datetime.now()
+        self.alerts = []
+        self.proofs = {}          # roll -> latest saved proof {'image', 'context'} of this session
+        self.alert_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.stats = {}
+        self.tracker = FaceTracker(**manager.tracker_config)
+        self.gate = MotionGate(**manager.gate_config) if manager.gate_config is not None else None
+        self.scheduler = AdaptiveScheduler(**manager.scheduler_config)
+        zones = manager.camera_zones.get(location)
+        self.zones = ZoneMask.from_config(zones) if zones else None
+        self.detector = None
+        self.stream = None
+        if manager.detection_config.get('mode') == 'multires':
+            options = {k: v for k, v in manager.detection_config.items() if k != 'mode'}
+            self.detector = MultiResDetector(manager.get_model, zones=self.zones, **options)
+        self.thread = None
+
+    @property
+    def active(self): return self.thread is not None and self.thread.is_alive() and not self.stop_event.is_set()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name=f"surveillance-{self.id}", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        self.stop_event.set()
+        if self.thread is not None and self.thread is not threading.current_thread(): self.thread.join(timeout)
+
+    def run(self):
+        try: self.watch()
+        except Exception as e: print(f"[ERROR] Surveillance session {self.id} crashed: {e}")
+        finally: self.manager.ended(self) # 'q' pressed or crashed: don't keep blocking the lecture
+
+    def watch(self):
+        try:
+            stream = self.manager.stream_factory(self.camera_url).start()
+        except Exception:
+            stream = self.manager.stream_factory(0).start()
+        self.stream = stream
+
+        pipeline = self.build_pipeline(stream).start()
+        try:
+            while not self.stop_event.is_set():
+                self.stats = pipeline.stats()
+                self.scheduler.update(self.stats['detect']['avg_ms'], self.stats['detect']['dropped'])
+                time.sleep(0.5)
+        finally:
+            pipeline.stop()
+            self.stats = pipeline.stats()
+            stream.stop()
+            if self.show_window:
+                try: cv2.destroyWindow(self.window_name)
+                except cv2.error: pass
+
+    @property
+    def window_name(self): return f"Surveillance Monitor - {self.location} [{self.id}]"
+
+    # --- ALERTS (per session, deltas pushed to the teacher's bus topic) ---
+    def add_alert(self, alert):
+        with self.alert_lock:
+            if any(a['roll'] == alert['roll'] for a in self.alerts): return False
+            proof = self.proofs.get(alert['roll'])  # Saved already (fast writer) or earlier in this session
+            if proof and not alert.get('image'): alert.update(image=proof['image'], context=proof['context'], proof='saved')
+            self.alerts.append(alert)
+            self.publish('alert', alert)
+            return True
+
+    def pop_alert(self, roll):
+        with self.alert_lock:
+            alert = next((x for x in self.alerts if x['roll'] == roll), None)
+            self.alerts = [x for x in self.alerts if x['roll'] != roll]
+            if alert is not None: self.publish('clear', {'roll': roll, 'session': self.id})
+            return alert
+
+    def publish(self, kind, data):
+        if self.manager.bus is not None: self.manager.bus.publish(self.lecture_info.get('teacher_email'), kind, data)
+
+    def get_alerts(self):
+        with self.alert_lock: return list(self.alerts)
+
+    def info(self):
+        return {"id": self.id, "location": self.location, "camera": str(self.camera_url),
+                "active": self.active, "started_at": self.started_at.strftime("%H:%M:%S"), **self.lecture_info}
+
+    # --- FACE OPS (through the shared batching service when present) ---
+    def detect(self, frame):
+        if self.manager.inference is not None: return self.manager.inference.detect(frame)
+        return detect_faces(self.manager.get_model(), frame)
+
+    def embed(self, frame, faces):
+        if self.manager.inference is not None: return self.manager.inference.embed(frame, faces)
+        embed_faces(self.manager.get_model(), [(frame, face) for face in faces])
+        return faces
+
+    # --- PIPELINE ---
+    def build_pipeline(self, stream, config=PIPELINE_CONFIG):
+        manager = self.manager
+        tracker = self.tracker
+        last_frame_id = [-1]
+
+        # --- STAGE 1: CAPTURE (freshest frame, adaptive rate + motion gate) ---
+        def capture():
+            if stream.frame is None or stream.frame_id == last_frame_id[0]: return None
+            last_frame_id[0] = stream.frame_id
+            frame = stream.frame
+            if not self.scheduler.due(): return None
+            if self.gate is not None:
+                moved = self.gate.check(frame)
+                self.scheduler.mark(moved)
+                if not moved: return None
+            else: self.scheduler.mark(True)
+            # The ring slot is reused a few frames later; the pipeline owns its own copy from here on
+            return {'frame': frame.copy()}
+
+        # --- STAGE 2: DETECT (boxes only, zones of interest only) ---
+        def detect(item):
+            if self.detector is not None:
+                # Two-pass: low-res sweep + full-res ROI refinement, native coordinates
+                item['frame_large'] = item['frame']
+                item['faces'] = self.detector.detect(item['frame'])
+            else:
+                # 1024px for better detection
+                item['frame_large'] = cv2.resize(item['frame'], (1024, 768))
+                item['faces'] = detect_in_zones(self.detect, item['frame_large'], self.zones)
+            return item
+
+        # --- STAGE 3: TRACK + MATCH (recognize a track only when needed) ---
+        def match(item):
+            faces = item['faces']
+            tracks = tracker.update([face.bbox for face in faces])
+            todo = [(face, track) for face, track in zip(faces, tracks) if tracker.needs_recognition(track)]
+            if todo:
+                self.embed(item['frame_large'], [face for face, _ in todo])
+                todo = [(face, track) for face, track in todo if face.embedding is not None]
+                # One matmul for all faces that need it
+                results = manager.get_gallery().identify([face.embedding for face, _ in todo]) if todo else []
+                for (face, track), (identity, score) in zip(todo, results):
+                    tracker.record(track, identity, score)
+                    # Confident, confirmed matches may refresh the student's templates
+                    if manager.updater is not None and identity == track.identity and tracker.is_confirmed(track):
+                        manager.updater.observe(identity, face.embedding, score)
+
+            item['matches'] = [(track.identity, track.score) for track in tracks]
+            for face, track in zip(faces, tracks):
+                # Vote over the whole track, one alert per track
+                if tracker.is_confirmed(track) and not track.alerted:
+                    track.alerted = self.raise_alert(item, face.bbox, track.identity, track.score)
+            return item if self.show_window else None
+
+        # --- STAGE 4: RENDER (Draw on Monitor + Display Window) ---
+        def render(item):
+            frame_large = item['frame_large']
+            for face, (identity, max_score) in zip(item['faces'], item['matches']):
+                color = (0, 255, 0) if max_score > MATCH_THRESHOLD and identity != "Unknown" else (0, 0, 255)
+                box = face.bbox.astype(int)
+                cv2.rectangle(frame_large, (box[0], box[1]), (box[2], box[3]), color, 2)
+                label = f"{identity} {int(max_score*100)}%"
+                cv2.putText(frame_large, label, (box[0], box[1] - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+
+            disp_frame = cv2.resize(frame_large, (800, 600))
+            cv2.rectangle(disp_frame, (0, 0), (800, 30), (0,0,0), -1)
+            cv2.putText(disp_frame, f"{self.location.upper()} SURVEILLANCE (LIVE MONITOR)", (10, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+            cv2.imshow(self.window_name, disp_frame)
+            if cv2.waitKey(1) & 0xFF == ord('q'): self.stop_event.set()
+
+        chain = [SourceStage('capture', capture)]
+        for name, fn in (('detect', detect), ('match', match), ('render', render)):
+            chain.append(Stage(name, fn, **config[name]))
+        return Pipeline(chain)
+
+    # --- EVIDENCE (alert now, proof photo attached once the writer saved it) ---
+    def raise_alert(self, item, bbox, identity, score):
+        """False only if the proof backlog is full: the track is tried again on a later frame."""
+        frame, frame_large = item['frame'], item['frame_large']
+        # Box is in detection-frame coordinates; crop from the original frame
+        sx, sy = frame.shape[1] / frame_large.shape[1], frame.shape[0] / frame_large.shape[0]
+        box = [bbox[0] * sx, bbox[1] * sy, bbox[2] * sx, bbox[3] * sy]
+        # Render draws boxes into the frame (multires) before the writer gets to it: hand over a copy
+        status = self.manager.evidence.submit(identity, frame.copy(), box, score,
+                                              lambda proof: self.attach_proof(identity, proof), scope=self.id)
+        if status == 'dropped': return False
+        # On 'cooldown' this session saved the student moments ago; the alert reuses that photo
+        self.add_alert({
+            'roll': identity, 'time': datetime.now().strftime("%H:%M"),
+            'image': None, 'context': None, 'proof': 'saving', 'score': int(score*100),
+            'session': self.id, 'location': self.location
+        })
+        return True
+
+    def attach_proof(self, roll, proof):
+        with self.alert_lock:
+            if proof['image']: self.proofs[roll] = proof
+            alert = next((x for x in self.alerts if x['roll'] == roll), None)
+            if alert is None or alert.get('image'): return
+            # A failed write still settles the card: 'Mark Bunk' then records it without a photo
+            alert.update(image=proof['image'], context=proof['context'], proof='saved' if proof['image'] else 'failed')
+            self.publish('alert', alert) # Same key on the client: replaces the photo-less card
+
+
+# ==========================================
+# SESSION MANAGER (N CAMERAS, ONE MODEL)
+# ==========================================
+class SessionManager:
+    """Runs one SurveillanceSession per lecture / location.
+
+    Every session shares the same loaded FaceAnalysis model and gallery,
+    looked up through `get_model()` / `get_gallery()` on each use so a
+    reloaded gallery is picked up by running cameras too. With an
+    `inference` service, detection goes through its cross-camera batches.
+    """
+
+    def __init__(self, get_model, get_gallery, stream_factory, inference=None, max_sessions=8,
+                 tracker_config=None, gate_config=None, scheduler_config=None,
+                 detection_config=None, camera_zones=None, evidence=None, bus=None, updater=None, on_ended=None):
+        self.get_model = get_model
+        self.get_gallery = get_gallery
+        self.stream_factory = stream_factory
+        self.inference = inference
+        self.tracker_config = tracker_config or {}
+        self.gate_config = gate_config             # None disables the motion gate
+        self.scheduler_config = scheduler_config or {}
+        self.detection_config = detection_config or {}
+        self.camera_zones = camera_zones or {}     # location -> {'include': [...], 'exclude': [...]}
+        self.evidence = evidence or EvidenceWriter()
+        self.bus = bus                             # AlertBus for live dashboards (optional)
+        self.updater = updater                     # face_templates.TemplateUpdater (optional)
+        self.on_ended = on_ended                   # fn(session) for sessions that end on their own
+        self.max_sessions = max_sessions
+        self.sessions = {}
+        self.lock = threading.Lock()
+
+    def start(self, lecture_info, camera_url, location="Canteen", show_window=True):
+        with self.lock:
+            if len(self.sessions) >= self.max_sessions:
+                raise RuntimeError(f"Max {self.max_sessions} cameras running!")
+            for s in self.sessions.values():
+                if s.lecture_info.get('course') == lecture_info.get('course') and s.lecture_info.get('subject') == lecture_info.get('subject'):
+                    raise RuntimeError(f"{lecture_info.get('course')} {lecture_info.get('subject')} already running!")
+            session = SurveillanceSession(self, lecture_info, camera_url, location, show_window)
+            self.sessions[session.id] = session
+            if self.inference is not None: self.inference.start()
+        return session.start()
+
+    def stop(self, session_id):
+        with self.lock: session = self.sessions.pop(session_id, None)
+        if session is not None:
+            session.stop()
+            session.publish('ended', {'session': session.id})
+        return session
+
+    def ended(self, session):
+        # Called from the session's own thread; a no-op when stop() already took it out
+        with self.lock:
+            if self.sessions.get(session.id) is not session: return
+            del self.sessions[session.id]
+        session.stop_event.set()
+        session.publish('ended', {'session': session.id})
+        if self.on_ended is not None:
+            try: self.on_ended(session)
+            except Exception as e: print(f"[ERROR] Ending session {session.id}: {e}")
+
+    def stop_all(self):
+        return [self.stop(sid) for sid in list(self.sessions)]
+
+    def get(self, session_id, teacher_email=None):
+        """Session by id; with teacher_email, only if that teacher started it."""
+        session = self.sessions.get(session_id)
+        if session is None or (teacher_email is not None and session.lecture_info.get('teacher_email') != teacher_email):
+            return None
+        return session
+
+    def for_teacher(self, teacher_email):
+        return [s for s in list(self.sessions.values()) if s.lecture_info.get('teacher_email') == teacher_email]
+
+    def find_alert_session(self, roll, sessions=None):
+        for s in sessions if sessions is not None else list(self.sessions.values()):
+            if any(a['roll'] == roll for a in s.get_alerts()): return s
+        return None
@@ -57,8 +57,8 @@ def setup_system():
 
         # --- 3. CREATE DUMMY SCHEDULE ---
         print("📅 Scheduling Lecture for MCA...")
-        from datetime import datetime
-        today = datetime.now().strftime('%Y-%m-%d')
+        from datetime import date, time
+        today = date.today()
         
         schedule = Schedule(
             teacher_email="teacher@college.edu",
@@ -67,8 +67,8 @@ def setup_system():
             course="MCA",
             classroom="Lab-1",
             date=today,
-            start_time="09:00",
-            end_time="17:00"
+            start_time=time(9, 0),
+            end_time=time(17, 0)
         )
         db.session.add(schedule)
 
@@ -0,0 +1,52 @@
+import sys
+import time
+import argparse
+from app import app, clash_detector
+from timetable_io import iter_rows, detect_format, import_timetable, export_query, export_timetable, CHUNK_SIZE
+
+# ==========================================
+# TIMETABLE IMPORT / EXPORT (COMMAND LINE)
+# ==========================================
+#   python timetable_cli.py import semester.csv --teacher teacher@college.edu
+#   python timetable_cli.py import semester.json --dry-run
+#   python timetable_cli.py export timetable.csv --from 2025-01-01 --to 2025-06-30
+
+def run_import(args):
+    fmt = args.format or detect_format(args.file)
+    defaults = {'teacher_email': args.teacher} if args.teacher else {}
+    start = time.perf_counter()
+    with app.app_context(), open(args.file, 'rb') as f:
+        report = import_timetable(iter_rows(f, fmt), clash_detector, defaults, args.chunk_size, args.dry_run)
+    elapsed = time.perf_counter() - start
+
+    for e in report['errors']: print(f"[WARN] row {e['row']}: {e['error']}")
+    action = "validated" if args.dry_run else "imported"
+    print(f"[INFO] {report['valid'] if args.dry_run else report['inserted']} of {report['total']} rows {action}, "
+          f"{len(report['errors'])} rejected in {elapsed:.2f}s")
+    return 1 if report['errors'] else 0
+
+def run_export(args):
+    fmt = args.format or detect_format(args.file)
+    out = sys.stdout if args.file == '-' else open(args.file, 'w', encoding='utf-8', newline='')
+    with app.app_context():
+        for piece in export_timetable(export_query(args.teacher, args.date_from, args.date_to), fmt): out.write(piece)
+    if out is not sys.stdout: out.close()
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk timetable import / export")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="import lectures from CSV / JSON / JSON lines")
+    imp.add_argument("file")
+    imp.add_argument("--format", choices=["csv", "json", "jsonl"])
+    imp.add_argument("--teacher", help="teacher_email for rows that have none")
+    imp.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    imp.add_argument("--dry-run", action="store_true", help="validate only, insert nothing")
+    exp = sub.add_parser("export", help="export lectures ('-' for stdout)")
+    exp.add_argument("file")
+    exp.add_argument("--format", choices=["csv", "json", "jsonl"])
+    exp.add_argument("--teacher", help="only this teacher's lectures")
+    exp.add_argument("--from", dest="date_from")
+    exp.add_argument("--to", dest="date_to")
+    args = parser.parse_args()
+    sys.exit(run_import(args) if args.command == "import" else run_export(args))
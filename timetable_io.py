@@ -0,0 +1,168 @@
+import io
+import csv
+import json
+from sqlalchemy import insert
+from models import db, Schedule, as_date, as_time
+from attendance_stats import bump_version, data_version
+
+# ==========================================
+# BULK TIMETABLE IMPORT / EXPORT
+# ==========================================
+# Import = stream-parse (CSV / JSON array / JSON lines) -> validate every row
+# -> one clash pass over the whole batch -> chunked INSERTs, one transaction
+# per chunk. Every rejected row is reported with its 1-based row number.
+
+COLUMNS = ['teacher_email', 'teacher_name', 'course', 'subject', 'classroom', 'date', 'start_time', 'end_time']
+REQUIRED = ['course', 'subject', 'classroom', 'date', 'start_time', 'end_time']
+CHUNK_SIZE = 1000
+
+# --- STREAMING PARSERS ---
+def iter_csv(text):
+    yield from csv.DictReader(text)
+
+def iter_json_lines(text):
+    for line in text:
+        if line.strip(): yield json.loads(line)
+
+def iter_json_array(text, chunk=65536):
+    """Objects of a top-level JSON array, decoded one at a time from `chunk`-sized reads."""
+    decoder = json.JSONDecoder()
+    buf, pos, started, eof = '', 0, False, False
+    while True:
+        while pos < len(buf) and buf[pos] in ' \t\r\n,': pos += 1
+        if pos < len(buf):
+            if not started:
+                if buf[pos] != '[': raise ValueError("JSON import must be an array of lecture objects")
+                started, pos = True, pos + 1
+                continue
+            if buf[pos] == ']': return
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+                yield obj
+                pos = end
+                continue
+            except json.JSONDecodeError:
+                if eof: raise
+        if eof: raise ValueError("JSON import ended before the closing ']'")
+        data = text.read(chunk)
+        eof = not data
+        buf, pos = buf[pos:] + data, 0
+
+def detect_format(filename='', content_type=''):
+    name, content_type = (filename or '').lower(), (content_type or '').lower()
+    if name.endswith(('.jsonl', '.ndjson')) or 'ndjson' in content_type or 'jsonl' in content_type: return 'jsonl'
+    if name.endswith('.json') or 'json' in content_type: return 'json'
+    return 'csv'
+
+def iter_rows(stream, fmt):
+    """Dicts from a binary or text stream, read incrementally."""
+    text = stream if isinstance(stream, io.TextIOBase) else io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    return {'csv': iter_csv, 'json': iter_json_array, 'jsonl': iter_json_lines}[fmt](text)
+
+# --- PER-DAY VERSIONS (clash cache invalidation across processes) ---
+# Every schedule write bumps a DataVersion row per touched date, in the same
+# transaction; ClashDetector compares it before trusting a cached day.
+def schedule_version(day):
+    return data_version(f"schedule:{day.isoformat()}")
+
+def bump_schedule_days(days):
+    """{day: new version}; read back inside the caller's transaction, so it is this write's version."""
+    versions = {}
+    for day in set(days):
+        bump_version(f"schedule:{day.isoformat()}")
+        versions[day] = schedule_version(day)
+    return versions
+
+# --- ROW VALIDATION ---
+def parse_row(raw, defaults, overrides=None):
+    row = {k: (str(raw[k]).strip() if raw.get(k) is not None else '') for k in COLUMNS}
+    for k, v in defaults.items():
+        if not row[k]: row[k] = v
+    row.update(overrides or {})
+    missing = [k for k in REQUIRED + ['teacher_email'] if not row[k]]
+    if missing: raise ValueError(f"missing {', '.join(missing)}")
+    try: row['date'] = as_date(row['date'])
+    except ValueError: raise ValueError(f"bad date {row['date']!r} (use YYYY-MM-DD)")
+    for k in ('start_time', 'end_time'):
+        try: row[k] = as_time(row[k])
+        except ValueError: raise ValueError(f"bad {k} {row[k]!r} (use HH:MM)")
+    if row['start_time'] >= row['end_time']: raise ValueError("start_time must be before end_time")
+    row['teacher_name'] = row['teacher_name'] or row['teacher_email']
+    return row
+
+def clash_error(clash, row_numbers):
+    key, other = clash
+    what = {'teacher_email': 'teacher', 'course': 'course', 'classroom': 'classroom'}[key]
+    if isinstance(other, tuple): return f"{what} clash with row {row_numbers[other[1]]}"
+    return f"{what} clash with existing lecture #{other}"
+
+# --- IMPORT ---
+def import_timetable(rows, detector, defaults=None, chunk_size=CHUNK_SIZE, dry_run=False, overrides=None):
+    """Validate and insert lectures; returns {'total', 'valid', 'inserted', 'errors': [{'row', 'error'}]}.
+
+    defaults fill empty columns, overrides replace them on every row (e.g. the uploader as teacher).
+    """
+    defaults = defaults or {}
+    errors, lectures, row_numbers = [], [], []
+    total = 0
+    for n, raw in enumerate(rows, start=1):
+        total = n
+        try:
+            lectures.append(parse_row(raw, defaults, overrides))
+            row_numbers.append(n)
+        except (ValueError, AttributeError) as e: errors.append({'row': n, 'error': str(e)})
+
+    accepted = []
+    for i, clash in enumerate(detector.check_batch(lectures)):
+        if clash is None: accepted.append((row_numbers[i], lectures[i]))
+        else: errors.append({'row': row_numbers[i], 'error': clash_error(clash, row_numbers)})
+
+    inserted = 0
+    if not dry_run:
+        for start in range(0, len(accepted), chunk_size):
+            chunk = accepted[start:start + chunk_size]
+            try:
+                db.session.execute(insert(Schedule), [lecture for _, lecture in chunk])
+                bump_schedule_days(lecture['date'] for _, lecture in chunk)
+                db.session.commit()
+                inserted += len(chunk)
+            except Exception as e:
+                db.session.rollback()
+                errors.extend({'row': n, 'error': f"database error: {e}"} for n, _ in chunk)
+        for day in {lecture['date'] for _, lecture in accepted}: detector.invalidate(day)
+
+    errors.sort(key=lambda e: e['row'])
+    return {'total': total, 'inserted': inserted, 'valid': len(accepted), 'errors': errors}
+
+# --- EXPORT ---
+def export_query(teacher_email=None, date_from=None, date_to=None):
+    query = Schedule.query
+    if teacher_email: query = query.filter(Schedule.teacher_email == teacher_email)
+    if date_from: query = query.filter(Schedule.date >= as_date(date_from))
+    if date_to: query = query.filter(Schedule.date <= as_date(date_to))
+    return query.order_by(Schedule.date, Schedule.start_time).yield_per(CHUNK_SIZE)
+
+def export_record(sch):
+    return {'teacher_email': sch.teacher_email, 'teacher_name': sch.teacher_name, 'course': sch.course,
+            'subject': sch.subject, 'classroom': sch.classroom, 'date': sch.date.isoformat(),
+            'start_time': sch.start_time.strftime('%H:%M'), 'end_time': sch.end_time.strftime('%H:%M')}
+
+def export_timetable(schedules, fmt='csv'):
+    """Yields the export in pieces (never the whole timetable in memory)."""
+    if fmt == 'csv':
+        out = io.StringIO()
+        writer = csv.DictWriter(out, fieldnames=COLUMNS)
+        writer.writeheader()
+        for n, sch in enumerate(schedules, start=1):
+            writer.writerow(export_record(sch))
+            if n % CHUNK_SIZE == 0:
+                yield out.getvalue()
+                out.seek(0); out.truncate()
+        yield out.getvalue()
+    elif fmt == 'jsonl':
+        for sch in schedules: yield json.dumps(export_record(sch)) + '\n'
+    else:
+        yield '['
+        for n, sch in enumerate(schedules):
+            yield (',\n' if n else '\n') + json.dumps(export_record(sch))
+        yield '\n]\n'
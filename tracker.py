@@ -0,0 +1,121 @@
+import numpy as np
+from gallery import MATCH_THRESHOLD
+
+# ==========================================
+# IOU FACE TRACKER WITH IDENTITY CACHE
+# ==========================================
+# Detection still runs on every processed frame, but the recognition model
+# and gallery match only run for a track when it is new, every `recheck_every`
+# frames, or when its cached score is weak. Identity is a vote over the whole
+# track instead of "2 hits in a row" counters that were never reset.
+
+class Track:
+    def __init__(self, track_id, bbox):
+        self.id = track_id
+        self.bbox = bbox
+        self.age = 0                 # frames since the track was born
+        self.missed = 0              # consecutive frames without a detection
+        self.since_recognition = 0   # frames since the last embedding
+        self.votes = {}              # identity -> summed score
+        self.hits = {}               # identity -> number of confident matches
+        self.recognized = False
+        self.weak_streak = 0         # recognitions in a row without a confident match
+        self.identity = "Unknown"
+        self.score = 0.0
+        self.alerted = False
+
+    def vote(self, identity, score):
+        self.recognized = True
+        self.since_recognition = 0
+        if identity != "Unknown" and score > MATCH_THRESHOLD:
+            self.votes[identity] = self.votes.get(identity, 0.0) + score
+            self.hits[identity] = self.hits.get(identity, 0) + 1
+            self.weak_streak = 0
+        else:
+            self.weak_streak += 1
+        if self.votes:
+            best = max(self.votes, key=self.votes.get)
+            self.identity = best
+            # Report the best recent score of the winning identity
+            self.score = score if identity == best else self.score
+        else:
+            self.identity, self.score = "Unknown", score
+
+    @property
+    def confirmed_hits(self): return self.hits.get(self.identity, 0)
+
+
+class FaceTracker:
+    def __init__(self, iou_threshold=0.3, max_missed=10, recheck_every=15, weak_recheck_every=3,
+                 min_confidence=0.60, min_hits=2):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed                  # drop a track after this many empty frames
+        self.recheck_every = recheck_every            # K: re-run recognition every K frames
+        self.weak_recheck_every = weak_recheck_every  # ...or sooner while unknown / unconfirmed
+        self.min_confidence = min_confidence
+        self.min_hits = min_hits                      # confident matches before a track is confirmed
+        self.tracks = []
+        self.next_id = 1
+        self.recognitions = 0
+        self.detections = 0
+
+    def update(self, bboxes):
+        """Associate this frame's boxes with tracks; returns one Track per box."""
+        bboxes = [np.asarray(b, dtype=np.float32)[:4] for b in bboxes]
+        self.detections += len(bboxes)
+        assigned = [None] * len(bboxes)
+        taken = set()
+        if self.tracks and bboxes:
+            ious = iou_matrix(np.stack(bboxes), np.stack([t.bbox for t in self.tracks]))
+            # Greedy association, highest IoU first
+            for flat in np.argsort(-ious, axis=None):
+                i, j = np.unravel_index(flat, ious.shape)
+                if ious[i, j] < self.iou_threshold: break
+                if assigned[i] is not None or j in taken: continue
+                assigned[i] = self.tracks[j]
+                taken.add(j)
+        for j, t in enumerate(self.tracks):
+            t.missed = 0 if j in taken else t.missed + 1
+        for i, box in enumerate(bboxes):
+            if assigned[i] is None:
+                assigned[i] = Track(self.next_id, box)
+                self.next_id += 1
+                self.tracks.append(assigned[i])
+            else:
+                assigned[i].bbox = box
+        for t in self.tracks:
+            t.age += 1
+            t.since_recognition += 1
+        # Vanished identities lose their votes together with the track
+        self.tracks = [t for t in self.tracks if t.missed <= self.max_missed]
+        return assigned
+
+    def needs_recognition(self, track):
+        if not track.recognized: return True
+        if track.confirmed_hits < self.min_hits or track.score < self.min_confidence:
+            # Strangers back off exponentially, up to the normal recheck interval
+            backoff = self.weak_recheck_every * 2 ** max(track.weak_streak - 1, 0)
+            return track.since_recognition >= min(backoff, self.recheck_every)
+        return track.since_recognition >= self.recheck_every
+
+    def is_confirmed(self, track):
+        return track.identity != "Unknown" and track.confirmed_hits >= self.min_hits
+
+    def record(self, track, identity, score):
+        self.recognitions += 1
+        track.vote(identity, score)
+
+    def stats(self):
+        return {"tracks": len(self.tracks), "detections": self.detections, "recognitions": self.recognitions,
+                "recognition_ratio": round(self.recognitions / self.detections, 3) if self.detections else 0.0}
+
+
+def iou_matrix(a, b):
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-6)